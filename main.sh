@@ -1,5 +1,4 @@
 #!/bin/bash
 
-python3 src/main.py
-cd public && python3 -m http.server 8888
+python3 src/main.py serve --port 8888
 
@@ -0,0 +1,59 @@
+import hashlib
+import os
+from functools import lru_cache
+from atomic_write import atomic_write
+from node_arena import ARENA_FORMAT, NodeArena
+from render_cache import RENDER_CACHE_VERSION
+
+
+# Version of the block and inline parsers.
+PARSER_VERSION = "1"
+
+
+def document_key(markdown: str, context: str = "") -> str:
+    digest = hashlib.sha256()
+    digest.update(f"{PARSER_VERSION}\0{ARENA_FORMAT}\0{RENDER_CACHE_VERSION}\0{context}\0".encode())
+    digest.update(markdown.encode())
+
+    return digest.hexdigest()
+
+
+class AstCache:
+    """Parsed documents as marshalled NodeArenas, keyed by `document_key`.
+
+    Entries share the render cache directory, so `RenderCache.prune` keeps
+    both within one disk budget. Unreadable entries count as misses.
+    """
+    def __init__(self, directory: str) -> None:
+        self.directory: str = directory
+        self.hits: int = 0
+        self.misses: int = 0
+
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key + ".ast")
+
+
+    def get(self, key: str) -> NodeArena|None:
+        path = self._path(key)
+        try:
+            with open(path, mode="rb") as f:
+                arena = NodeArena.from_bytes(f.read())
+            os.utime(path)
+        except (OSError, ValueError, EOFError, TypeError):
+            self.misses += 1
+            return None
+        self.hits += 1
+
+        return arena
+
+
+    def put(self, key: str, arena: NodeArena) -> None:
+        with atomic_write(self._path(key), mode="wb") as f:
+            _ = f.write(arena.to_bytes())
+
+
+@lru_cache(maxsize=4)
+def open_ast_cache(directory: str) -> AstCache:
+    """The parsed-document cache of this process stored in `directory`."""
+    return AstCache(directory)
@@ -0,0 +1,166 @@
+import asyncio
+import logging
+import multiprocessing
+import time
+from collections.abc import Callable
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from build_manifest import BuildManifest
+from build_stats import BuildStats
+from content_walker import WalkFilter
+from file_deploy import SyncResult, sync_dir_content
+from image_pipeline import ImageIndex
+from page_meta import PageMeta
+from page_generator import (
+    CONTENT_FILTER, BuildResult, PageError, plan_pages, read_markdown, record_pages,
+    render_page_stats, write_page
+)
+
+
+DEFAULT_IO_WORKERS = 8
+# Render processes are started while the I/O threads run, so they are not forked from this process.
+PROCESS_START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+logger = logging.getLogger(__name__)
+
+
+def timed[T](function: Callable[..., T], *args: object) -> tuple[T, float]:
+    start = time.perf_counter()
+    value = function(*args)
+
+    return value, time.perf_counter() - start
+
+
+async def render_pages_async(
+    pages: list[tuple[str, str]],
+    template_path: str,
+    basepath: str,
+    jobs: int = 1,
+    stats: BuildStats|None = None,
+    cache_dir: str|None = None,
+    io_workers: int = DEFAULT_IO_WORKERS,
+    images: ImageIndex|None = None,
+    metas: dict[str, PageMeta]|None = None
+) -> list[PageError]:
+    """Render every (source, destination) pair, overlapping file I/O with parsing.
+
+    Reads and writes run on a pool of `io_workers` threads while pages are
+    rendered on one thread, or on `jobs` processes. At most `2 * io_workers`
+    pages are in flight at once, which bounds the markdown and HTML held in
+    memory however many pages there are. The metadata of each page
+    rendered goes in `metas`, keyed by source.
+    """
+    loop = asyncio.get_running_loop()
+    errors: list[PageError] = []
+    if metas is None:
+        metas = {}
+    in_flight = asyncio.Semaphore(2 * io_workers)
+    io_pool = ThreadPoolExecutor(max_workers=io_workers, thread_name_prefix="ssg-io")
+    cpu_pool: Executor = ProcessPoolExecutor(
+        max_workers=jobs, mp_context=multiprocessing.get_context(PROCESS_START_METHOD)
+    ) if jobs > 1 else ThreadPoolExecutor(max_workers=1, thread_name_prefix="ssg-render")
+
+    async def render(source: str, markdown: str) -> str:
+        # Stats are collected apart and merged here, on the event loop thread, so no two threads update `stats`.
+        html, page_stats, metas[source] = await loop.run_in_executor(
+            cpu_pool, render_page_stats, markdown, template_path, basepath, cache_dir, images
+        )
+        if stats is not None:
+            stats.merge(page_stats)
+        return html
+
+    async def generate(source: str, dest: str) -> None:
+        try:
+            logger.debug("Generating page from %s to %s using %s", source, dest, template_path)
+            start = time.perf_counter()
+            markdown, read_seconds = await loop.run_in_executor(io_pool, timed, read_markdown, source)
+            html = await render(source, markdown)
+            _, write_seconds = await loop.run_in_executor(io_pool, timed, write_page, dest, html)
+            if stats is not None:
+                stats.add("read", read_seconds)
+                stats.add("write", write_seconds)
+                stats.add_page(source, time.perf_counter() - start)
+        except Exception as e:
+            errors.append(PageError(source, dest, e))
+        finally:
+            in_flight.release()
+
+    try:
+        tasks: list[asyncio.Task[None]] = []
+        for source, dest in pages:
+            _ = await in_flight.acquire()
+            tasks.append(asyncio.create_task(generate(source, dest)))
+        _ = await asyncio.gather(*tasks)
+    finally:
+        io_pool.shutdown()
+        cpu_pool.shutdown()
+    errors.sort(key=lambda x: x.source)
+
+    return errors
+
+
+async def generate_pages_async(
+    content_path: str,
+    template_path: str,
+    dest_path: str,
+    basepath: str,
+    manifest: BuildManifest,
+    jobs: int = 1,
+    stats: BuildStats|None = None,
+    cache_dir: str|None = None,
+    io_workers: int = DEFAULT_IO_WORKERS,
+    walk_filter: WalkFilter = CONTENT_FILTER,
+    images: ImageIndex|None = None
+) -> BuildResult:
+    """`generate_pages_incremental` on the asyncio pipeline."""
+    result = BuildResult()
+    stale, template_hash = await asyncio.to_thread(
+        plan_pages, content_path, template_path, dest_path, basepath, manifest, result, stats, walk_filter, images
+    )
+    pages = [(source, dest) for source, dest, _ in stale]
+    metas: dict[str, PageMeta] = {}
+    errors = await render_pages_async(
+        pages, template_path, basepath, jobs, stats, cache_dir, io_workers, images, metas
+    )
+    record_pages(stale, errors, manifest, result, metas)
+    manifest.template_hash = template_hash
+    manifest.basepath = basepath
+
+    return result
+
+
+async def build_site(
+    static_path: str,
+    content_path: str,
+    template_path: str,
+    dest_path: str,
+    basepath: str,
+    manifest: BuildManifest,
+    jobs: int = 1,
+    stats: BuildStats|None = None,
+    cache_dir: str|None = None,
+    checksum: bool = False,
+    strategy: str = "copy",
+    io_workers: int = DEFAULT_IO_WORKERS,
+    walk_filter: WalkFilter = CONTENT_FILTER,
+    minify: bool = False,
+    images: ImageIndex|None = None
+) -> tuple[SyncResult, BuildResult]:
+    """Sync static files and render pages concurrently instead of one after the other."""
+    # The sync thread times itself in its own stats, merged once both are done.
+    sync_stats = BuildStats()
+
+    def sync_static() -> SyncResult:
+        with sync_stats.stage("static_copy"):
+            return sync_dir_content(static_path, dest_path, manifest.assets, checksum, strategy, minify=minify)
+
+    sync_result, result = await asyncio.gather(
+        asyncio.to_thread(sync_static),
+        generate_pages_async(
+            content_path, template_path, dest_path, basepath, manifest, jobs, stats, cache_dir, io_workers,
+            walk_filter, images
+        ),
+    )
+    if stats is not None:
+        stats.merge(sync_stats)
+
+    return sync_result, result
@@ -0,0 +1,38 @@
+import os
+import threading
+from collections.abc import Iterator
+from contextlib import contextmanager
+from typing import IO, Any
+
+
+def tmp_path_for(path: str) -> str:
+    """A temporary name next to `path` that no other process or thread writing `path` uses."""
+    return f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+
+@contextmanager
+def replacing(path: str) -> Iterator[str]:
+    """Yield a temporary path to write, moved over `path` when the block succeeds.
+
+    The directory of `path` is created if needed. If the block raises, the
+    temporary file is removed and `path` is left as it was.
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = tmp_path_for(path)
+    try:
+        yield tmp_path
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    os.replace(tmp_path, path)
+
+
+@contextmanager
+def atomic_write(path: str, mode: str = "wt") -> Iterator[IO[Any]]:
+    """`open(path, mode)` for writing, through `replacing`: readers see the old file or the whole new one."""
+    with replacing(path) as tmp_path:
+        with open(tmp_path, mode=mode) as f:
+            yield f
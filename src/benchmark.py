@@ -0,0 +1,231 @@
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections.abc import Callable
+from contextlib import redirect_stdout
+from page_generator import generate_pages_recursive
+from text_to_html import markdown_to_blocks, markdown_to_html_node, text_to_textnodes
+
+
+WORDS = (
+    "elf hobbit ring wizard shire mountain river forest tower sword shield king "
+    + "road journey shadow light song council gate stone dragon fire ale pipe"
+).split()
+
+TEMPLATE = """<!doctype html>
+<html>
+<head><title>{{ Title }}</title><link href="/index.css" rel="stylesheet" /></head>
+<body><article>{{ Content }}</article></body>
+</html>
+"""
+
+
+def _sentence(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+
+def _inline(rng: random.Random, words: int, links: int = 0) -> str:
+    parts: list[str] = [_sentence(rng, words)]
+    parts.append(f"It has **{rng.choice(WORDS)}**, _{rng.choice(WORDS)}_ and `{rng.choice(WORDS)}()`.")
+    for i in range(links):
+        parts.append(f"See [{rng.choice(WORDS)} {i}](/blog/{rng.choice(WORDS)}-{i}).")
+        if i % 5 == 0:
+            parts.append(f"![{rng.choice(WORDS)}](/images/{rng.choice(WORDS)}.png)")
+
+    return " ".join(parts)
+
+
+def generate_post(rng: random.Random, shape: str, size: int) -> str:
+    """Markdown document of the given shape; `size` scales its block count."""
+    blocks: list[str] = [f"# {_sentence(rng, 4)}"]
+    for i in range(size):
+        match shape:
+            case "short-posts" | "huge-post":
+                blocks.append(f"## {_sentence(rng, 3)}" if i % 10 == 0 else _inline(rng, 30, 1))
+            case "link-heavy":
+                blocks.append(_inline(rng, 10, 40))
+            case "deep-lists":
+                # The parser has no nested lists, so "deep" means long lists.
+                items = [
+                    (f"{n + 1}. " if i % 2 else "- ") + _inline(rng, 6)
+                    for n in range(50)
+                ]
+                blocks.append("\n".join(items))
+            case "code-blocks":
+                code = "\n".join(f"print(\"{_sentence(rng, 6)}\")" for _ in range(200))
+                blocks.append(f"```\n{code}\n```")
+            case _:
+                raise ValueError(f"Unknown corpus shape: {shape}")
+        if shape != "code-blocks" and i % 7 == 3:
+            blocks.append(f"> {_sentence(rng, 20)}\n> {_sentence(rng, 10)}")
+
+    return "\n\n".join(blocks) + "\n"
+
+
+SHAPES: dict[str, tuple[int, int]] = {
+    # shape: (number of posts, size of each post)
+    "short-posts": (500, 8),
+    "huge-post": (1, 5000),
+    "link-heavy": (50, 40),
+    "deep-lists": (20, 40),
+    "code-blocks": (20, 20),
+}
+
+
+def generate_corpus(root: str, shape: str, scale: float = 1.0, seed: int = 0) -> list[str]:
+    """Write a synthetic content tree for `shape` under `root`; return its files."""
+    posts, size = SHAPES[shape]
+    if posts == 1:
+        size = max(1, int(size * scale))
+    else:
+        posts = max(1, int(posts * scale))
+    rng = random.Random(seed)
+    paths: list[str] = []
+    for i in range(posts):
+        directory = os.path.join(root, "blog", f"post-{i:05d}")
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, "index.md")
+        with open(path, mode="wt") as f:
+            _ = f.write(generate_post(rng, shape, size))
+        paths.append(path)
+
+    return paths
+
+
+def quietly(function: Callable[..., object], *args: object) -> object:
+    with open(os.devnull, mode="wt") as devnull, redirect_stdout(devnull):
+        return function(*args)
+
+
+def measure(function: Callable[[], object], repeat: int) -> list[float]:
+    timings: list[float] = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        _ = function()
+        timings.append(time.perf_counter() - start)
+
+    return timings
+
+
+def bench_shape(shape: str, scale: float, repeat: int) -> list[dict[str, object]]:
+    results: list[dict[str, object]] = []
+    with tempfile.TemporaryDirectory() as root:
+        content = os.path.join(root, "content")
+        paths = generate_corpus(content, shape, scale)
+        documents: list[str] = []
+        for path in paths:
+            with open(path) as f:
+                documents.append(f.read())
+        blocks = [block for document in documents for block in markdown_to_blocks(document)]
+        paragraphs = [" ".join(block.splitlines()) for block in blocks if not block.startswith(("```", "#"))]
+        nodes = [markdown_to_html_node(document) for document in documents]
+        template = os.path.join(root, "template.html")
+        with open(template, mode="wt") as f:
+            _ = f.write(TEMPLATE)
+        stages: dict[str, Callable[[], object]] = {
+            "markdown_to_blocks": lambda: [markdown_to_blocks(d) for d in documents],
+            "text_to_textnodes": lambda: [text_to_textnodes(p) for p in paragraphs],
+            "markdown_to_html_node": lambda: [markdown_to_html_node(d) for d in documents],
+            "to_html": lambda: [node.to_html() for node in nodes],
+            "generate_pages_recursive": lambda: quietly(
+                generate_pages_recursive, content, template, os.path.join(root, "docs"), "/"
+            ),
+        }
+        size = sum(map(len, documents))
+        for stage, function in stages.items():
+            timings = measure(function, repeat)
+            results.append({
+                "shape": shape,
+                "stage": stage,
+                "files": len(documents),
+                "bytes": size,
+                "repeat": repeat,
+                "min_s": min(timings),
+                "median_s": statistics.median(timings),
+            })
+
+    return results
+
+
+def git_commit() -> str|None:
+    try:
+        output = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+    return output.stdout.strip()
+
+
+def compare(
+    results: list[dict[str, object]],
+    baseline: list[dict[str, object]],
+    threshold: float
+) -> tuple[bool, list[str]]:
+    """Rows of current/baseline ratios, and False if any stage regressed beyond `threshold`."""
+    previous = {(r["shape"], r["stage"]): float(r["min_s"]) for r in baseline}  # pyright: ignore[reportArgumentType]
+    ok = True
+    rows = [f"{'shape':<14} {'stage':<26} {'baseline':>10} {'current':>10} {'ratio':>7}"]
+    for result in results:
+        key = (result["shape"], result["stage"])
+        if key not in previous:
+            continue
+        current = float(result["min_s"])  # pyright: ignore[reportArgumentType]
+        ratio = current / previous[key] if previous[key] else float("inf")
+        flag = ""
+        if ratio > 1 + threshold:
+            ok = False
+            flag = "  REGRESSION"
+        rows.append(f"{key[0]:<14} {key[1]:<26} {previous[key]:>10.4f} {current:>10.4f} {ratio:>7.2f}{flag}")
+
+    return ok, rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the markdown to HTML pipeline.")
+    _ = parser.add_argument("--shape", action="append", choices=sorted(SHAPES), help="corpus shape(s) to run")
+    _ = parser.add_argument("--scale", type=float, default=1.0, help="multiply the corpus size")
+    _ = parser.add_argument("--repeat", type=int, default=3, help="timed runs per stage")
+    _ = parser.add_argument("--output", help="write results as JSON to this file")
+    _ = parser.add_argument("--compare", help="JSON results of a previous run to compare against")
+    _ = parser.add_argument(
+        "--threshold", type=float, default=0.1,
+        help="allowed slowdown before --compare reports a regression (0.1 = 10%%)"
+    )
+    args = parser.parse_args()
+    results: list[dict[str, object]] = []
+    for shape in args.shape or sorted(SHAPES):
+        print(f"Benchmarking {shape}...", file=sys.stderr)
+        results.extend(bench_shape(shape, args.scale, args.repeat))
+    report = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "scale": args.scale,
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, mode="wt") as f:
+            json.dump(report, f, indent=1)
+    else:
+        json.dump(report, sys.stdout, indent=1)
+        print()
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+        ok, rows = compare(results, baseline, args.threshold)
+        print("\n".join(rows))
+        if not ok:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+from collections.abc import Iterable, Iterator
+from blocknode import BlockType, block_to_block_type
+
+
+FENCE = "```"
+
+
+def classify_first_line(line: str) -> BlockType:
+    """Type of a non-fenced block, decided by its first line alone."""
+    block_type = block_to_block_type(line)
+    if block_type == BlockType.CODE:
+        return BlockType.PARAGRAPH
+
+    return block_type
+
+
+def _finish(lines: list[str]) -> list[str]:
+    lines[0] = lines[0].lstrip()
+    lines[-1] = lines[-1].rstrip()
+
+    return lines
+
+
+def _split_unfenced(lines: list[str]) -> Iterator[tuple[BlockType, list[str]]]:
+    block: list[str] = []
+    for line in lines + [""]:
+        if line.strip():
+            block.append(line)
+        elif block:
+            yield classify_first_line(block[0].lstrip()), _finish(block)
+            block = []
+
+
+def scan_blocks(lines: Iterable[str]) -> Iterator[tuple[BlockType, list[str]]]:
+    """Yield `(BlockType, lines)` for each markdown block, reading line by line.
+
+    Blocks are separated by blank (or whitespace-only) lines, except inside
+    a ``` fence, which runs until a line ending with ```. Only the current
+    block is held in memory. A fence that is never closed is split on blank
+    lines like any other text.
+    """
+    block: list[str] = []
+    block_type: BlockType|None = None
+    for raw_line in lines:
+        line = raw_line.rstrip("\r\n")
+        if block_type == BlockType.CODE:
+            block.append(line)
+            if line.rstrip().endswith(FENCE):
+                yield BlockType.CODE, _finish(block)
+                block, block_type = [], None
+            continue
+        if not line.strip():
+            if block_type is not None:
+                yield block_type, _finish(block)
+                block, block_type = [], None
+            continue
+        if block_type is None:
+            stripped = line.strip()
+            if stripped.startswith(FENCE):
+                if len(stripped) >= 2 * len(FENCE) and stripped.endswith(FENCE):
+                    yield BlockType.CODE, _finish([line])
+                    continue
+                block_type = BlockType.CODE
+            else:
+                block_type = classify_first_line(stripped)
+        block.append(line)
+    if block_type == BlockType.CODE:
+        yield from _split_unfenced(block)
+    elif block_type is not None:
+        yield block_type, _finish(block)
@@ -0,0 +1,52 @@
+import json
+import logging
+import sys
+from typing import override
+from build_stats import BuildStats
+
+
+LOG_FORMATS = ("text", "json")
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record; structured data is passed as `extra={"fields": {...}}`."""
+    @override
+    def format(self, record: logging.LogRecord) -> str:
+        data: dict[str, object] = {
+            "time": round(record.created, 3),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        fields: object = getattr(record, "fields", None)
+        if isinstance(fields, dict):
+            data.update(fields)  # pyright: ignore[reportUnknownArgumentType]
+        if record.exc_info:
+            data["exception"] = self.formatException(record.exc_info)
+
+        return json.dumps(data)
+
+
+def configure_logging(verbosity: int = 0, log_format: str = "text") -> None:
+    """Route build logs to stderr.
+
+    `verbosity` < 0 keeps warnings and errors only, 0 adds the per-build
+    summaries and > 0 adds a line per file.
+    """
+    level = logging.WARNING if verbosity < 0 else logging.DEBUG if verbosity > 0 else logging.INFO
+    handler = logging.StreamHandler(sys.stderr)
+    handler.setFormatter(JsonFormatter() if log_format == "json" else logging.Formatter("%(message)s"))
+    root = logging.getLogger()
+    root.handlers = [handler]
+    root.setLevel(level)
+
+
+def log_stages(logger: logging.Logger, stats: BuildStats) -> None:
+    """One summarised record per build stage that ran."""
+    for name, stage in stats.stages.items():
+        if stage.count == 0:
+            continue
+        logger.info(
+            "%s: %d in %.4fs", name, stage.count, stage.seconds,
+            extra={"fields": {"event": "stage", "stage": name, "count": stage.count, "seconds": stage.seconds}}
+        )
@@ -0,0 +1,200 @@
+from __future__ import annotations
+import hashlib
+import json
+import os
+from collections.abc import Callable
+from atomic_write import atomic_write
+
+
+MANIFEST_VERSION = 2
+HASH_CHUNK_SIZE = 1 << 16
+
+
+def hash_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, mode="rb") as f:
+        while chunk := f.read(HASH_CHUNK_SIZE):
+            digest.update(chunk)
+
+    return digest.hexdigest()
+
+
+class SourceState:
+    """Content hash of a source file, with the size and mtime it had when it was hashed."""
+    def __init__(self, source_hash: str, size: int, mtime_ns: int) -> None:
+        self.source_hash: str = source_hash
+        self.size: int = size
+        self.mtime_ns: int = mtime_ns
+
+
+    @classmethod
+    def read(cls, path: str) -> SourceState:
+        # Stat before hashing: a change made meanwhile leaves an older mtime, so the next build hashes again.
+        stat = os.stat(path)
+        return cls(hash_file(path), stat.st_size, stat.st_mtime_ns)
+
+
+class PageRecord:
+    def __init__(
+        self,
+        source_hash: str,
+        dest: str,
+        size: int,
+        mtime_ns: int,
+        images: dict[str, str]|None = None
+    ) -> None:
+        self.source_hash: str = source_hash
+        self.dest: str = dest
+        self.size: int = size
+        self.mtime_ns: int = mtime_ns
+        # Image URL -> key of what the page showed for it, so only pages whose images change are rebuilt.
+        self.images: dict[str, str] = images or {}
+
+
+    def to_dict(self) -> dict[str, str|int|dict[str, str]]:
+        data: dict[str, str|int|dict[str, str]] = {
+            "hash": self.source_hash,
+            "dest": self.dest,
+            "size": self.size,
+            "mtime_ns": self.mtime_ns
+        }
+        if self.images:
+            data["images"] = self.images
+        return data
+
+
+    @classmethod
+    def from_dict(cls, data: dict[str, str|int|dict[str, str]]) -> PageRecord:
+        return cls(
+            str(data["hash"]),
+            str(data["dest"]),
+            int(data["size"]),  # pyright: ignore[reportArgumentType]
+            int(data["mtime_ns"]),  # pyright: ignore[reportArgumentType]
+            dict(data.get("images") or {}),  # pyright: ignore[reportArgumentType]
+        )
+
+
+class AssetRecord:
+    def __init__(self, size: int, mtime_ns: int, source_hash: str|None = None, minified: bool = False) -> None:
+        self.size: int = size
+        self.mtime_ns: int = mtime_ns
+        self.source_hash: str|None = source_hash
+        self.minified: bool = minified
+
+
+    def to_dict(self) -> dict[str, str|int|None]:
+        data: dict[str, str|int|None] = {"size": self.size, "mtime_ns": self.mtime_ns, "hash": self.source_hash}
+        if self.minified:
+            data["minified"] = 1
+        return data
+
+
+    @classmethod
+    def from_dict(cls, data: dict[str, str|int|None]) -> AssetRecord:
+        source_hash = data.get("hash")
+        return cls(
+            int(data["size"] or 0),
+            int(data["mtime_ns"] or 0),
+            str(source_hash) if source_hash else None,
+            bool(data.get("minified")),
+        )
+
+
+class BuildManifest:
+    """Persistent record of the inputs that produced the current output tree.
+
+    Pages are keyed by their source path, static assets by their path relative
+    to the static directory. Size and mtime are kept next to the content hash
+    so that unchanged files can be recognised without reading them.
+    """
+    def __init__(self, path: str) -> None:
+        self.path: str = path
+        self.template_hash: str|None = None
+        self.basepath: str|None = None
+        self.pages: dict[str, PageRecord] = {}
+        self.assets: dict[str, AssetRecord] = {}
+        # Output files with precompressed sidecars, keyed by path relative to the output directory.
+        self.compressed: dict[str, AssetRecord] = {}
+        # (index, count) when this is the partial manifest of one build shard.
+        self.shard: tuple[int, int]|None = None
+
+
+    @classmethod
+    def load(cls, path: str) -> BuildManifest:
+        manifest = cls(path)
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return manifest
+        if data.get("version") != MANIFEST_VERSION:
+            return manifest
+        manifest.template_hash = data.get("template_hash")
+        manifest.basepath = data.get("basepath")
+        shard = data.get("shard")
+        manifest.shard = (int(shard[0]), int(shard[1])) if shard else None
+        manifest.pages = {
+            source: PageRecord.from_dict(record)
+            for source, record in data.get("pages", {}).items()
+        }
+        manifest.assets = {
+            path: AssetRecord.from_dict(record)
+            for path, record in data.get("assets", {}).items()
+        }
+        manifest.compressed = {
+            path: AssetRecord.from_dict(record)
+            for path, record in data.get("compressed", {}).items()
+        }
+
+        return manifest
+
+
+    def save(self) -> None:
+        data = {
+            "version": MANIFEST_VERSION,
+            "template_hash": self.template_hash,
+            "basepath": self.basepath,
+            "shard": list(self.shard) if self.shard else None,
+            "pages": {source: record.to_dict() for source, record in sorted(self.pages.items())},
+            "assets": {path: record.to_dict() for path, record in sorted(self.assets.items())},
+            "compressed": {path: record.to_dict() for path, record in sorted(self.compressed.items())}
+        }
+        with atomic_write(self.path) as f:
+            json.dump(data, f, indent=1)
+
+
+    def source_state(self, source: str) -> SourceState:
+        """Hash of `source` with its size and mtime, reusing the recorded hash when they match."""
+        record = self.pages.get(source)
+        if record:
+            stat = os.stat(source)
+            if record.size == stat.st_size and record.mtime_ns == stat.st_mtime_ns:
+                return SourceState(record.source_hash, record.size, record.mtime_ns)
+
+        return SourceState.read(source)
+
+
+    def is_fresh(
+        self,
+        source: str,
+        source_hash: str,
+        dest: str,
+        image_key: Callable[[str], str]|None = None
+    ) -> bool:
+        """Whether `dest` is still built from `source`; given `image_key`, also that its images are unchanged."""
+        record = self.pages.get(source)
+        if record is None:
+            return False
+        if image_key is not None and any(image_key(url) != key for url, key in record.images.items()):
+            return False
+
+        return record.source_hash == source_hash and record.dest == dest and os.path.exists(dest)
+
+
+    def record(self, source: str, state: SourceState, dest: str, images: dict[str, str]|None = None) -> None:
+        """Record `dest` as built from `source` as it was when `state` was read, not as it is now."""
+        self.pages[source] = PageRecord(state.source_hash, dest, state.size, state.mtime_ns, images)
+
+
+    def forget(self, source: str) -> PageRecord|None:
+        return self.pages.pop(source, None)
@@ -0,0 +1,141 @@
+from __future__ import annotations
+import json
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+
+STAGES = (
+    "static_copy",
+    "discovery",
+    "read",
+    "block_parse",
+    "inline_parse",
+    "serialize",
+    "template_fill",
+    "write",
+)
+
+# Stats of the build running in this process, if it is being profiled.
+# Deeply nested code (inline parsing) reports here instead of threading
+# a stats argument through every helper.
+active: BuildStats|None = None
+
+
+class StageStats:
+    def __init__(self) -> None:
+        self.seconds: float = 0.0
+        self.count: int = 0
+
+
+class BuildStats:
+    """Wall time and call counts per build stage, plus time per page and counters."""
+    def __init__(self) -> None:
+        self.stages: dict[str, StageStats] = {stage: StageStats() for stage in STAGES}
+        self.pages: dict[str, float] = {}
+        self.counters: dict[str, int] = {}
+
+
+    def add(self, stage: str, seconds: float, count: int = 1) -> None:
+        stats = self.stages.setdefault(stage, StageStats())
+        stats.seconds += seconds
+        stats.count += count
+
+
+    @contextmanager
+    def stage(self, name: str, count: int = 1) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start, count)
+
+
+    def count(self, name: str, amount: int = 1) -> None:
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+
+    def add_page(self, path: str, seconds: float) -> None:
+        self.pages[path] = seconds
+
+
+    def merge(self, other: BuildStats) -> None:
+        for name, stats in other.stages.items():
+            self.add(name, stats.seconds, stats.count)
+        self.pages.update(other.pages)
+        for name, amount in other.counters.items():
+            self.count(name, amount)
+
+
+    def outliers(self, limit: int = 5) -> list[tuple[str, float]]:
+        """The slowest pages, slowest first."""
+        return sorted(self.pages.items(), key=lambda x: x[1], reverse=True)[:limit]
+
+
+    def summary(self) -> str:
+        total = sum(stats.seconds for stats in self.stages.values())
+        lines = [f"{'stage':<14} {'count':>8} {'seconds':>10} {'share':>7}"]
+        for name, stats in self.stages.items():
+            share = stats.seconds / total * 100 if total else 0.0
+            lines.append(f"{name:<14} {stats.count:>8} {stats.seconds:>10.4f} {share:>6.1f}%")
+        if self.counters:
+            lines.append("")
+            for name, amount in sorted(self.counters.items()):
+                lines.append(f"{name:<23} {amount:>8}")
+        if self.pages:
+            lines.append("")
+            lines.append("slowest pages:")
+            for path, seconds in self.outliers():
+                lines.append(f"  {seconds:>8.4f}s  {path}")
+
+        return "\n".join(lines)
+
+
+    def to_dict(self) -> dict[str, object]:
+        return {
+            "stages": {
+                name: {"seconds": stats.seconds, "count": stats.count}
+                for name, stats in self.stages.items()
+            },
+            "pages": self.pages,
+            "counters": self.counters,
+        }
+
+
+    def dump_json(self, path: str) -> None:
+        with open(path, mode="wt") as f:
+            json.dump(self.to_dict(), f, indent=1)
+
+
+class Stopwatch:
+    """Splits consecutive sections of code into stages of an optional BuildStats.
+
+    `lap(stage)` charges the time since the previous lap to `stage`, minus
+    whatever was charged to `nested` stages in the meantime.
+    """
+    def __init__(self, stats: BuildStats|None) -> None:
+        self.stats: BuildStats|None = stats
+        self.start: float = time.perf_counter()
+        self.last: float = self.start
+        self.marks: dict[str, float] = self._marks()
+
+
+    def _marks(self) -> dict[str, float]:
+        if self.stats is None:
+            return {}
+        return {name: stats.seconds for name, stats in self.stats.stages.items()}
+
+
+    def lap(self, stage: str, *nested: str) -> None:
+        now = time.perf_counter()
+        if self.stats is not None:
+            seconds = now - self.last
+            for name in nested:
+                seconds -= self.stats.stages[name].seconds - self.marks.get(name, 0.0)
+            self.stats.add(stage, seconds)
+            self.marks = self._marks()
+        self.last = now
+
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.start
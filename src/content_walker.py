@@ -0,0 +1,139 @@
+from __future__ import annotations
+import hashlib
+import os
+from collections.abc import Iterable, Iterator
+from fnmatch import fnmatchcase
+
+
+IGNORE_FILE = ".ssgignore"
+MARKDOWN_EXTENSIONS = (".md", ".markdown")
+
+
+class WalkEntry:
+    """A file found by `walk`, with its `DirEntry` cached stat."""
+    __slots__ = ("path", "relative", "entry")
+
+    def __init__(self, path: str, relative: str, entry: os.DirEntry[str]) -> None:
+        self.path: str = path
+        self.relative: str = relative
+        self.entry: os.DirEntry[str] = entry
+
+
+    def stat(self) -> os.stat_result:
+        return self.entry.stat()
+
+
+def shard_of(relative: str, count: int) -> int:
+    """Which of `count` shards (numbered from 1) the file at `relative` belongs to.
+
+    Depends only on the path, with `/` separators, so every machine agrees.
+    """
+    digest = hashlib.sha256(relative.replace(os.sep, "/").encode()).digest()
+
+    return int.from_bytes(digest[:8], "big") % count + 1
+
+
+def _matches(relative: str, is_dir: bool, pattern: str) -> bool:
+    if pattern.endswith("/"):
+        if not is_dir:
+            return False
+        pattern = pattern.rstrip("/")
+    path = relative.replace(os.sep, "/")
+    if "/" not in pattern:
+        return fnmatchcase(path.rsplit("/", maxsplit=1)[-1], pattern)
+
+    return fnmatchcase(path, pattern.lstrip("/"))
+
+
+class WalkFilter:
+    """Which files `walk` yields.
+
+    Patterns are `fnmatch` globs in the spirit of .gitignore: without a `/`
+    they match the file or directory name at any depth, otherwise the path
+    relative to the walked root (where `*` may span directories); a trailing
+    `/` matches directories only. Excluded
+    directories are not descended into. Files must match one of `include`
+    (if any) and end with one of `extensions` (if given, case-insensitive).
+    With `shard` = (index, count) only the files `shard_of` assigns to that
+    shard pass. `drafts` is not checked here, as it needs the file's front
+    matter: page collection skips pages marked `draft: true` unless it is set.
+    """
+    def __init__(
+        self,
+        include: Iterable[str] = (),
+        exclude: Iterable[str] = (),
+        extensions: Iterable[str]|None = None,
+        shard: tuple[int, int]|None = None,
+        drafts: bool = True
+    ) -> None:
+        self.include: list[str] = list(include)
+        self.exclude: list[str] = list(exclude)
+        self.extensions: tuple[str, ...]|None = None if extensions is None \
+            else tuple(extension.lower() for extension in extensions)
+        self.shard: tuple[int, int]|None = shard
+        self.drafts: bool = drafts
+
+
+    def with_ignore_file(self, root: str) -> WalkFilter:
+        """This filter plus the patterns of `root`/.ssgignore, if there is one."""
+        path = os.path.join(root, IGNORE_FILE)
+        if not os.path.isfile(path):
+            return self
+        with open(path) as f:
+            patterns = [line.strip() for line in f]
+        exclude = self.exclude + [pattern for pattern in patterns if pattern and not pattern.startswith("#")]
+
+        return WalkFilter(self.include, exclude, self.extensions, self.shard, self.drafts)
+
+
+    def excludes(self, relative: str, is_dir: bool) -> bool:
+        return any(_matches(relative, is_dir, pattern) for pattern in self.exclude)
+
+
+    def accepts_file(self, relative: str) -> bool:
+        if os.path.basename(relative) == IGNORE_FILE:
+            return False
+        if self.extensions is not None and not relative.lower().endswith(self.extensions):
+            return False
+        if self.include and not any(_matches(relative, False, pattern) for pattern in self.include):
+            return False
+        if self.shard is not None and shard_of(relative, self.shard[1]) != self.shard[0]:
+            return False
+
+        return not self.excludes(relative, False)
+
+
+    def accepts(self, relative: str) -> bool:
+        """Whether `walk` would yield the file at `relative`, parents included."""
+        parent = os.path.dirname(relative)
+        while parent:
+            if self.excludes(parent, True):
+                return False
+            parent = os.path.dirname(parent)
+
+        return self.accepts_file(relative)
+
+
+def _walk(directory: str, prefix: str, walk_filter: WalkFilter) -> Iterator[WalkEntry]:
+    with os.scandir(directory) as it:
+        entries = sorted(it, key=lambda x: x.name)
+    for entry in entries:
+        relative = os.path.join(prefix, entry.name)
+        if entry.is_dir(follow_symlinks=False):
+            if not walk_filter.excludes(relative, True):
+                yield from _walk(entry.path, relative, walk_filter)
+        elif entry.is_file() and walk_filter.accepts_file(relative):
+            yield WalkEntry(entry.path, relative, entry)
+
+
+def walk(root: str, walk_filter: WalkFilter|None = None) -> Iterator[WalkEntry]:
+    """Yield the files under `root` that pass `walk_filter` and `root`/.ssgignore.
+
+    Directories are listed with `os.scandir`, so telling files from
+    directories costs no extra stat; entries are visited in name order,
+    depth first. Symlinked directories are not followed.
+    """
+    if not os.path.isdir(root):
+        raise ValueError(f"{root} does not exists")
+
+    return _walk(root, "", (walk_filter or WalkFilter()).with_ignore_file(root))
@@ -0,0 +1,271 @@
+import copy
+import hashlib
+import logging
+import mimetypes
+import os
+import threading
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import override
+from urllib.parse import unquote, urlsplit
+from content_walker import WalkFilter
+from image_pipeline import ImageIndex
+from page_generator import CONTENT_FILTER, publishable, read_markdown, render_page
+from watcher import Watcher, classify_changes
+
+
+LIVE_RELOAD_PATH = "/__livereload"
+LIVE_RELOAD_SCRIPT = f"<script>new EventSource(\"{LIVE_RELOAD_PATH}\").onmessage = () => location.reload();</script>"
+KEEPALIVE_SECONDS = 15.0
+
+logger = logging.getLogger(__name__)
+
+
+class RenderedPage:
+    __slots__ = ("body", "etag")
+
+    def __init__(self, body: bytes) -> None:
+        self.body: bytes = body
+        self.etag: str = f"\"{hashlib.sha1(body).hexdigest()}\""
+
+
+def inject_live_reload(html: str) -> str:
+    index = html.rfind("</body>")
+    if index == -1:
+        return html + LIVE_RELOAD_SCRIPT
+
+    return html[:index] + LIVE_RELOAD_SCRIPT + html[index:]
+
+
+def relative_url_path(url: str) -> str|None:
+    """The decoded request path relative to the site root, or None if it escapes it."""
+    parts = [part for part in unquote(urlsplit(url).path).split("/") if part]
+    if any(part in (".", "..") or os.sep in part for part in parts):
+        return None
+    relative = "/".join(parts)
+
+    return relative + "/" if url.split("?")[0].endswith("/") and relative else relative
+
+
+class DevSite:
+    """Pages rendered on demand from `content_path`, cached until their sources change.
+
+    `version` is bumped on every change, waking up `wait_for_change` callers.
+    """
+    def __init__(
+        self,
+        content_path: str,
+        static_path: str,
+        template_path: str,
+        basepath: str = "/",
+        walk_filter: WalkFilter = CONTENT_FILTER
+    ) -> None:
+        self.content_path: str = content_path
+        self.static_path: str = static_path
+        self.template_path: str = template_path
+        self.basepath: str = basepath
+        self.walk_filter: WalkFilter = walk_filter
+        # Sizes only: variants are not made for previews, static files are served as they are.
+        self.images: ImageIndex = ImageIndex()
+        if os.path.isdir(static_path):
+            _ = self.images.update(static_path, resize=False)
+        self.pages: dict[str, RenderedPage] = {}
+        self.version: int = 0
+        self.changed: threading.Condition = threading.Condition()
+        self._render_lock: threading.Lock = threading.Lock()
+
+
+    def find_source(self, relative: str) -> tuple[str, bool]|None:
+        """The markdown source for `relative` and whether it is a directory index."""
+        if relative == "" or relative.endswith("/"):
+            stems = [(relative + "index", True)]
+        elif relative.endswith(".html"):
+            stems = [(relative.removesuffix(".html"), False)]
+        else:
+            stems = [(relative, False), (relative + "/index", True)]
+        walk_filter = self.walk_filter.with_ignore_file(self.content_path)
+        for stem, is_index in stems:
+            for extension in walk_filter.extensions or (".md",):
+                candidate = os.path.join(*stem.split("/")) + extension
+                path = os.path.join(self.content_path, candidate)
+                if os.path.isfile(path) and walk_filter.accepts(candidate) and publishable(path, walk_filter):
+                    return path, is_index
+
+        return None
+
+
+    def find_static(self, relative: str) -> str|None:
+        if not relative or relative.endswith("/"):
+            return None
+        path = os.path.join(self.static_path, *relative.split("/"))
+
+        return path if os.path.isfile(path) else None
+
+
+    def render(self, source: str) -> RenderedPage:
+        page = self.pages.get(source)
+        if page is not None:
+            return page
+        with self._render_lock:
+            page = self.pages.get(source)
+            if page is None:
+                with self.changed:
+                    version, images = self.version, self.images
+                html = render_page(read_markdown(source), self.template_path, self.basepath, images=images)
+                page = RenderedPage(inject_live_reload(html).encode())
+                logger.debug("Rendered %s", source)
+                # A change that came in while rendering may have made this page stale already.
+                with self.changed:
+                    if self.version == version:
+                        self.pages[source] = page
+
+        return page
+
+
+    def on_change(self, changed: set[str]) -> None:
+        changes = classify_changes(changed, self.content_path, self.static_path, self.template_path)
+        logger.info("Changed: %s", ", ".join(sorted(changed)))
+        images = self.reindex_images() if changes.static else None
+        with self.changed:
+            if images is not None:
+                self.images = images
+            if changes.template or images is not None:
+                self.pages.clear()
+            for source in changes.content:
+                _ = self.pages.pop(source, None)
+            self.version += 1
+            self.changed.notify_all()
+
+
+    def reindex_images(self) -> ImageIndex|None:
+        """A new index of the images if any changed; the current one is left alone for pages being rendered."""
+        images = ImageIndex()
+        images.images = {url: copy.copy(info) for url, info in self.images.images.items()}
+        if not images.update(self.static_path, resize=False):
+            return None
+
+        return images
+
+
+    def wait_for_change(self, version: int, timeout: float) -> int:
+        with self.changed:
+            _ = self.changed.wait_for(lambda: self.version != version, timeout)
+            return self.version
+
+
+class DevRequestHandler(BaseHTTPRequestHandler):
+    site: DevSite
+    protocol_version: str = "HTTP/1.1"
+
+    @override
+    def log_message(self, format: str, *args: object) -> None:
+        logger.debug("%s - " + format, self.address_string(), *args)
+
+
+    def send_body(self, body: bytes, content_type: str, etag: str, head: bool = False) -> None:
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        if not head:
+            _ = self.wfile.write(body)
+
+
+    def send_text(self, status: HTTPStatus, text: str, headers: dict[str, str]|None = None) -> None:
+        body = text.encode()
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Type", "text/plain; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if self.command != "HEAD":
+            _ = self.wfile.write(body)
+
+
+    def stream_changes(self) -> None:
+        version = self.site.version
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        try:
+            while True:
+                current = self.site.wait_for_change(version, KEEPALIVE_SECONDS)
+                _ = self.wfile.write(b"data: reload\n\n" if current != version else b": keepalive\n\n")
+                self.wfile.flush()
+                version = current
+        except (BrokenPipeError, ConnectionResetError):
+            return
+
+
+    def serve(self, head: bool) -> None:
+        if urlsplit(self.path).path == LIVE_RELOAD_PATH:
+            return self.stream_changes()
+        relative = relative_url_path(self.path)
+        if relative is None:
+            return self.send_text(HTTPStatus.NOT_FOUND, "Not found")
+        found = self.site.find_source(relative)
+        if found is not None:
+            source, is_index = found
+            if is_index and relative and not relative.endswith("/"):
+                return self.send_text(HTTPStatus.FOUND, "Found", {"Location": f"/{relative}/"})
+            try:
+                page = self.site.render(source)
+            except Exception as e:
+                logger.error("Failed to render %s: %s", source, e)
+                return self.send_text(HTTPStatus.INTERNAL_SERVER_ERROR, f"{source}: {type(e).__name__}: {e}")
+            return self.send_body(page.body, "text/html; charset=utf-8", page.etag, head)
+        path = self.site.find_static(relative)
+        if path is None:
+            return self.send_text(HTTPStatus.NOT_FOUND, "Not found")
+        stat = os.stat(path)
+        etag = f"\"{stat.st_mtime_ns:x}-{stat.st_size:x}\""
+        content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        if self.headers.get("If-None-Match") == etag:
+            return self.send_body(b"", content_type, etag, head)
+        with open(path, mode="rb") as f:
+            self.send_body(f.read(), content_type, etag, head)
+
+
+    def do_GET(self) -> None:
+        self.serve(head=False)
+
+
+    def do_HEAD(self) -> None:
+        self.serve(head=True)
+
+
+def make_server(site: DevSite, host: str = "127.0.0.1", port: int = 8888) -> ThreadingHTTPServer:
+    handler = type("SiteRequestHandler", (DevRequestHandler,), {"site": site})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+
+    return server
+
+
+def serve(site: DevSite, host: str = "127.0.0.1", port: int = 8888) -> None:
+    """Serve `site` until interrupted, reloading browsers whenever a source changes."""
+    server = make_server(site, host, port)
+    stop = threading.Event()
+    watcher = Watcher([site.content_path, site.static_path, site.template_path])
+    thread = threading.Thread(target=watcher.run, args=(site.on_change, stop), daemon=True)
+    thread.start()
+    logger.info("Serving %s on http://%s:%d/, press Ctrl+C to stop.", site.content_path, host, server.server_port)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("Stopped serving.")
+    finally:
+        stop.set()
+        server.server_close()
@@ -1,32 +1,187 @@
+import logging
 import os
 import shutil
+import sys
+from atomic_write import replacing
+from build_manifest import AssetRecord, hash_file
+from content_walker import WalkFilter, walk
+from minify import minifier_for, minify_file
+
+
+logger = logging.getLogger(__name__)
 
 
 def delete_dir_content(path: str):
-    print(f"Deleting content of {path} directory...")
+    logger.info("Deleting content of %s directory...", path)
     shutil.rmtree(path, False)
-    print("Content succesfully deleted.")
+    logger.debug("Content succesfully deleted.")
 
 
 def copy_dir_content(path: str, destination: str):
     if not os.path.exists(path):
         raise ValueError(f"Given path does not exists: {path}")
-    if (not os.path.isdir(destination)) or (not os.path.exists(destination)):
-        print(f"Destianation: {destination} is not a file or doesn't exists, creating one...")
-        os.mkdir(destination)
-    print(f"coping file from {path} to {destination}")
-    dir_content = os.listdir(path)
-    print(f"Content of {path}: {dir_content}")
-    for content in dir_content:
-        content_path = os.path.join(path, content)
-        print(content_path)
-        if os.path.isfile(content_path):
-            print(f"Coping file: {content_path}")
-            shutil.copy(content_path, destination)
+    logger.debug("Coping files from %s to %s", path, destination)
+    for entry in walk(path):
+        target = os.path.join(destination, entry.relative)
+        logger.debug("Coping file: %s", entry.path)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        _ = shutil.copy(entry.path, target)
+
+
+DEPLOY_STRATEGIES = ("auto", "hardlink", "reflink", "copy_file_range", "copy")
+AUTO_STRATEGIES = ("hardlink", "reflink", "copy_file_range", "copy")
+FICLONE = 0x40049409
+
+
+def _hardlink(source: str, tmp_path: str) -> None:
+    if os.stat(source).st_dev != os.stat(os.path.dirname(tmp_path)).st_dev:
+        raise OSError("Source and destination are on different filesystems")
+    os.link(source, tmp_path)
+
+
+def _reflink(source: str, tmp_path: str) -> None:
+    if not sys.platform.startswith("linux"):
+        raise OSError("Reflinks are only supported on Linux")
+    import fcntl
+    with open(source, mode="rb") as src, open(tmp_path, mode="wb") as dst:
+        _ = fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+    shutil.copystat(source, tmp_path)
+
+
+def _copy_file_range(source: str, tmp_path: str) -> None:
+    if not hasattr(os, "copy_file_range"):
+        raise OSError("os.copy_file_range is not available")
+    with open(source, mode="rb") as src, open(tmp_path, mode="wb") as dst:
+        remaining = os.fstat(src.fileno()).st_size
+        while remaining > 0:
+            copied = os.copy_file_range(src.fileno(), dst.fileno(), remaining)
+            if copied == 0:
+                break
+            remaining -= copied
+    shutil.copystat(source, tmp_path)
+
+
+def _copy(source: str, tmp_path: str) -> None:
+    _ = shutil.copy2(source, tmp_path)
+
+
+DEPLOY_FUNCTIONS = {
+    "hardlink": _hardlink,
+    "reflink": _reflink,
+    "copy_file_range": _copy_file_range,
+    "copy": _copy,
+}
+
+
+def deploy_file(source: str, target: str, strategy: str = "copy") -> str:
+    """Place `source` at `target` and return the strategy that was used.
+
+    "auto" tries hardlink, reflink and copy_file_range in turn; any strategy
+    that is not supported for this pair of paths falls back to a plain copy.
+    The file is staged next to `target` and moved into place, so an existing
+    target (possibly a hardlink to an older source) is never written through.
+    """
+    if strategy not in DEPLOY_STRATEGIES:
+        raise ValueError(f"Unknown deploy strategy: {strategy}")
+    candidates = AUTO_STRATEGIES if strategy == "auto" else (strategy, "copy")
+    with replacing(target) as tmp_path:
+        for candidate in candidates:
+            try:
+                DEPLOY_FUNCTIONS[candidate](source, tmp_path)
+            except OSError:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                continue
+            return candidate
+        raise OSError(f"Could not deploy {source} to {target}")
+
+
+class SyncResult:
+    def __init__(self) -> None:
+        self.copied: list[str] = []
+        self.removed: list[str] = []
+        self.unchanged: list[str] = []
+        self.strategies: dict[str, int] = {}
+
+
+def list_files(path: str, walk_filter: WalkFilter|None = None) -> list[str]:
+    """Paths of every file under `path` that passes `walk_filter`, relative to it."""
+    return sorted(entry.relative for entry in walk(path, walk_filter))
+
+
+def is_unchanged(
+    source: str,
+    stat: os.stat_result,
+    target: str,
+    record: AssetRecord|None,
+    checksum: bool,
+    minified: bool = False
+) -> bool:
+    if record is None or record.minified != minified or not os.path.exists(target):
+        return False
+    if record.size != stat.st_size:
+        return False
+    if record.mtime_ns == stat.st_mtime_ns:
+        return True
+    if not checksum or record.source_hash is None:
+        return False
+
+    return record.source_hash == hash_file(source)
+
+
+def sync_dir_content(
+    path: str,
+    destination: str,
+    assets: dict[str, AssetRecord],
+    checksum: bool = False,
+    strategy: str = "copy",
+    walk_filter: WalkFilter|None = None,
+    minify: bool = False
+) -> SyncResult:
+    """Mirror `path` into `destination`, copying only new or changed files.
+
+    `assets` holds what the previous sync deployed (relative path -> record)
+    and is updated in place. A file is unchanged when its size and mtime
+    match the record, or with `checksum` when its content hash does. Files
+    recorded previously but gone from `path` are removed from `destination`;
+    anything else already in `destination` is left alone. Files are placed
+    with `deploy_file` using `strategy`; files rejected by `walk_filter` or
+    `path`/.ssgignore are not deployed. With `minify`, CSS and HTML files
+    are written minified instead (reported as the "minify" strategy).
+    """
+    if not os.path.exists(path):
+        raise ValueError(f"Given path does not exists: {path}")
+    result = SyncResult()
+    entries = {entry.relative: entry for entry in walk(path, walk_filter)}
+    for relative in sorted(assets):
+        if relative in entries:
+            continue
+        target = os.path.join(destination, relative)
+        if os.path.isfile(target):
+            os.remove(target)
+        del assets[relative]
+        result.removed.append(target)
+    for relative in sorted(entries):
+        source = entries[relative].path
+        target = os.path.join(destination, relative)
+        record = assets.get(relative)
+        stat = entries[relative].stat()
+        minified = minify and minifier_for(source) is not None
+        if is_unchanged(source, stat, target, record, checksum, minified):
+            if record:
+                record.mtime_ns = stat.st_mtime_ns
+            result.unchanged.append(target)
+            continue
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        if minified:
+            minify_file(source, target)
+            used = "minify"
         else:
-            print(f"Encounter dir {content}")
-            copy_dir_content(
-                content_path,
-                os.path.join(destination, content)
-            )
+            used = deploy_file(source, target, strategy)
+        result.strategies[used] = result.strategies.get(used, 0) + 1
+        assets[relative] = AssetRecord(
+            stat.st_size, stat.st_mtime_ns, hash_file(source) if checksum else None, minified
+        )
+        result.copied.append(target)
 
+    return result
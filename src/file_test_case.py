@@ -0,0 +1,32 @@
+import os
+import tempfile
+import unittest
+
+
+class FileTestCase(unittest.TestCase):
+    """Test case working in a fresh temporary directory, `self.root`, removed after each test."""
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.root: str = tmp.name
+
+
+    def path(self, relative: str) -> str:
+        """`relative` (with `/` separators) under `self.root`; absolute paths are kept."""
+        if os.path.isabs(relative):
+            return relative
+
+        return os.path.join(self.root, *relative.split("/"))
+
+
+    def write(self, path: str, data: str|bytes) -> None:
+        """Write `data` to `path`, relative to `self.root` unless absolute, creating its directory."""
+        path = self.path(path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, mode="wb" if isinstance(data, bytes) else "wt") as f:
+            _ = f.write(data)
+
+
+    def read(self, path: str) -> str:
+        with open(self.path(path)) as f:
+            return f.read()
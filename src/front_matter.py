@@ -0,0 +1,82 @@
+from collections.abc import Iterable, Iterator
+from itertools import chain
+
+
+YAML_FENCE = "---"
+TOML_FENCE = "+++"
+SEPARATORS = {YAML_FENCE: ":", TOML_FENCE: "="}
+
+FrontMatter = dict[str, str|list[str]]
+
+
+def parse_value(value: str) -> str|list[str]:
+    value = value.strip()
+    if value.startswith("[") and value.endswith("]"):
+        return [item.strip().strip("\"'") for item in value[1:-1].split(",") if item.strip()]
+    if len(value) >= 2 and value[0] == value[-1] and value[0] in "\"'":
+        return value[1:-1]
+
+    return value
+
+
+def parse_front_matter(lines: Iterable[str], separator: str = ":") -> FrontMatter:
+    """`key: value` (or `key = value`) lines; `[a, b]` values are lists, quotes are stripped.
+
+    Comments and anything else without the separator, such as TOML table
+    headers, are skipped.
+    """
+    front_matter: FrontMatter = {}
+    for line in lines:
+        key, found, value = line.partition(separator)
+        if not found or not key.strip() or line.lstrip().startswith("#"):
+            continue
+        front_matter[key.strip().lower()] = parse_value(value)
+
+    return front_matter
+
+
+def read_front_matter(lines: Iterator[str]) -> tuple[FrontMatter, Iterator[str]]:
+    """Read a leading `---` (YAML style) or `+++` (TOML style) block off `lines`.
+
+    Nothing after the closing fence is consumed, so for an open file only
+    the header is read. Returns the parsed block (empty if there is none,
+    or it is never closed) and the lines of the body.
+    """
+    first = next(lines, None)
+    if first is None:
+        return {}, lines
+    fence = first.rstrip()
+    if fence not in SEPARATORS:
+        return {}, chain([first], lines)
+    header: list[str] = []
+    for line in lines:
+        if line.rstrip() == fence:
+            return parse_front_matter(header, SEPARATORS[fence]), lines
+        header.append(line)
+
+    return {}, chain([first], header)
+
+
+def split_front_matter(markdown: str) -> tuple[FrontMatter, str]:
+    """`read_front_matter` for a whole document: the front matter and the markdown after it."""
+    if not markdown.startswith((YAML_FENCE, TOML_FENCE)):
+        return {}, markdown
+    front_matter, body = read_front_matter(iter(markdown.splitlines(keepends=True)))
+
+    return front_matter, "".join(body)
+
+
+def as_list(value: str|list[str]|None) -> list[str]:
+    """A front matter value as a list; `a, b` strings are split on commas."""
+    if value is None:
+        return []
+    if isinstance(value, list):
+        return value
+
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+def is_draft(front_matter: FrontMatter) -> bool:
+    draft = front_matter.get("draft")
+
+    return isinstance(draft, str) and draft.lower() in ("true", "yes")
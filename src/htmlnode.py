@@ -1,12 +1,17 @@
 from __future__ import annotations
 from abc import abstractmethod
 from collections.abc import Sequence
-from functools import reduce
-from typing import final, override
+from io import StringIO
+from typing import Protocol, final, override
 
 
+class Writer(Protocol):
+    def write(self, s: str, /) -> object: ...
+
 
 class HTMLNode:
+    __slots__ = ("tag", "value", "children", "props")
+
     def __init__(
         self,
         tag: str|None=None,
@@ -21,10 +26,17 @@ class HTMLNode:
 
 
     @abstractmethod
-    def to_html(self):  # pyright: ignore[reportUnknownParameterType]
+    def to_html_into(self, writer: Writer) -> None:
         raise NotImplementedError()
 
 
+    def to_html(self) -> str:
+        buffer = StringIO()
+        self.to_html_into(buffer)
+
+        return buffer.getvalue()
+
+
     def props_to_html(self) -> str:
         if not self.props:
             return ""
@@ -38,6 +50,8 @@ class HTMLNode:
 
 @final
 class LeafNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(
         self,
         tag: str|None,
@@ -48,20 +62,24 @@ class LeafNode(HTMLNode):
 
 
     @override
-    def to_html(self) -> str|Exception:
+    def to_html_into(self, writer: Writer) -> None:
         if self.value is None:
             raise ValueError("All leaf nodes must have a value")
         elif not self.tag:
-            return self.value
+            _ = writer.write(self.value)
         elif self.tag == "img":
             if self.value != "":
                 raise ValueError("Image node shouldn't have a value")
-            return f"<{self.tag}{self.props_to_html()} />"
+            _ = writer.write(f"<{self.tag}{self.props_to_html()} />")
         else:
-            return f"<{self.tag}{self.props_to_html()}>{self.value}</{self.tag}>"
+            _ = writer.write(f"<{self.tag}{self.props_to_html()}>")
+            _ = writer.write(self.value)
+            _ = writer.write(f"</{self.tag}>")
 
 
 class ParentNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(
         self,
         tag: str,
@@ -72,23 +90,12 @@ class ParentNode(HTMLNode):
 
 
     @override
-    def to_html(self) -> str|Exception:
+    def to_html_into(self, writer: Writer) -> None:
         if not self.tag:
             raise ValueError("All parent nodes must have a tag")
         elif not self.children:
             raise ValueError("All parent nodes must have a children")
-        else:
-            children_html = reduce(
-                lambda acc, next_node: acc + next_node.to_html(),
-                self.children,
-                ""
-            )
-            # accumlator:str = ""
-            # for child in self.children:
-            #         accumlator += child.to_html()
-            return LeafNode(self.tag, children_html, self.props).to_html()
-
-
-
-
-
+        _ = writer.write(f"<{self.tag}{self.props_to_html()}>")
+        for child in self.children:
+            child.to_html_into(writer)
+        _ = writer.write(f"</{self.tag}>")
@@ -0,0 +1,352 @@
+from __future__ import annotations
+import hashlib
+import json
+import logging
+import os
+import struct
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import BinaryIO, override
+from atomic_write import atomic_write, replacing
+from build_manifest import hash_file
+from content_walker import WalkFilter, walk
+from file_deploy import deploy_file
+
+try:
+    from PIL import Image  # pyright: ignore[reportMissingImports]
+except ImportError:
+    Image = None
+
+
+# Part of every variant key and of the saved index.
+IMAGE_PIPELINE_VERSION = "1"
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".gif", ".webp")
+RESIZABLE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".webp")
+VARIANT_WIDTHS = (480, 960, 1440)
+QUALITY = 82
+IMAGE_FILTER = WalkFilter(extensions=IMAGE_EXTENSIONS)
+
+logger = logging.getLogger(__name__)
+
+
+def can_resize() -> bool:
+    """Whether variants can be made here: that needs Pillow, which is optional."""
+    return Image is not None
+
+
+def _jpeg_size(f: BinaryIO) -> tuple[int, int]|None:
+    _ = f.seek(2)
+    while True:
+        marker = f.read(2)
+        if len(marker) < 2 or marker[0] != 0xFF:
+            return None
+        while marker[1] == 0xFF:
+            marker = marker[1:] + f.read(1)
+        length = f.read(2)
+        if len(length) < 2:
+            return None
+        if 0xC0 <= marker[1] <= 0xCF and marker[1] not in (0xC4, 0xC8, 0xCC):
+            header = f.read(5)
+            if len(header) < 5:
+                return None
+            height, width = struct.unpack(">HH", header[1:5])
+            return width, height
+        _ = f.seek(struct.unpack(">H", length)[0] - 2, os.SEEK_CUR)
+
+
+def image_size(path: str) -> tuple[int, int]|None:
+    """(width, height) of a PNG, GIF, JPEG or WebP image read from its header, or None."""
+    with open(path, mode="rb") as f:
+        head = f.read(30)
+        if head.startswith(b"\x89PNG\r\n\x1a\n") and head[12:16] == b"IHDR":
+            return struct.unpack(">II", head[16:24])
+        if head[:6] in (b"GIF87a", b"GIF89a"):
+            return struct.unpack("<HH", head[6:10])
+        if head.startswith(b"\xff\xd8"):
+            return _jpeg_size(f)
+        if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+            chunk = head[12:16]
+            if chunk == b"VP8 ":
+                width, height = struct.unpack("<HH", head[26:30])
+                return width & 0x3FFF, height & 0x3FFF
+            if chunk == b"VP8L":
+                bits = int.from_bytes(head[21:25], "little")
+                return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+            if chunk == b"VP8X":
+                return int.from_bytes(head[24:27], "little") + 1, int.from_bytes(head[27:30], "little") + 1
+
+    return None
+
+
+def variant_url(url: str, width: int) -> str:
+    """`/images/a.png` -> `/images/a-480w.png`."""
+    stem, extension = os.path.splitext(url)
+
+    return f"{stem}-{width}w{extension}"
+
+
+def variant_key(source_hash: str, width: int, extension: str) -> str:
+    """Content address of the `width` variant of an image whose content hash is `source_hash`."""
+    digest = hashlib.sha256(f"{IMAGE_PIPELINE_VERSION}\0{QUALITY}\0{width}\0{source_hash}".encode())
+
+    return digest.hexdigest() + extension.lower()
+
+
+def make_variant(source: str, width: int, target: str) -> None:
+    """Write `source` scaled down to `width` pixels wide to `target`, atomically."""
+    assert Image is not None
+    with replacing(target) as tmp_path, Image.open(source) as image:
+        height = max(1, round(image.height * width / image.width))
+        resized = image.resize((width, height), Image.Resampling.LANCZOS)
+        resized.save(tmp_path, format=image.format, optimize=True, quality=QUALITY)
+
+
+class ImageInfo:
+    def __init__(
+        self,
+        width: int,
+        height: int,
+        variants: list[int]|None = None,
+        source_hash: str = "",
+        size: int = 0,
+        mtime_ns: int = 0
+    ) -> None:
+        self.width: int = width
+        self.height: int = height
+        # Widths of the scaled-down copies, served next to the original as `variant_url`.
+        self.variants: list[int] = variants or []
+        self.source_hash: str = source_hash
+        self.size: int = size
+        self.mtime_ns: int = mtime_ns
+
+
+    def to_dict(self) -> dict[str, object]:
+        return {
+            "width": self.width,
+            "height": self.height,
+            "variants": self.variants,
+            "hash": self.source_hash,
+            "size": self.size,
+            "mtime_ns": self.mtime_ns,
+        }
+
+
+    @classmethod
+    def from_dict(cls, data: dict[str, object]) -> ImageInfo:
+        return cls(
+            int(data["width"]),  # pyright: ignore[reportArgumentType]
+            int(data["height"]),  # pyright: ignore[reportArgumentType]
+            [int(width) for width in data.get("variants") or []],  # pyright: ignore[reportGeneralTypeIssues]
+            str(data.get("hash") or ""),
+            int(data.get("size") or 0),  # pyright: ignore[reportArgumentType]
+            int(data.get("mtime_ns") or 0),  # pyright: ignore[reportArgumentType]
+        )
+
+
+class ImageIndex:
+    """Dimensions and variants of every image under the static directory, keyed by URL.
+
+    Rendering reads it to size `<img>` tags; `key` tells what is emitted for
+    one image, so output is cached per image shown. `digest` changes
+    whenever anything in the index does; indexes compare by it.
+    """
+    def __init__(self, path: str|None = None) -> None:
+        self.path: str|None = path
+        self.images: dict[str, ImageInfo] = {}
+        # Deployed variant path -> content address it was deployed from.
+        self.outputs: dict[str, str] = {}
+        self.digest: str = self.compute_digest()
+
+
+    @override
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, ImageIndex) and other.digest == self.digest
+
+
+    def key(self, url: str) -> str:
+        """What `<img>` tags for `url` are rendered from, for cache keys; empty for an image not indexed."""
+        info = self.images.get(url)
+        if info is None:
+            return ""
+
+        return f"{info.width}x{info.height}" + "".join(f",{width}w" for width in info.variants)
+
+
+    def compute_digest(self) -> str:
+        data = {url: [info.width, info.height, info.variants] for url, info in sorted(self.images.items())}
+
+        return hashlib.sha256(json.dumps(data).encode()).hexdigest()
+
+
+    @classmethod
+    def load(cls, path: str) -> ImageIndex:
+        index = cls(path)
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return index
+        if data.get("version") != IMAGE_PIPELINE_VERSION:
+            return index
+        index.images = {url: ImageInfo.from_dict(info) for url, info in data.get("images", {}).items()}
+        index.outputs = dict(data.get("outputs", {}))
+        index.digest = index.compute_digest()
+
+        return index
+
+
+    def save(self) -> None:
+        assert self.path is not None
+        data = {
+            "version": IMAGE_PIPELINE_VERSION,
+            "images": {url: info.to_dict() for url, info in sorted(self.images.items())},
+            "outputs": dict(sorted(self.outputs.items())),
+        }
+        with atomic_write(self.path) as f:
+            json.dump(data, f, indent=1)
+
+
+    def update(self, static_path: str, resize: bool|None = None) -> list[str]:
+        """Re-read the images under `static_path` that changed; returns their URLs.
+
+        Images whose size and mtime match are not opened. Variants are
+        planned for every width in VARIANT_WIDTHS narrower than the image,
+        when `resize` (default: `can_resize()`) is set.
+        """
+        resize = can_resize() if resize is None else resize
+        found: dict[str, ImageInfo] = {}
+        changed: list[str] = []
+        for entry in walk(static_path, IMAGE_FILTER):
+            url = "/" + entry.relative.replace(os.sep, "/")
+            stat = entry.stat()
+            info = self.images.get(url)
+            if info is None or info.size != stat.st_size or info.mtime_ns != stat.st_mtime_ns:
+                size = image_size(entry.path)
+                if size is None:
+                    logger.warning("Cannot read the dimensions of %s", entry.path)
+                    continue
+                info = ImageInfo(*size, source_hash=hash_file(entry.path), size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+                changed.append(url)
+            widths: list[int] = []
+            if resize and url.lower().endswith(RESIZABLE_EXTENSIONS):
+                widths = [width for width in VARIANT_WIDTHS if width < info.width]
+            if widths != info.variants and url not in changed:
+                changed.append(url)
+            info.variants = widths
+            found[url] = info
+        self.images = found
+        self.digest = self.compute_digest()
+
+        return changed
+
+
+class ImageResult:
+    def __init__(self) -> None:
+        self.generated: list[str] = []
+        self.cached: list[str] = []
+        self.unchanged: list[str] = []
+        self.removed: list[str] = []
+        # Source image of every variant that could not be made.
+        self.failed: list[str] = []
+        # Content addresses of the variants made in this build.
+        self.made: set[str] = set()
+
+
+def cached_variant(cache_dir: str, key: str) -> str:
+    return os.path.join(cache_dir, key[:2], key)
+
+
+def make_variants(
+    index: ImageIndex,
+    static_path: str,
+    cache_dir: str,
+    jobs: int = 1,
+    result: ImageResult|None = None
+) -> ImageResult:
+    """Make the variants `index` plans that `cache_dir` does not have yet, on `jobs` processes.
+
+    A variant that cannot be made is logged and its width dropped from the
+    image's `variants`, updating `digest`, so pages rendered afterwards do
+    not point at it. Run it before rendering; it is tried again next build.
+    """
+    result = result or ImageResult()
+    sources: dict[str, tuple[str, int]] = {}
+    for url, info in index.images.items():
+        source = os.path.join(static_path, *url.lstrip("/").split("/"))
+        for width in info.variants:
+            sources[variant_key(info.source_hash, width, os.path.splitext(url)[1])] = (source, width)
+    missing = sorted(key for key in sources if not os.path.exists(cached_variant(cache_dir, key)))
+    errors: set[str] = set()
+
+    def failed(key: str, error: BaseException) -> None:
+        source, width = sources[key]
+        logger.error("Cannot make the %dw variant of %s: %s", width, source, error)
+        result.failed.append(source)
+        errors.add(key)
+
+    if jobs > 1 and len(missing) > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            futures = {
+                executor.submit(make_variant, *sources[key], cached_variant(cache_dir, key)): key for key in missing
+            }
+            for future in as_completed(futures):
+                error = future.exception()
+                if error is not None:
+                    failed(futures[future], error)
+    else:
+        for key in missing:
+            try:
+                make_variant(*sources[key], cached_variant(cache_dir, key))
+            except Exception as e:
+                failed(key, e)
+    result.failed.sort()
+    result.made.update(key for key in missing if key not in errors)
+    if errors:
+        for url, info in index.images.items():
+            extension = os.path.splitext(url)[1]
+            info.variants = [
+                width for width in info.variants if variant_key(info.source_hash, width, extension) not in errors
+            ]
+        index.digest = index.compute_digest()
+
+    return result
+
+
+def deploy_variants(
+    index: ImageIndex,
+    static_path: str,
+    dest_path: str,
+    cache_dir: str,
+    jobs: int = 1,
+    strategy: str = "copy",
+    result: ImageResult|None = None
+) -> ImageResult:
+    """Place every variant `index` plans under `dest_path`, making only those not cached yet.
+
+    Variants live in `cache_dir` under their content address (`variant_key`),
+    so an image that did not change is never processed again, whatever it
+    is called and however often the output is wiped. Missing variants are
+    made with `make_variants` (`result` is what an earlier call returned),
+    then deployed with `deploy_file`. Variants of images that are gone or
+    changed, or could not be made, are removed from `dest_path`.
+    """
+    result = make_variants(index, static_path, cache_dir, jobs, result)
+    wanted: dict[str, str] = {}
+    for url, info in index.images.items():
+        for width in info.variants:
+            key = variant_key(info.source_hash, width, os.path.splitext(url)[1])
+            wanted[os.path.join(dest_path, *variant_url(url, width).lstrip("/").split("/"))] = key
+    for output in sorted(set(index.outputs) - set(wanted)):
+        if os.path.exists(output):
+            os.remove(output)
+        result.removed.append(output)
+        del index.outputs[output]
+    for output, key in sorted(wanted.items()):
+        if index.outputs.get(output) == key and os.path.exists(output):
+            result.unchanged.append(output)
+            continue
+        os.makedirs(os.path.dirname(output), exist_ok=True)
+        _ = deploy_file(cached_variant(cache_dir, key), output, strategy)
+        index.outputs[output] = key
+        (result.generated if key in result.made else result.cached).append(output)
+
+    return result
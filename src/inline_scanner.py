@@ -0,0 +1,73 @@
+import re
+from collections.abc import Iterator
+from typing import NamedTuple
+from textnode import TextNode, TextType
+
+
+DELIMITERS: dict[str, TextType] = {
+    "**": TextType.BOLD,
+    "_": TextType.ITALIC,
+    "`": TextType.CODE,
+}
+MARKER_REGEX = re.compile(r"!\[|\[|\*\*|_|`")
+# `[text](url)`, optionally prefixed with `!` for images. The text may hold a
+# `]` but not a `[`, the URL runs up to the first `)` and holds no `[`, so
+# every character can be matched only one way and a failed attempt stops at
+# the next `[`: lines full of unmatched brackets are scanned in linear time.
+LINK_REGEX = re.compile(r"(!?)\[((?:[^\[\]\n]|\](?!\())*)\]\(([^)\[\n]*)\)")
+
+
+class LinkMatch(NamedTuple):
+    start: int
+    end: int
+    image: bool
+    text: str
+    url: str
+
+
+def iter_markdown_links(text: str) -> Iterator[LinkMatch]:
+    """Every markdown link and image in `text`, left to right, in one pass."""
+    if "](" not in text:
+        return
+    for match in LINK_REGEX.finditer(text):
+        yield LinkMatch(match.start(), match.end(), match.group(1) == "!", match.group(2), match.group(3))
+
+
+def scan_inline(text: str) -> list[TextNode]:
+    """Split inline markdown into text nodes in a single left-to-right walk.
+
+    Produces the same node stream as the chained `split_nodes_*` passes:
+    images and links are recognised first where they start, delimited
+    spans are not parsed any further and empty nodes are dropped.
+    """
+    nodes: list[TextNode] = []
+    start = 0
+    position = 0
+    while (marker := MARKER_REGEX.search(text, position)) is not None:
+        token = marker.group()
+        index = marker.start()
+        if token == "![" or token == "[":
+            match = LINK_REGEX.match(text, index)
+            if match is None:
+                position = index + len(token)
+                continue
+            if start < index:
+                nodes.append(TextNode(text[start:index], TextType.TEXT))
+            text_type = TextType.IMAGE if match.group(1) else TextType.LINK
+            nodes.append(TextNode(match.group(2), text_type, match.group(3)))
+            start = position = match.end()
+            continue
+        closing = text.find(token, index + len(token))
+        if closing == -1:
+            message = f"Invalid Markdown syntax, delimiter: {token}" \
+            + f" should have a closing pair in: {text[index + len(token):]}"
+            raise Exception(message)
+        if start < index:
+            nodes.append(TextNode(text[start:index], TextType.TEXT))
+        if closing > index + len(token):
+            nodes.append(TextNode(text[index + len(token):closing], DELIMITERS[token]))
+        start = position = closing + len(token)
+    if start < len(text):
+        nodes.append(TextNode(text[start:], TextType.TEXT))
+
+    return nodes
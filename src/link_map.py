@@ -0,0 +1,89 @@
+from collections import OrderedDict
+from collections.abc import Iterable
+from image_pipeline import ImageIndex, variant_url
+
+
+LINK_MAPS = 8
+# Basepath of the trees `parse_page` builds and caches, so their keys hold no real basepath;
+# `fill_page` writes the page's basepath in its place.
+BASEPATH_MARK = "\0"
+
+
+class LinkMap:
+    """Where each link target in the markdown is served, given the site's basepath.
+
+    Root-relative URLs (`/images/a.png`) get the basepath; relative,
+    protocol-relative (`//host/x`), absolute and fragment-only URLs are kept
+    as written. Every URL is resolved once and then looked up in `urls`.
+    With an `images` index, images it knows are given their dimensions and
+    responsive variants; `context` keys output on only the images it shows.
+    """
+    def __init__(self, basepath: str = "/", images: ImageIndex|None = None) -> None:
+        self.basepath: str = basepath
+        self.images: ImageIndex|None = images
+        self.urls: dict[str, str] = {}
+        # What all rendered output depends on, for cache keys; see `context` for images.
+        self.key: str = basepath
+
+
+    def resolve(self, url: str) -> str:
+        resolved = self.urls.get(url)
+        if resolved is None:
+            if url.startswith("/") and not url.startswith("//"):
+                resolved = self.basepath + url[1:]
+            else:
+                resolved = url
+            self.urls[url] = resolved
+
+        return resolved
+
+
+    def image_key(self, url: str) -> str:
+        """`ImageIndex.key` of the image at `url`, empty without an index."""
+        return self.images.key(url) if self.images else ""
+
+
+    def context(self, image_urls: Iterable[str]) -> str:
+        """Cache key context of output showing the images at `image_urls`: `key` and what each of them renders as."""
+        keys = {url: self.image_key(url) for url in image_urls}
+
+        return self.key + "".join(f"\0{url}\0{key}" for url, key in sorted(keys.items()) if key)
+
+
+    def image_props(self, url: str, alt: str) -> dict[str, str]:
+        """Attributes of the `<img>` for `url`: size, `srcset` and lazy loading when the image is indexed."""
+        props = {"src": self.resolve(url), "alt": alt}
+        info = self.images.images.get(url) if self.images else None
+        if info is None:
+            return props
+        props["width"] = str(info.width)
+        props["height"] = str(info.height)
+        if info.variants:
+            candidates = [f"{self.resolve(variant_url(url, width))} {width}w" for width in info.variants]
+            candidates.append(f"{props['src']} {info.width}w")
+            props["srcset"] = ", ".join(candidates)
+            props["sizes"] = f"(max-width: {info.width}px) 100vw, {info.width}px"
+        props["loading"] = "lazy"
+
+        return props
+
+
+_link_maps: OrderedDict[tuple[str, str|None], LinkMap] = OrderedDict()
+
+
+def link_map(basepath: str, images: ImageIndex|None = None) -> LinkMap:
+    """The link map of this process for `basepath` and the `images` index as it is now.
+
+    Maps are kept per `(basepath, images.digest)`, the last LINK_MAPS used,
+    so an index updated since never gets a map made from its old state.
+    """
+    key = (basepath, images.digest if images else None)
+    links = _link_maps.get(key)
+    if links is None:
+        links = _link_maps[key] = LinkMap(basepath, images)
+        if len(_link_maps) > LINK_MAPS:
+            _ = _link_maps.popitem(last=False)
+    else:
+        _link_maps.move_to_end(key)
+
+    return links
@@ -1,22 +1,512 @@
-import sys
+import argparse
+import asyncio
+import cProfile
+import logging
 import os
-from file_deploy import delete_dir_content, copy_dir_content
-from page_generator import generate_pages_recursive
+import sys
+from contextlib import nullcontext
+from async_build import DEFAULT_IO_WORKERS, build_site
+from build_log import LOG_FORMATS, configure_logging, log_stages
+from build_manifest import BuildManifest, hash_file
+from build_stats import BuildStats
+from content_walker import IGNORE_FILE, MARKDOWN_EXTENSIONS, WalkFilter
+from dev_server import DevSite, serve
+from file_deploy import DEPLOY_STRATEGIES, SyncResult, delete_dir_content, sync_dir_content
+from image_pipeline import ImageIndex, ImageResult, can_resize, deploy_variants, make_variants
+from minify import minified_template
+from page_generator import BuildResult, generate_pages_incremental, update_pages
+from precompress import precompress, remove_sidecars
+from render_cache import RenderCache
+from shards import SHARD_MANIFEST, SHARDS_PATH, ShardMergeError, merge_shards, parse_shard, shard_dir
+from site_index import SiteIndex, generate_listings, site_template
+from watcher import Watcher, classify_changes
+
+
+MANIFEST_PATH = ".ssg/manifest.json"
+RENDER_CACHE_PATH = ".ssg/render-cache"
+SITE_INDEX_PATH = ".ssg/site-index.json"
+MINIFIED_PATH = ".ssg/minified"
+SITE_TEMPLATE_PATH = ".ssg/site-template"
+IMAGE_INDEX_PATH = ".ssg/images.json"
+IMAGE_CACHE_PATH = ".ssg/image-cache"
+CONTENT_PATH = "content"
+STATIC_PATH = "static"
+TEMPLATE_PATH = "template.html"
+DEST_PATH = "docs"
+
+logger = logging.getLogger(__name__)
+
+
+def parse_args(argv: list[str]|None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Generate the static site into docs/. Run `main.py serve` to preview it instead."
+    )
+    _ = parser.add_argument("basepath", nargs="?", default="/", help="URL prefix the site is served under")
+    _ = parser.add_argument(
+        "--full",
+        action="store_true",
+        help="wipe docs/ and the build manifest and regenerate every page"
+    )
+    _ = parser.add_argument(
+        "-j", "--jobs",
+        type=int,
+        default=1,
+        help="number of worker processes used to render pages (0 = one per CPU)"
+    )
+    _ = parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="keep running and rebuild whatever content/, static/ or template.html changes affect"
+    )
+    _ = parser.add_argument(
+        "--checksum",
+        action="store_true",
+        help="compare static files by content hash when their mtime changed"
+    )
+    _ = parser.add_argument(
+        "--deploy-strategy",
+        choices=DEPLOY_STRATEGIES,
+        default="copy",
+        help="how static files are placed in docs/; auto prefers hardlink, reflink, copy_file_range"
+    )
+    _ = parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="print wall time and counts per build stage and the slowest pages"
+    )
+    _ = parser.add_argument(
+        "--profile-output",
+        metavar="PATH",
+        help="with --profile, write the stage stats as JSON, or a cProfile dump if PATH ends in .prof "
+        + "(cProfile only sees the main process, use --jobs 1)"
+    )
+    _ = parser.add_argument(
+        "--async",
+        dest="use_async",
+        action="store_true",
+        help="sync static files while rendering pages and overlap page reads and writes with rendering"
+    )
+    _ = parser.add_argument(
+        "--io-workers",
+        type=int,
+        default=DEFAULT_IO_WORKERS,
+        help="with --async, number of threads reading and writing files"
+    )
+    sharding = parser.add_mutually_exclusive_group()
+    _ = sharding.add_argument(
+        "--shard",
+        type=parse_shard,
+        metavar="I/N",
+        help=f"render only the I-th of N slices of content/ into {SHARDS_PATH}/I-of-N/ with a partial manifest"
+    )
+    _ = sharding.add_argument(
+        "--merge-shards",
+        type=int,
+        metavar="N",
+        help="check that the N shards together rendered every page and assemble them into docs/"
+    )
+    _ = parser.add_argument(
+        "--include",
+        action="append",
+        default=[],
+        metavar="GLOB",
+        help="only render content files matching GLOB (repeatable)"
+    )
+    _ = parser.add_argument(
+        "--exclude",
+        action="append",
+        default=[],
+        metavar="GLOB",
+        help=f"skip content files and directories matching GLOB (repeatable), like lines of {IGNORE_FILE}"
+    )
+    verbosity = parser.add_mutually_exclusive_group()
+    _ = verbosity.add_argument(
+        "-q", "--quiet",
+        action="store_true",
+        help="only log warnings and failed pages"
+    )
+    _ = verbosity.add_argument(
+        "-v", "--verbose",
+        action="store_true",
+        help="log every page rendered and file copied"
+    )
+    _ = parser.add_argument(
+        "--log-format",
+        choices=LOG_FORMATS,
+        default="text",
+        help="json writes one JSON object per line, including a summary record per build stage"
+    )
+    _ = parser.add_argument(
+        "--minify",
+        action="store_true",
+        help=f"minify pages (via a minified copy of the template in {MINIFIED_PATH}) and static CSS and HTML"
+    )
+    _ = parser.add_argument(
+        "--precompress",
+        action="store_true",
+        help="write a .gz sidecar next to every HTML, CSS, JS, XML and SVG output, for servers that serve them as is"
+    )
+    _ = parser.add_argument(
+        "--drafts",
+        action="store_true",
+        help="also build pages whose front matter sets draft: true"
+    )
+    _ = parser.add_argument(
+        "--site-url",
+        default="",
+        metavar="URL",
+        help="absolute URL of the site, e.g. https://example.com; "
+        + "the Atom feed and sitemap are only written when it is set"
+    )
+    _ = parser.add_argument(
+        "--no-render-cache",
+        action="store_true",
+        help=f"do not reuse parsed pages or rendered blocks from {RENDER_CACHE_PATH}"
+    )
+
+    return parser.parse_args(argv)
+
+
+def parse_serve_args(argv: list[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="main.py serve",
+        description="Preview the site: render pages from content/ on request and reload browsers on changes."
+    )
+    _ = parser.add_argument("--host", default="127.0.0.1", help="address to listen on")
+    _ = parser.add_argument("-p", "--port", type=int, default=8888, help="port to listen on")
+    _ = parser.add_argument("-v", "--verbose", action="store_true", help="log every request and render")
+    _ = parser.add_argument("--include", action="append", default=[], metavar="GLOB", help="as for builds")
+    _ = parser.add_argument("--exclude", action="append", default=[], metavar="GLOB", help="as for builds")
+    parser.set_defaults(drafts=True)
+
+    return parser.parse_args(argv)
+
+
+def serve_main(argv: list[str]) -> None:
+    args = parse_serve_args(argv)
+    configure_logging(1 if args.verbose else 0)
+    site = DevSite(CONTENT_PATH, STATIC_PATH, TEMPLATE_PATH, "/", content_filter(args))
+    serve(site, args.host, args.port)
+
+
+def report_sync(result: SyncResult) -> None:
+    strategies = ", ".join(f"{name}: {count}" for name, count in sorted(result.strategies.items()))
+    logger.info(
+        "Static files copied: %d, unchanged: %d, removed: %d%s",
+        len(result.copied), len(result.unchanged), len(result.removed),
+        f" (deployed via {strategies})" if strategies else "",
+        extra={"fields": {
+            "event": "static_sync",
+            "copied": len(result.copied),
+            "unchanged": len(result.unchanged),
+            "removed": len(result.removed),
+            "strategies": result.strategies,
+        }}
+    )
+
+
+def report(result: BuildResult, stats: BuildStats) -> None:
+    logger.info(
+        "Pages rendered: %d, unchanged: %d, removed: %d",
+        len(result.rendered), len(result.skipped), len(result.removed),
+        extra={"fields": {
+            "event": "pages",
+            "rendered": len(result.rendered),
+            "unchanged": len(result.skipped),
+            "removed": len(result.removed),
+            "failed": len(result.errors),
+        }}
+    )
+    for name, label in (("ast_cache", "Parse cache"), ("render_cache", "Render cache")):
+        hits = stats.counters.get(f"{name}_hits", 0)
+        misses = stats.counters.get(f"{name}_misses", 0)
+        if hits + misses:
+            logger.info(
+                "%s: %d hits, %d misses (%.0f%% hit rate)", label, hits, misses, hits / (hits + misses) * 100,
+                extra={"fields": {"event": "cache", "cache": name, "hits": hits, "misses": misses}}
+            )
+    if result.errors:
+        logger.error("%d page(s) failed:", len(result.errors))
+        for error in result.errors:
+            logger.error(
+                "  %s", error,
+                extra={"fields": {"event": "page_failed", "source": error.source, "dest": error.dest}}
+            )
+
+
+def render_cache_dir(args: argparse.Namespace) -> str|None:
+    return None if args.no_render_cache else os.path.join(os.getcwd(), RENDER_CACHE_PATH)
+
+
+def content_filter(args: argparse.Namespace, shard: tuple[int, int]|None = None) -> WalkFilter:
+    return WalkFilter(args.include, args.exclude, MARKDOWN_EXTENSIONS, shard, args.drafts)
+
+
+def load_site_index() -> SiteIndex:
+    return SiteIndex.load(os.path.join(os.getcwd(), SITE_INDEX_PATH))
+
+
+def page_template(args: argparse.Namespace, index: SiteIndex) -> str:
+    """The template pages are built from: TEMPLATE_PATH, or its minified copy with --minify,
+    with the site-wide slots filled in from `index`.
+    """
+    template_path = minified_template(TEMPLATE_PATH, MINIFIED_PATH) if args.minify else TEMPLATE_PATH
+
+    return site_template(template_path, index, CONTENT_PATH, SITE_TEMPLATE_PATH)
+
+
+def update_site_index(
+    args: argparse.Namespace,
+    manifest: BuildManifest,
+    index: SiteIndex,
+    result: BuildResult,
+    basepath: str,
+    jobs: int,
+    stats: BuildStats,
+    cache_dir: str|None,
+    walk_filter: WalkFilter,
+    images: ImageIndex
+) -> None:
+    """Index the metadata of the pages just rendered, then write the blog index, tag pages and feed from it.
+
+    When that changes what the template's site-wide slots show, every page
+    is rendered again with them and `result` takes in the second pass.
+    """
+    with stats.stage("site_index"):
+        updated, read = index.update(manifest, DEST_PATH, result.metadata)
+        template_path = page_template(args, index)
+    if hash_file(template_path) != manifest.template_hash:
+        logger.info("Site-wide template slots changed, rendering every page again.")
+        again = generate_pages_incremental(
+            CONTENT_PATH, template_path, DEST_PATH, basepath, manifest, jobs, stats, cache_dir, walk_filter, images
+        )
+        result.merge(again)
+        manifest.save()
+        with stats.stage("site_index"):
+            _ = index.update(manifest, DEST_PATH, again.metadata)
+    with stats.stage("site_index"):
+        written = generate_listings(index, manifest, CONTENT_PATH, template_path, DEST_PATH, basepath, args.site_url)
+        index.save()
+    logger.info(
+        "Site index: %d pages, %d updated (%d read from source), %d listing files written",
+        len(index.pages), updated, read, len(written),
+        extra={"fields": {
+            "event": "site_index",
+            "pages": len(index.pages),
+            "updated": updated,
+            "read": read,
+            "written": len(written),
+        }}
+    )
+
+
+def index_images(stats: BuildStats, jobs: int) -> tuple[ImageIndex, ImageResult]:
+    """Dimensions and variants of the images in static/, re-reading only those that changed.
+
+    Variants missing from IMAGE_CACHE_PATH are made here, before any page is
+    rendered, so pages only list the widths that could be made.
+    """
+    with stats.stage("image_index"):
+        images = ImageIndex.load(os.path.join(os.getcwd(), IMAGE_INDEX_PATH))
+        changed = images.update(STATIC_PATH)
+    if changed:
+        logger.info("Images indexed: %d, changed: %d", len(images.images), len(changed))
+    if not can_resize():
+        logger.debug("Pillow is not installed, images get dimensions but no responsive variants")
+    with stats.stage("image_variants"):
+        variants = make_variants(images, STATIC_PATH, os.path.join(os.getcwd(), IMAGE_CACHE_PATH), jobs)
+
+    return images, variants
+
+
+def update_images(
+    args: argparse.Namespace,
+    images: ImageIndex,
+    variants: ImageResult,
+    jobs: int,
+    stats: BuildStats
+) -> None:
+    """Deploy the responsive variants of the images, as `index_images` made them."""
+    with stats.stage("image_variants"):
+        result = deploy_variants(
+            images, STATIC_PATH, DEST_PATH, os.path.join(os.getcwd(), IMAGE_CACHE_PATH), jobs, args.deploy_strategy,
+            variants
+        )
+        images.save()
+    logger.info(
+        "Image variants generated: %d, from cache: %d, unchanged: %d, removed: %d, failed: %d",
+        len(result.generated), len(result.cached), len(result.unchanged), len(result.removed), len(result.failed),
+        extra={"fields": {
+            "event": "image_variants",
+            "generated": len(result.generated),
+            "cached": len(result.cached),
+            "unchanged": len(result.unchanged),
+            "removed": len(result.removed),
+            "failed": len(result.failed),
+        }}
+    )
+
+
+def update_sidecars(args: argparse.Namespace, manifest: BuildManifest, jobs: int, stats: BuildStats) -> None:
+    """Precompress changed output with --precompress; without it, drop the sidecars of earlier builds."""
+    if not args.precompress:
+        if manifest.compressed:
+            logger.info("Removed %d precompressed sidecars", len(remove_sidecars(DEST_PATH, manifest.compressed)))
+        return
+    with stats.stage("precompress"):
+        result = precompress(DEST_PATH, manifest.compressed, jobs)
+    logger.info(
+        "Precompressed: %d, unchanged: %d, sidecars removed: %d",
+        len(result.compressed), len(result.unchanged), len(result.removed),
+        extra={"fields": {
+            "event": "precompress",
+            "compressed": len(result.compressed),
+            "unchanged": len(result.unchanged),
+            "removed": len(result.removed),
+        }}
+    )
+
+
+def watch(args: argparse.Namespace, manifest: BuildManifest, index: SiteIndex, basepath: str, jobs: int) -> None:
+    watcher = Watcher([CONTENT_PATH, STATIC_PATH, TEMPLATE_PATH])
+    cache_dir = render_cache_dir(args)
+    walk_filter = content_filter(args)
+
+    def rebuild(changed: set[str]) -> None:
+        changes = classify_changes(changed, CONTENT_PATH, STATIC_PATH, TEMPLATE_PATH)
+        stats = BuildStats()
+        images, variants = index_images(stats, jobs)
+        if changes.static:
+            report_sync(sync_dir_content(
+                STATIC_PATH, DEST_PATH, manifest.assets, args.checksum, args.deploy_strategy, minify=args.minify
+            ))
+            update_images(args, images, variants, jobs, stats)
+        result: BuildResult|None = None
+        template_path = page_template(args, index)
+        if changes.template or changes.static:
+            result = generate_pages_incremental(
+                CONTENT_PATH, template_path, DEST_PATH, basepath, manifest, jobs, stats, cache_dir, walk_filter,
+                images
+            )
+        elif changes.content:
+            result = update_pages(
+                changes.content, CONTENT_PATH, template_path, DEST_PATH, basepath, manifest, jobs, stats,
+                cache_dir, walk_filter, images
+            )
+        manifest.save()
+        if result:
+            update_site_index(
+                args, manifest, index, result, basepath, jobs, stats, cache_dir, walk_filter, images
+            )
+        update_sidecars(args, manifest, jobs, stats)
+        manifest.save()
+        if result:
+            report(result, stats)
+            if args.log_format == "json":
+                log_stages(logger, stats)
 
+    logger.info("Watching %s/, %s/ and %s for changes, press Ctrl+C to stop.", CONTENT_PATH, STATIC_PATH, TEMPLATE_PATH)
+    try:
+        watcher.run(rebuild)
+    except KeyboardInterrupt:
+        logger.info("Stopped watching.")
 
 
 def main() -> None:
-    input = sys.argv
-    if len(input) != 2:
-        basepath = "/"
-    else:
-        basepath = input[1]
+    if sys.argv[1:2] == ["serve"]:
+        return serve_main(sys.argv[2:])
+    args = parse_args()
+    configure_logging(-1 if args.quiet else 1 if args.verbose else 0, args.log_format)
+    if args.watch and (args.shard or args.merge_shards):
+        logger.error("--watch cannot be combined with --shard or --merge-shards")
+        sys.exit(2)
+    basepath: str = args.basepath + DEST_PATH + "/"
+    jobs: int = args.jobs or os.cpu_count() or 1
     cwd = os.getcwd()
-    public_path = cwd + "/docs"
-    static_path = cwd + "/static"
-    delete_dir_content(public_path)
-    copy_dir_content(static_path, public_path)
-    generate_pages_recursive("content", "template.html", "docs", basepath + "docs/")
+    dest_path = DEST_PATH
+    public_path = cwd + "/" + DEST_PATH
+    static_path = cwd + "/" + STATIC_PATH
+    manifest_path = os.path.join(cwd, MANIFEST_PATH)
+    if args.shard:
+        dest_path = os.path.join(shard_dir(SHARDS_PATH, *args.shard), DEST_PATH)
+        public_path = os.path.join(cwd, dest_path)
+        manifest_path = os.path.join(cwd, shard_dir(SHARDS_PATH, *args.shard), SHARD_MANIFEST)
+    if args.full:
+        if os.path.exists(public_path):
+            delete_dir_content(public_path)
+        if os.path.exists(manifest_path):
+            os.remove(manifest_path)
+    manifest = BuildManifest.load(manifest_path)
+    stats = BuildStats()
+    cache_dir = render_cache_dir(args)
+    output: str|None = args.profile_output if args.profile else None
+    profiler = cProfile.Profile() if output and output.endswith(".prof") else None
+    index = load_site_index()
+    template_path = page_template(args, index)
+    with profiler or nullcontext():
+        images, variants = index_images(stats, jobs)
+        if args.shard:
+            manifest.shard = args.shard
+            result = generate_pages_incremental(
+                CONTENT_PATH, template_path, dest_path, basepath, manifest, jobs, stats, cache_dir,
+                content_filter(args, args.shard), images
+            )
+        elif args.merge_shards:
+            try:
+                result = merge_shards(
+                    SHARDS_PATH, args.merge_shards, CONTENT_PATH, template_path, DEST_PATH, basepath, manifest,
+                    content_filter(args), args.deploy_strategy, images
+                )
+            except ShardMergeError as e:
+                for problem in e.problems:
+                    logger.error(problem)
+                sys.exit(1)
+            with stats.stage("static_copy"):
+                report_sync(sync_dir_content(
+                    static_path, public_path, manifest.assets, args.checksum, args.deploy_strategy,
+                    minify=args.minify
+                ))
+        elif args.use_async:
+            sync_result, result = asyncio.run(build_site(
+                static_path, CONTENT_PATH, template_path, DEST_PATH, basepath, manifest, jobs, stats,
+                cache_dir, args.checksum, args.deploy_strategy, max(1, args.io_workers), content_filter(args),
+                args.minify, images
+            ))
+            report_sync(sync_result)
+        else:
+            with stats.stage("static_copy"):
+                report_sync(sync_dir_content(
+                    static_path, public_path, manifest.assets, args.checksum, args.deploy_strategy,
+                    minify=args.minify
+                ))
+            result = generate_pages_incremental(
+                CONTENT_PATH, template_path, DEST_PATH, basepath, manifest, jobs, stats, cache_dir,
+                content_filter(args), images
+            )
+    # Saved before post-processing too, so the rendered pages stay recorded if a later stage fails.
+    manifest.save()
+    if not args.shard:
+        update_images(args, images, variants, jobs, stats)
+        update_site_index(
+            args, manifest, index, result, basepath, jobs, stats, cache_dir, content_filter(args), images
+        )
+        update_sidecars(args, manifest, jobs, stats)
+        manifest.save()
+    if cache_dir is not None:
+        _ = RenderCache(cache_dir).prune()
+    report(result, stats)
+    if args.log_format == "json":
+        log_stages(logger, stats)
+    if args.profile:
+        print(stats.summary())
+        if profiler and output:
+            profiler.dump_stats(output)
+        elif output:
+            stats.dump_json(output)
+    if args.watch:
+        watch(args, manifest, index, basepath, jobs)
+    elif result.errors:
+        sys.exit(1)
 
 
 if __name__ == "__main__":
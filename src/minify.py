@@ -0,0 +1,124 @@
+import os
+import re
+from collections.abc import Callable
+from atomic_write import atomic_write
+
+
+BLOCK_TAGS = frozenset((
+    "!doctype", "html", "head", "body", "title", "meta", "link", "base", "style", "script", "noscript",
+    "header", "footer", "main", "nav", "article", "section", "aside", "div", "p", "pre", "blockquote",
+    "ul", "ol", "li", "dl", "dt", "dd", "h1", "h2", "h3", "h4", "h5", "h6", "hr", "br", "figure",
+    "figcaption", "table", "thead", "tbody", "tfoot", "tr", "th", "td", "form", "fieldset", "textarea",
+))
+
+COMMENT_REGEX = re.compile(r"<!--(?!\[if).*?-->", re.S)
+TAG_REGEX = re.compile(r"<(pre|textarea|script|style)\b[^>]*>.*?</\1\s*>|<[^>]*>", re.S | re.I)
+TAG_NAME_REGEX = re.compile(r"</?(!?[a-zA-Z][\w-]*)")
+WHITESPACE_REGEX = re.compile(r"\s+")
+CSS_STRING = r"\"(?:\\.|[^\"\\])*\"|'(?:\\.|[^'\\])*'"
+CSS_STRING_OR_COMMENT_REGEX = re.compile(rf"({CSS_STRING})|/\*.*?\*/", re.S)
+CSS_STRING_REGEX = re.compile(rf"({CSS_STRING})", re.S)
+CSS_PUNCTUATION_REGEX = re.compile(r"\s*([{};,>])\s*")
+
+
+def _is_block(tag: str) -> bool:
+    name = TAG_NAME_REGEX.match(tag)
+
+    return name is not None and name.group(1).lower() in BLOCK_TAGS
+
+
+def _collapse(text: str, after_block: bool, before_block: bool) -> str:
+    text = WHITESPACE_REGEX.sub(" ", text)
+    if after_block:
+        text = text.lstrip(" ")
+    if before_block:
+        text = text.rstrip(" ")
+
+    return text
+
+
+def minify_html(html: str) -> str:
+    """`html` with comments dropped and whitespace collapsed.
+
+    Runs of whitespace become one space, and disappear next to block-level
+    tags, where they cannot render. The content of `pre`, `textarea` and
+    `script` is kept as is; that of `style` goes through `minify_css`.
+    """
+    html = COMMENT_REGEX.sub("", html)
+    pieces: list[str] = []
+    position = 0
+    after_block = True
+    for match in TAG_REGEX.finditer(html):
+        tag = match.group(0)
+        block = _is_block(tag)
+        pieces.append(_collapse(html[position:match.start()], after_block, block))
+        if (match.group(1) or "").lower() == "style":
+            start = tag.index(">") + 1
+            end = tag.rindex("</")
+            tag = tag[:start] + minify_css(tag[start:end]) + tag[end:]
+        pieces.append(tag)
+        after_block = block
+        position = match.end()
+    pieces.append(_collapse(html[position:], after_block, True))
+
+    return "".join(pieces)
+
+
+def _minify_css_code(code: str) -> str:
+    code = WHITESPACE_REGEX.sub(" ", code)
+    code = CSS_PUNCTUATION_REGEX.sub(r"\1", code)
+
+    return code.replace(": ", ":").replace(";}", "}")
+
+
+def minify_css(css: str) -> str:
+    """`css` without comments and the whitespace it does not need; strings are kept."""
+    css = CSS_STRING_OR_COMMENT_REGEX.sub(lambda match: match.group(1) or " ", css)
+    parts = CSS_STRING_REGEX.split(css)
+
+    return "".join(part if i % 2 else _minify_css_code(part) for i, part in enumerate(parts)).strip()
+
+
+MINIFIERS: dict[str, Callable[[str], str]] = {
+    ".css": minify_css,
+    ".html": minify_html,
+    ".htm": minify_html,
+}
+
+
+def minifier_for(path: str) -> Callable[[str], str]|None:
+    return MINIFIERS.get(os.path.splitext(path)[1].lower())
+
+
+def minify_file(source: str, target: str) -> None:
+    """Write the minified `source` to `target`, atomically."""
+    minifier = minifier_for(source)
+    if minifier is None:
+        raise ValueError(f"No minifier for {source}")
+    with open(source) as f:
+        text = minifier(f.read())
+    with atomic_write(target) as f:
+        _ = f.write(text)
+
+
+def minified_template(template_path: str, directory: str) -> str:
+    """Path of a minified copy of `template_path` in `directory`, rewritten only when it changes.
+
+    Pages built from it come out minified with no work per page: the tree
+    serializer emits no whitespace between tags, so the template is all
+    that needs minifying. Being a different file, it has its own hash, so
+    switching minification on or off rebuilds every page.
+    """
+    with open(template_path) as f:
+        minified = minify_html(f.read())
+    path = os.path.join(directory, os.path.basename(template_path))
+    try:
+        with open(path) as f:
+            if f.read() == minified:
+                return path
+    except OSError:
+        pass
+    with atomic_write(path) as f:
+        _ = f.write(minified)
+
+    return path
@@ -0,0 +1,181 @@
+from __future__ import annotations
+import marshal
+from array import array
+from io import StringIO
+from htmlnode import Writer
+
+
+LEAF = -1
+# Bump whenever the layout written by `NodeArena.to_bytes` changes.
+ARENA_FORMAT = 1
+
+
+class NodeArena:
+    """Flat, array-backed HTML tree.
+
+    Node `i` is described by `tags[i]` (an index into `tag_names`), its text
+    as `text_start[i]:text_end[i]` of the shared `text` buffer, its children
+    as `child_count[i]` entries of `children` starting at `child_start[i]`
+    (`child_count[i] == LEAF` for leaves) and `props[i]`, an index into
+    `prop_table` or -1. Nodes are appended bottom-up, so the root is the
+    last node added. Serialises exactly like the equivalent
+    LeafNode/ParentNode tree.
+    """
+    __slots__ = (
+        "tags", "text_start", "text_end", "child_start", "child_count", "props",
+        "children", "tag_names", "prop_table", "text", "_tag_ids", "_chunks", "_length",
+    )
+
+    def __init__(self) -> None:
+        self.tags: array[int] = array("H")
+        self.text_start: array[int] = array("i")
+        self.text_end: array[int] = array("i")
+        self.child_start: array[int] = array("i")
+        self.child_count: array[int] = array("i")
+        self.props: array[int] = array("i")
+        self.children: array[int] = array("i")
+        self.tag_names: list[str|None] = []
+        self.prop_table: list[dict[str, str]] = []
+        self.text: str = ""
+        self._tag_ids: dict[str|None, int] = {}
+        self._chunks: list[str] = []
+        self._length: int = 0
+
+
+    def __len__(self) -> int:
+        return len(self.tags)
+
+
+    def _tag_id(self, tag: str|None) -> int:
+        tag_id = self._tag_ids.get(tag)
+        if tag_id is None:
+            tag_id = self._tag_ids[tag] = len(self.tag_names)
+            self.tag_names.append(tag)
+
+        return tag_id
+
+
+    def _append(self, tag: str|None, props: dict[str, str]|None) -> None:
+        self.tags.append(self._tag_id(tag))
+        if props:
+            self.props.append(len(self.prop_table))
+            self.prop_table.append(props)
+        else:
+            self.props.append(-1)
+
+
+    def add_leaf(self, tag: str|None, value: str, props: dict[str, str]|None = None) -> int:
+        self._append(tag, props)
+        self.text_start.append(self._length)
+        self._length += len(value)
+        self.text_end.append(self._length)
+        self._chunks.append(value)
+        self.child_start.append(0)
+        self.child_count.append(LEAF)
+
+        return len(self.tags) - 1
+
+
+    def add_parent(self, tag: str, children: list[int], props: dict[str, str]|None = None) -> int:
+        self._append(tag, props)
+        self.text_start.append(0)
+        self.text_end.append(0)
+        self.child_start.append(len(self.children))
+        self.child_count.append(len(children))
+        self.children.extend(children)
+
+        return len(self.tags) - 1
+
+
+    def finish(self) -> NodeArena:
+        """Join the pending text chunks into the shared `text` buffer."""
+        if self._chunks:
+            self.text += "".join(self._chunks)
+            self._chunks = []
+
+        return self
+
+
+    def to_bytes(self) -> bytes:
+        """Compact marshal dump of the arena, loaded back by `from_bytes`."""
+        _ = self.finish()
+        return marshal.dumps((
+            ARENA_FORMAT,
+            self.tags.tobytes(),
+            self.text_start.tobytes(),
+            self.text_end.tobytes(),
+            self.child_start.tobytes(),
+            self.child_count.tobytes(),
+            self.props.tobytes(),
+            self.children.tobytes(),
+            self.tag_names,
+            self.prop_table,
+            self.text,
+        ))
+
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> NodeArena:
+        fields = marshal.loads(data)
+        if not isinstance(fields, tuple) or len(fields) != 11 or fields[0] != ARENA_FORMAT:
+            raise ValueError("Unsupported node arena format")
+        arena = cls()
+        columns = (
+            arena.tags, arena.text_start, arena.text_end, arena.child_start,
+            arena.child_count, arena.props, arena.children,
+        )
+        for column, raw in zip(columns, fields[1:8]):
+            column.frombytes(raw)
+        arena.tag_names, arena.prop_table, arena.text = fields[8:]
+        arena._tag_ids = {tag: i for i, tag in enumerate(arena.tag_names)}
+        arena._length = len(arena.text)
+
+        return arena
+
+
+    def props_to_html(self, index: int) -> str:
+        prop_index = self.props[index]
+        if prop_index < 0:
+            return ""
+        return " " + " ".join(map(lambda x: f"{x[0]}=\"{x[1]}\"", self.prop_table[prop_index].items()))
+
+
+    def write_node(self, index: int, writer: Writer) -> None:
+        tag = self.tag_names[self.tags[index]]
+        count = self.child_count[index]
+        if count == LEAF:
+            value = self.text[self.text_start[index]:self.text_end[index]]
+            if not tag:
+                _ = writer.write(value)
+            elif tag == "img":
+                if value != "":
+                    raise ValueError("Image node shouldn't have a value")
+                _ = writer.write(f"<{tag}{self.props_to_html(index)} />")
+            else:
+                _ = writer.write(f"<{tag}{self.props_to_html(index)}>")
+                _ = writer.write(value)
+                _ = writer.write(f"</{tag}>")
+            return
+        if not tag:
+            raise ValueError("All parent nodes must have a tag")
+        elif count == 0:
+            raise ValueError("All parent nodes must have a children")
+        _ = writer.write(f"<{tag}{self.props_to_html(index)}>")
+        start = self.child_start[index]
+        for child in self.children[start:start + count]:
+            self.write_node(child, writer)
+        _ = writer.write(f"</{tag}>")
+
+
+    def to_html_into(self, writer: Writer) -> None:
+        if not self.tags:
+            raise ValueError("Empty node arena")
+        _ = self.finish()
+        self.write_node(len(self.tags) - 1, writer)
+
+
+    def to_html(self) -> str:
+        buffer = StringIO()
+        self.to_html_into(buffer)
+
+        return buffer.getvalue()
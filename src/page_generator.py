@@ -1,58 +1,535 @@
+from __future__ import annotations
+import logging
 import os
-from text_to_html import markdown_to_html_node
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import nullcontext
+from io import StringIO
+from typing import override
+import build_stats
+from atomic_write import atomic_write
+from build_manifest import BuildManifest, SourceState, hash_file
+from build_stats import BuildStats, Stopwatch
+from content_walker import MARKDOWN_EXTENSIONS, WalkFilter, walk
+from ast_cache import document_key, open_ast_cache
+from render_cache import RenderCache, open_cache
+from htmlnode import Writer
+from node_arena import NodeArena
+from front_matter import FrontMatter, is_draft, read_front_matter, split_front_matter
+from image_pipeline import ImageIndex
+from link_map import BASEPATH_MARK, LinkMap, link_map
+from page_meta import PageMeta, title_from_line
+from template import SlotValue, Template, load_template
+from text_to_html import image_urls, markdown_to_node_arena
+
+
+CONTENT_FILTER = WalkFilter(extensions=MARKDOWN_EXTENSIONS, drafts=False)
+
+logger = logging.getLogger(__name__)
 
 
 def extract_title(markdown: str) -> str:
-    if not markdown.strip().startswith("# "):
-        raise Exception("Markdown must start with h1 header.")
-    title = markdown.strip().splitlines()[0].split(" ", maxsplit=1)[1].strip() 
+    return title_from_line(markdown.lstrip().partition("\n")[0])
+
+
+def read_front_matter_file(path: str) -> FrontMatter:
+    """The front matter of the page at `path`, reading no further than its closing fence."""
+    with open(path) as f:
+        front_matter, _ = read_front_matter(f)
+
+    return front_matter
+
+
+def publishable(path: str, walk_filter: WalkFilter) -> bool:
+    """Whether the page at `path` is built: drafts only when `walk_filter.drafts` is set."""
+    return walk_filter.drafts or not is_draft(read_front_matter_file(path))
+
+
+class BasepathWriter:
+    """Writer putting `basepath` in place of `BASEPATH_MARK` on the way through."""
+    def __init__(self, writer: Writer, basepath: str) -> None:
+        self.writer: Writer = writer
+        self.basepath: str = basepath
+
+
+    def write(self, s: str, /) -> object:
+        return self.writer.write(s.replace(BASEPATH_MARK, self.basepath))
+
+
+class ParsedPage:
+    """A page between parsing and template filling, with the metadata the site index keeps of it."""
+    __slots__ = ("template", "title", "node", "meta")
+
+    def __init__(self, template: Template, title: str, node: NodeArena, meta: PageMeta|None = None) -> None:
+        self.template: Template = template
+        self.title: str = title
+        self.node: NodeArena = node
+        self.meta: PageMeta = meta or PageMeta("", "", title)
+
+
+def parse_page(
+    markdown: str,
+    template_path: str,
+    basepath: str,
+    stats: BuildStats|None = None,
+    cache_dir: str|None = None,
+    images: ImageIndex|None = None
+) -> ParsedPage:
+    """The tree of the page for `markdown`, URLs under `BASEPATH_MARK` until `fill_page`.
+
+    The tree and its cache entries do not depend on the basepath, so a
+    build with only another basepath parses nothing again.
+    """
+    template = load_template(template_path, basepath)
+    links = link_map(BASEPATH_MARK, images)
+    front_matter, markdown = split_front_matter(markdown)
+    # HTML has no NUL characters, parsers read them as U+FFFD; the mark must only come from URLs.
+    markdown = markdown.replace(BASEPATH_MARK, "\ufffd")
+    title = front_matter.get("title")
+    if not isinstance(title, str):
+        title = extract_title(markdown)
+    meta = PageMeta.from_page(front_matter, title, StringIO(markdown))
+    meta.images = {url: links.image_key(url) for url in image_urls(markdown)}
+    if cache_dir is None:
+        return ParsedPage(template, title, parse_markdown(markdown, stats, links=links), meta)
+    trees = open_ast_cache(cache_dir)
+    key = document_key(markdown, links.context(meta.images))
+    node = trees.get(key)
+    if stats is not None:
+        stats.count("ast_cache_hits" if node is not None else "ast_cache_misses")
+    if node is None:
+        node = parse_markdown(markdown, stats, open_cache(cache_dir), links)
+        trees.put(key, node)
+
+    return ParsedPage(template, title, node, meta)
+
+
+def parse_markdown(
+    markdown: str,
+    stats: BuildStats|None = None,
+    cache: RenderCache|None = None,
+    links: LinkMap|None = None
+) -> NodeArena:
+    """The tree of `markdown`, with link and image URLs resolved through `links` (default: basepath "/")."""
+    hits, misses = (cache.hits, cache.misses) if cache else (0, 0)
+    previous, build_stats.active = build_stats.active, stats
+    try:
+        node = markdown_to_node_arena(markdown, cache, links or link_map("/"))
+    finally:
+        build_stats.active = previous
+    if cache and stats is not None:
+        stats.count("render_cache_hits", cache.hits - hits)
+        stats.count("render_cache_misses", cache.misses - misses)
+
+    return node
+
+
+def front_matter_slots(front_matter: FrontMatter, template: Template|None = None) -> dict[str, str]:
+    """Front matter as template slots: `date` fills `{{ Date }}`, lists are comma separated.
+
+    Given `template`, its slots the front matter has no key for are filled
+    with "", so a page without a `date` shows no `{{ Date }}` placeholder.
+    """
+    slots = dict.fromkeys(template.slots, "") if template else {}
+    slots.update(
+        (key.capitalize(), ", ".join(value) if isinstance(value, list) else value)
+        for key, value in front_matter.items()
+        if key.isidentifier()
+    )
+
+    return slots
 
-    return title
 
+def fill_page(writer: Writer, page: ParsedPage, stats: BuildStats|None = None) -> None:
+    def write_content(writer: Writer) -> None:
+        with stats.stage("serialize") if stats else nullcontext():
+            page.node.to_html_into(BasepathWriter(writer, page.template.basepath))
 
-def generate_page(from_path: str, template_path: str, dest_path: str, basepath: str) -> None:
+    values: dict[str, SlotValue] = {**front_matter_slots(page.meta.front_matter, page.template)}
+    values.update({"Title": page.title, "Content": write_content})
+    page.template.render_into(writer, values)
+
+
+def render_page(
+    markdown: str,
+    template_path: str,
+    basepath: str,
+    stats: BuildStats|None = None,
+    cache_dir: str|None = None,
+    images: ImageIndex|None = None
+) -> str:
+    """The complete HTML of the page for `markdown`."""
+    return render_page_meta(markdown, template_path, basepath, stats, cache_dir, images)[0]
+
+
+def render_page_meta(
+    markdown: str,
+    template_path: str,
+    basepath: str,
+    stats: BuildStats|None = None,
+    cache_dir: str|None = None,
+    images: ImageIndex|None = None
+) -> tuple[str, PageMeta]:
+    """`render_page`, plus the metadata of the page."""
+    stopwatch = Stopwatch(stats)
+    page = parse_page(markdown, template_path, basepath, stats, cache_dir, images)
+    stopwatch.lap("block_parse", "inline_parse")
+    buffer = StringIO()
+    fill_page(buffer, page, stats)
+    stopwatch.lap("template_fill", "serialize")
+
+    return buffer.getvalue(), page.meta
+
+
+def render_page_stats(
+    markdown: str,
+    template_path: str,
+    basepath: str,
+    cache_dir: str|None = None,
+    images: ImageIndex|None = None
+) -> tuple[str, BuildStats, PageMeta]:
+    """`render_page_meta` for worker processes: returns the stats it collected too."""
+    stats = BuildStats()
+    html, meta = render_page_meta(markdown, template_path, basepath, stats, cache_dir, images)
+
+    return html, stats, meta
+
+
+def read_markdown(path: str) -> str:
+    with open(path) as f:
+        return f.read()
+
+
+def write_page(dest_path: str, html: str) -> None:
+    """Atomically replace `dest_path` with `html`, creating its directory."""
+    with atomic_write(dest_path) as f:
+        _ = f.write(html)
+
+
+def generate_page(
+    from_path: str,
+    template_path: str,
+    dest_path: str,
+    basepath: str,
+    stats: BuildStats|None = None,
+    cache_dir: str|None = None,
+    images: ImageIndex|None = None
+) -> PageMeta:
+    """Render the page at `from_path` to `dest_path`; returns its metadata."""
     if not os.path.exists(from_path):
         raise ValueError(f"{from_path} does not exists")
     if not os.path.exists(template_path):
         raise ValueError(f"{template_path} does not exists")
-    print(f"Generating page from {from_path} to {dest_path} using {template_path}")
-    with open(from_path) as f:
-        markdown = f.read()
-    with open(template_path) as f:
-        template = f.read()
-    title = extract_title(markdown)
-    html = markdown_to_html_node(markdown).to_html()
-    full_html = (
-        template
-        .replace("{{ Title }}", title)
-        .replace("{{ Content }}", html)
-        .replace("href=\"/", f"href=\"{basepath}")
-        .replace("src=\"/", f"src=\"{basepath}")
-    )
-    directories = os.path.dirname(dest_path)
-    os.makedirs(directories, exist_ok=True)
-    with open(dest_path, mode="wt") as f:
-        _ = f.write(full_html)
+    logger.debug("Generating page from %s to %s using %s", from_path, dest_path, template_path)
+    stopwatch = Stopwatch(stats)
+    markdown = read_markdown(from_path)
+    stopwatch.lap("read")
+    page = parse_page(markdown, template_path, basepath, stats, cache_dir, images)
+    stopwatch.lap("block_parse", "inline_parse")
+    with atomic_write(dest_path) as f:
+        stopwatch.lap("write")
+        fill_page(f, page, stats)
+        stopwatch.lap("template_fill", "serialize")
+    stopwatch.lap("write")
+    if stats is not None:
+        stats.add_page(from_path, stopwatch.elapsed())
+
+    return page.meta
+
+
+def generate_page_stats(
+    from_path: str,
+    template_path: str,
+    dest_path: str,
+    basepath: str,
+    cache_dir: str|None = None,
+    images: ImageIndex|None = None
+) -> tuple[PageMeta, BuildStats]:
+    """`generate_page` for worker processes: returns the stats it collected too."""
+    stats = BuildStats()
+    meta = generate_page(from_path, template_path, dest_path, basepath, stats, cache_dir, images)
+
+    return meta, stats
 
 
 def generate_pages_recursive(
     content_path: str,
     template_path: str,
     dest_path: str,
-    basepath: str
+    basepath: str,
+    jobs: int = 1
 ) -> None:
     if not os.path.exists(content_path):
         raise ValueError(f"{content_path} does not exists")
     if not os.path.exists(template_path):
         raise ValueError(f"{template_path} does not exists")
-    print(f"Generating page from {content_path} to {dest_path} using {template_path}")
-    for path in os.listdir(content_path):
-        content = os.path.join(content_path, path)
-        destination = os.path.join(dest_path, path)
-        if os.path.isfile(content):
-            print(f"Encoutered file - {path}")
-            generate_page(content, template_path, destination.replace(".md", ".html"), basepath)
-        else:
-            print(f"Encoutered dir - {path}")
-            generate_pages_recursive(content, template_path, destination, basepath)
+    logger.debug("Generating pages from %s to %s using %s", content_path, dest_path, template_path)
+    errors = render_pages(collect_pages(content_path, dest_path), template_path, basepath, jobs)
+    if errors:
+        raise PageGenerationError(errors)
+
+
+class PageError:
+    def __init__(self, source: str, dest: str, error: Exception) -> None:
+        self.source: str = source
+        self.dest: str = dest
+        self.error: Exception = error
+
+
+    @override
+    def __str__(self) -> str:
+        return f"{self.source}: {type(self.error).__name__}: {self.error}"
+
+
+class PageGenerationError(Exception):
+    def __init__(self, errors: list[PageError]) -> None:
+        self.errors: list[PageError] = errors
+        super().__init__(
+            f"{len(errors)} page(s) failed to generate:\n" + "\n".join(map(str, errors))
+        )
+
+
+class BuildResult:
+    def __init__(self) -> None:
+        self.rendered: list[str] = []
+        self.skipped: list[str] = []
+        self.removed: list[str] = []
+        self.errors: list[PageError] = []
+        # Source -> metadata of every page rendered, for the site index.
+        self.metadata: dict[str, PageMeta] = {}
+
+
+    def merge(self, other: BuildResult) -> None:
+        """Take in `other`, a later pass over the same pages."""
+        again = set(other.rendered) | {error.dest for error in other.errors}
+        self.rendered = [dest for dest in self.rendered if dest not in again] + other.rendered
+        self.skipped = [dest for dest in self.skipped if dest not in again]
+        self.removed.extend(other.removed)
+        self.errors = [error for error in self.errors if error.dest not in again] + other.errors
+        self.metadata.update(other.metadata)
+
+
+def destination_for(source: str, content_path: str, dest_path: str) -> str:
+    relative = os.path.relpath(source, content_path)
+
+    return os.path.join(dest_path, os.path.splitext(relative)[0] + ".html")
+
+
+def collect_pages(
+    content_path: str,
+    dest_path: str,
+    walk_filter: WalkFilter = CONTENT_FILTER
+) -> list[tuple[str, str]]:
+    """(source, destination) of every markdown file under `content_path`, drafts aside."""
+    if not os.path.exists(content_path):
+        raise ValueError(f"{content_path} does not exists")
+
+    return [
+        (entry.path, os.path.join(dest_path, os.path.splitext(entry.relative)[0] + ".html"))
+        for entry in walk(content_path, walk_filter)
+        if publishable(entry.path, walk_filter)
+    ]
+
+
+def render_pages(
+    pages: list[tuple[str, str]],
+    template_path: str,
+    basepath: str,
+    jobs: int = 1,
+    stats: BuildStats|None = None,
+    cache_dir: str|None = None,
+    images: ImageIndex|None = None,
+    metas: dict[str, PageMeta]|None = None
+) -> list[PageError]:
+    """Render every (source, destination) pair, collecting failures per file.
+
+    With `jobs` > 1 the pages are fanned out to a process pool. `cache_dir`
+    enables the block render cache stored in that directory; `images` sizes
+    the images the pages show. The metadata of each page rendered goes in
+    `metas`, keyed by source.
+    """
+    errors: list[PageError] = []
+    if metas is None:
+        metas = {}
+    if jobs <= 1 or len(pages) <= 1:
+        for source, dest in pages:
+            try:
+                metas[source] = generate_page(source, template_path, dest, basepath, stats, cache_dir, images)
+            except Exception as e:
+                errors.append(PageError(source, dest, e))
+        return errors
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = {
+            executor.submit(
+                generate_page_stats, source, template_path, dest, basepath, cache_dir, images
+            ): (source, dest)
+            for source, dest in pages
+        }
+        for future in as_completed(futures):
+            error = future.exception()
+            source, dest = futures[future]
+            if error is not None:
+                errors.append(PageError(source, dest, error))  # pyright: ignore[reportArgumentType]
+                continue
+            metas[source], page_stats = future.result()
+            if stats is not None:
+                stats.merge(page_stats)
+    errors.sort(key=lambda x: x.source)
+
+    return errors
+
+
+def remove_output(dest: str, dest_root: str) -> None:
+    if os.path.exists(dest):
+        os.remove(dest)
+    directory = os.path.dirname(dest)
+    root = os.path.abspath(dest_root)
+    while os.path.abspath(directory).startswith(root + os.sep) and not os.listdir(directory):
+        os.rmdir(directory)
+        directory = os.path.dirname(directory)
+
+
+def plan_pages(
+    content_path: str,
+    template_path: str,
+    dest_path: str,
+    basepath: str,
+    manifest: BuildManifest,
+    result: BuildResult,
+    stats: BuildStats|None = None,
+    walk_filter: WalkFilter = CONTENT_FILTER,
+    images: ImageIndex|None = None
+) -> tuple[list[tuple[str, str, SourceState]], str]:
+    """Remove outputs of deleted sources and list the `(source, dest, state)` to render.
+
+    Pages showing an image of `images` that changed since they were built
+    are stale too. Returns the stale pages and the template hash to record
+    once they are built.
+    """
+    if not os.path.exists(template_path):
+        raise ValueError(f"{template_path} does not exists")
+    template_hash = hash_file(template_path)
+    rebuild_all = manifest.template_hash != template_hash or manifest.basepath != basepath
+    if rebuild_all:
+        logger.info("Template or basepath changed, regenerating every page.")
+    links = link_map(basepath, images)
+    stopwatch = Stopwatch(stats)
+    pages = collect_pages(content_path, dest_path, walk_filter)
+    sources = {source for source, _ in pages}
+    for source in list(manifest.pages):
+        if source not in sources:
+            record = manifest.forget(source)
+            if record:
+                logger.debug("Removing %s, source %s is gone", record.dest, source)
+                remove_output(record.dest, dest_path)
+                result.removed.append(record.dest)
+    stale: list[tuple[str, str, SourceState]] = []
+    for source, dest in pages:
+        state = manifest.source_state(source)
+        if not rebuild_all and manifest.is_fresh(source, state.source_hash, dest, links.image_key):
+            result.skipped.append(dest)
+            continue
+        stale.append((source, dest, state))
+    stopwatch.lap("discovery")
+
+    return stale, template_hash
+
+
+def generate_pages_incremental(
+    content_path: str,
+    template_path: str,
+    dest_path: str,
+    basepath: str,
+    manifest: BuildManifest,
+    jobs: int = 1,
+    stats: BuildStats|None = None,
+    cache_dir: str|None = None,
+    walk_filter: WalkFilter = CONTENT_FILTER,
+    images: ImageIndex|None = None
+) -> BuildResult:
+    result = BuildResult()
+    stale, template_hash = plan_pages(
+        content_path, template_path, dest_path, basepath, manifest, result, stats, walk_filter, images
+    )
+    render_and_record(stale, template_path, basepath, manifest, result, jobs, stats, cache_dir, images)
+    manifest.template_hash = template_hash
+    manifest.basepath = basepath
+
+    return result
 
+
+def update_pages(
+    sources: set[str],
+    content_path: str,
+    template_path: str,
+    dest_path: str,
+    basepath: str,
+    manifest: BuildManifest,
+    jobs: int = 1,
+    stats: BuildStats|None = None,
+    cache_dir: str|None = None,
+    walk_filter: WalkFilter = CONTENT_FILTER,
+    images: ImageIndex|None = None
+) -> BuildResult:
+    """Re-render or remove only the pages whose `sources` changed.
+
+    Changed files that `walk_filter` (or content/.ssgignore) rejects, and
+    drafts, are treated as gone, so their pages are removed if they were
+    ever built.
+    """
+    result = BuildResult()
+    stale: list[tuple[str, str, SourceState]] = []
+    walk_filter = walk_filter.with_ignore_file(content_path)
+    for source in sorted(sources):
+        if (
+            os.path.isfile(source)
+            and walk_filter.accepts(os.path.relpath(source, content_path))
+            and publishable(source, walk_filter)
+        ):
+            dest = destination_for(source, content_path, dest_path)
+            stale.append((source, dest, SourceState.read(source)))
+        elif (record := manifest.forget(source)) is not None:
+            logger.debug("Removing %s, source %s is gone", record.dest, source)
+            remove_output(record.dest, dest_path)
+            result.removed.append(record.dest)
+    render_and_record(stale, template_path, basepath, manifest, result, jobs, stats, cache_dir, images)
+
+    return result
+
+
+def render_and_record(
+    stale: list[tuple[str, str, SourceState]],
+    template_path: str,
+    basepath: str,
+    manifest: BuildManifest,
+    result: BuildResult,
+    jobs: int = 1,
+    stats: BuildStats|None = None,
+    cache_dir: str|None = None,
+    images: ImageIndex|None = None
+) -> None:
+    pages = [(source, dest) for source, dest, _ in stale]
+    metas: dict[str, PageMeta] = {}
+    errors = render_pages(pages, template_path, basepath, jobs, stats, cache_dir, images, metas)
+    record_pages(stale, errors, manifest, result, metas)
+
+
+def record_pages(
+    stale: list[tuple[str, str, SourceState]],
+    errors: list[PageError],
+    manifest: BuildManifest,
+    result: BuildResult,
+    metas: dict[str, PageMeta]|None = None
+) -> None:
+    """Record the pages rendered in `manifest` and `result`, with their metadata from `metas`."""
+    result.errors = errors
+    failed = {error.source for error in errors}
+    for source, dest, state in stale:
+        if source in failed:
+            _ = manifest.forget(source)
+            continue
+        meta = (metas or {}).get(source)
+        manifest.record(source, state, dest, meta.images if meta else None)
+        result.rendered.append(dest)
+        if meta is not None:
+            meta.source_hash = state.source_hash
+            result.metadata[source] = meta
@@ -0,0 +1,150 @@
+from __future__ import annotations
+from collections.abc import Iterable, Iterator
+from block_scanner import scan_blocks
+from blocknode import BlockType
+from front_matter import FrontMatter, as_list, read_front_matter
+from text_to_html import text_to_textnodes
+from textnode import TextType
+
+
+SUMMARY_LENGTH = 200
+
+
+def title_from_line(line: str) -> str:
+    """The title in an h1 `line`, which must be the first non-blank line of the markdown."""
+    if not line.startswith("# "):
+        raise Exception("Markdown must start with h1 header.")
+
+    return line[2:].strip()
+
+
+def plain_text(markdown: str) -> str:
+    """Inline markdown reduced to its visible text; images are dropped.
+
+    Paragraphs made of nothing but links, such as a `< Back Home` link
+    above the title, are navigation rather than prose and give "".
+    """
+    try:
+        nodes = text_to_textnodes(" ".join(markdown.split()))
+    except Exception:
+        return markdown
+    if all(node.text_type in (TextType.LINK, TextType.IMAGE) or not node.text.strip() for node in nodes):
+        return ""
+
+    return "".join(node.text for node in nodes if node.text_type != TextType.IMAGE)
+
+
+def read_title(lines: Iterator[str]) -> str:
+    """The h1 title from the first non-blank of `lines`, consuming nothing after it."""
+    for line in lines:
+        if line.strip():
+            return title_from_line(line.lstrip())
+
+    return title_from_line("")
+
+
+def summarize(lines: Iterable[str]) -> str:
+    """Plain text of the first paragraph with any prose, cut at a word boundary.
+
+    Stops reading `lines` at that paragraph.
+    """
+    for block_type, block in scan_blocks(lines):
+        if block_type != BlockType.PARAGRAPH:
+            continue
+        text = plain_text("\n".join(block)).strip()
+        if not text:
+            continue
+        if len(text) <= SUMMARY_LENGTH:
+            return text
+        return text[:SUMMARY_LENGTH].rsplit(" ", maxsplit=1)[0] + "…"
+
+    return ""
+
+
+class PageMeta:
+    """What listings and feeds need to know about one page."""
+    def __init__(
+        self,
+        source_hash: str,
+        url: str,
+        title: str,
+        date: str|None = None,
+        tags: list[str]|None = None,
+        summary: str = "",
+        front_matter: FrontMatter|None = None
+    ) -> None:
+        self.source_hash: str = source_hash
+        self.url: str = url
+        self.title: str = title
+        self.date: str|None = date
+        self.tags: list[str] = tags or []
+        self.summary: str = summary
+        self.front_matter: FrontMatter = front_matter or {}
+        # Image URL -> `LinkMap.image_key` the page was rendered with, for the build manifest.
+        self.images: dict[str, str] = {}
+
+
+    @classmethod
+    def from_page(
+        cls,
+        front_matter: FrontMatter,
+        title: str,
+        body: Iterable[str],
+        source_hash: str = "",
+        url: str = ""
+    ) -> PageMeta:
+        """Metadata of a page whose front matter and title are known; `body` is read up to the summary."""
+        summary = front_matter.get("summary")
+        if not isinstance(summary, str):
+            summary = summarize(body)
+        date = front_matter.get("date")
+
+        return cls(
+            source_hash,
+            url,
+            title,
+            date if isinstance(date, str) and date else None,
+            as_list(front_matter.get("tags")),
+            summary,
+            front_matter,
+        )
+
+
+    @classmethod
+    def read(cls, path: str, source_hash: str, url: str) -> PageMeta:
+        """Metadata of the page at `path`, read lazily.
+
+        Only the front matter is read when it has a `title` and `summary`;
+        otherwise reading stops at the h1 title or the first paragraph.
+        """
+        with open(path) as f:
+            front_matter, body = read_front_matter(f)
+            title = front_matter.get("title")
+            if not isinstance(title, str):
+                title = read_title(body)
+            return cls.from_page(front_matter, title, body, source_hash, url)
+
+
+    def to_dict(self) -> dict[str, object]:
+        return {
+            "hash": self.source_hash,
+            "url": self.url,
+            "title": self.title,
+            "date": self.date,
+            "tags": self.tags,
+            "summary": self.summary,
+            "front_matter": self.front_matter,
+        }
+
+
+    @classmethod
+    def from_dict(cls, data: dict[str, object]) -> PageMeta:
+        return cls(
+            str(data["hash"]),
+            str(data["url"]),
+            str(data["title"]),
+            str(data["date"]) if data.get("date") else None,
+            [str(tag) for tag in data.get("tags") or []],  # pyright: ignore[reportGeneralTypeIssues]
+            str(data.get("summary") or ""),
+            data.get("front_matter") or {},  # pyright: ignore[reportArgumentType]
+        )
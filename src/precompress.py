@@ -0,0 +1,117 @@
+import hashlib
+import logging
+import os
+import zlib
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from atomic_write import atomic_write
+from build_manifest import AssetRecord, hash_file
+from content_walker import walk
+
+
+COMPRESSIBLE_EXTENSIONS = (".html", ".htm", ".css", ".js", ".mjs", ".json", ".xml", ".svg", ".txt", ".map")
+GZIP_LEVEL = 9
+
+logger = logging.getLogger(__name__)
+
+
+def gzip_compress(data: bytes) -> bytes:
+    """gzip member of `data` with a zero timestamp, so unchanged input gives identical output."""
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+
+    return compressor.compress(data) + compressor.flush()
+
+
+SIDECARS: dict[str, Callable[[bytes], bytes]] = {".gz": gzip_compress}
+
+try:
+    import brotli  # pyright: ignore[reportMissingImports]
+except ImportError:
+    pass
+else:
+    SIDECARS[".br"] = brotli.compress  # pyright: ignore[reportUnknownMemberType]
+
+
+class PrecompressResult:
+    def __init__(self) -> None:
+        self.compressed: list[str] = []
+        self.unchanged: list[str] = []
+        self.removed: list[str] = []
+
+
+def write_sidecars(path: str) -> str:
+    """Write `path`.gz (and `path`.br when brotli is installed) next to `path`, atomically.
+
+    Returns the content hash of `path`, as `hash_file` computes it.
+    """
+    with open(path, mode="rb") as f:
+        data = f.read()
+    for extension, compress in SIDECARS.items():
+        with atomic_write(path + extension, mode="wb") as f:
+            _ = f.write(compress(data))
+
+    return hashlib.sha256(data).hexdigest()
+
+
+def has_sidecars(path: str) -> bool:
+    return all(os.path.exists(path + extension) for extension in SIDECARS)
+
+
+def remove_sidecars(
+    dest_path: str,
+    compressed: dict[str, AssetRecord],
+    relatives: list[str]|None = None
+) -> list[str]:
+    """Delete the sidecars of `relatives` (default: all of `compressed`) and forget them; returns what was deleted."""
+    removed: list[str] = []
+    for relative in sorted(compressed if relatives is None else relatives):
+        del compressed[relative]
+        for extension in SIDECARS:
+            sidecar = os.path.join(dest_path, relative + extension)
+            if os.path.isfile(sidecar):
+                os.remove(sidecar)
+                removed.append(sidecar)
+
+    return removed
+
+
+def precompress(dest_path: str, compressed: dict[str, AssetRecord], jobs: int = 1) -> PrecompressResult:
+    """Keep a precompressed sidecar next to every compressible file under `dest_path`.
+
+    `compressed` records what each file was when its sidecars were written
+    (path relative to `dest_path` -> record) and is updated in place. A file
+    whose size and mtime, or else content hash, match its record keeps its
+    sidecars; the others are compressed on `jobs` threads, as zlib releases
+    the GIL. Sidecars of recorded files that are gone are removed.
+    """
+    result = PrecompressResult()
+    files = {
+        entry.relative: entry.stat()
+        for entry in walk(dest_path) if entry.relative.lower().endswith(COMPRESSIBLE_EXTENSIONS)
+    }
+    gone = [relative for relative in compressed if relative not in files]
+    result.removed = remove_sidecars(dest_path, compressed, gone)
+
+    def compress(relative: str) -> str:
+        path = os.path.join(dest_path, relative)
+        source_hash = write_sidecars(path)
+        logger.debug("Compressed %s", path)
+        return source_hash
+
+    pending: list[tuple[str, os.stat_result]] = []
+    for relative, stat in sorted(files.items()):
+        path = os.path.join(dest_path, relative)
+        record = compressed.get(relative)
+        if record is not None and record.size == stat.st_size and has_sidecars(path):
+            if record.mtime_ns == stat.st_mtime_ns or hash_file(path) == record.source_hash:
+                record.mtime_ns = stat.st_mtime_ns
+                result.unchanged.append(path)
+                continue
+        pending.append((relative, stat))
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as executor:
+        hashes = list(executor.map(compress, [relative for relative, _ in pending]))
+    for (relative, stat), source_hash in zip(pending, hashes):
+        compressed[relative] = AssetRecord(stat.st_size, stat.st_mtime_ns, source_hash)
+        result.compressed.append(os.path.join(dest_path, relative))
+
+    return result
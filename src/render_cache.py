@@ -0,0 +1,119 @@
+from __future__ import annotations
+import hashlib
+import os
+from collections import OrderedDict
+from functools import lru_cache
+from atomic_write import atomic_write
+from blocknode import BlockType
+
+
+# Version of the HTML produced per block.
+RENDER_CACHE_VERSION = "2"
+DEFAULT_MEMORY_BYTES = 32 * 1024 * 1024
+DEFAULT_DISK_BYTES = 512 * 1024 * 1024
+
+
+def block_key(block_type: BlockType, text: str, context: str = "") -> str:
+    """Cache key of a block; rendered URLs depend on `context` (`LinkMap.context`), so it is part of the key."""
+    digest = hashlib.sha256()
+    digest.update(f"{RENDER_CACHE_VERSION}\0{block_type.value}\0{context}\0".encode())
+    digest.update(text.encode())
+
+    return digest.hexdigest()
+
+
+class RenderCache:
+    """Rendered HTML fragments of markdown blocks, keyed by `block_key`.
+
+    Fragments live in a size-bounded in-memory LRU backed by an optional
+    on-disk store, which `prune` trims to `max_disk_bytes` by evicting the
+    least recently used files.
+    """
+    def __init__(
+        self,
+        directory: str|None = None,
+        max_memory_bytes: int = DEFAULT_MEMORY_BYTES,
+        max_disk_bytes: int = DEFAULT_DISK_BYTES
+    ) -> None:
+        self.directory: str|None = directory
+        self.max_memory_bytes: int = max_memory_bytes
+        self.max_disk_bytes: int = max_disk_bytes
+        self.hits: int = 0
+        self.misses: int = 0
+        self._memory: OrderedDict[str, str] = OrderedDict()
+        self._memory_bytes: int = 0
+
+
+    def _path(self, key: str) -> str:
+        assert self.directory is not None
+        return os.path.join(self.directory, key[:2], key + ".html")
+
+
+    def _remember(self, key: str, html: str) -> None:
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            return
+        self._memory[key] = html
+        self._memory_bytes += len(html)
+        while self._memory_bytes > self.max_memory_bytes and len(self._memory) > 1:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+
+
+    def get(self, key: str) -> str|None:
+        html = self._memory.get(key)
+        if html is not None:
+            self._memory.move_to_end(key)
+            self.hits += 1
+            return html
+        if self.directory is not None:
+            path = self._path(key)
+            try:
+                with open(path) as f:
+                    html = f.read()
+                os.utime(path)
+            except OSError:
+                html = None
+        if html is None:
+            self.misses += 1
+            return None
+        self._remember(key, html)
+        self.hits += 1
+
+        return html
+
+
+    def put(self, key: str, html: str) -> None:
+        self._remember(key, html)
+        if self.directory is None:
+            return
+        with atomic_write(self._path(key)) as f:
+            _ = f.write(html)
+
+
+    def prune(self) -> int:
+        """Evict least recently used files until the disk store fits; return how many."""
+        if self.directory is None or not os.path.isdir(self.directory):
+            return 0
+        entries: list[tuple[float, int, str]] = []
+        for directory, _, names in os.walk(self.directory):
+            for name in names:
+                path = os.path.join(directory, name)
+                stat = os.stat(path)
+                entries.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= self.max_disk_bytes:
+                break
+            os.remove(path)
+            total -= size
+            removed += 1
+
+        return removed
+
+
+@lru_cache(maxsize=4)
+def open_cache(directory: str|None) -> RenderCache:
+    """The render cache of this process for `directory` (None = memory only)."""
+    return RenderCache(directory)
@@ -0,0 +1,116 @@
+import logging
+import os
+from build_manifest import BuildManifest, PageRecord, SourceState, hash_file
+from content_walker import WalkFilter, shard_of
+from file_deploy import deploy_file
+from image_pipeline import ImageIndex
+from link_map import link_map
+from page_generator import CONTENT_FILTER, BuildResult, collect_pages, remove_output
+
+
+SHARDS_PATH = ".ssg/shards"
+SHARD_MANIFEST = "manifest.json"
+
+logger = logging.getLogger(__name__)
+
+
+def parse_shard(text: str) -> tuple[int, int]:
+    """`i/N` -> (i, N), shards being numbered from 1."""
+    index, _, count = text.partition("/")
+    shard = (int(index), int(count))
+    if not 1 <= shard[0] <= shard[1]:
+        raise ValueError(f"Shard must be i/N with 1 <= i <= N, got {text}")
+
+    return shard
+
+
+def shard_dir(shards_path: str, index: int, count: int) -> str:
+    """Where shard `index` of `count` writes its pages and partial manifest."""
+    return os.path.join(shards_path, f"{index}-of-{count}")
+
+
+def load_shard_manifest(shards_path: str, index: int, count: int) -> BuildManifest:
+    manifest = BuildManifest.load(os.path.join(shard_dir(shards_path, index, count), SHARD_MANIFEST))
+    manifest.shard = (index, count)
+
+    return manifest
+
+
+class ShardMergeError(Exception):
+    def __init__(self, problems: list[str]) -> None:
+        self.problems: list[str] = problems
+        super().__init__(f"{len(problems)} problem(s) merging shards:\n" + "\n".join(problems))
+
+
+def merge_shards(
+    shards_path: str,
+    count: int,
+    content_path: str,
+    template_path: str,
+    dest_path: str,
+    basepath: str,
+    manifest: BuildManifest,
+    walk_filter: WalkFilter = CONTENT_FILTER,
+    strategy: str = "copy",
+    images: ImageIndex|None = None
+) -> BuildResult:
+    """Assemble the output of `count` shards into `dest_path`, recording it in `manifest`.
+
+    Every content page must have been rendered, from its current source,
+    with the current template and basepath and the current `images` of the
+    images it shows, by the shard `shard_of` assigns it to; otherwise
+    ShardMergeError lists what is missing or stale and `dest_path` is left
+    untouched. Pages `manifest` already has up to date are not copied again.
+    """
+    if count < 1:
+        raise ValueError(f"Shard count must be at least 1, got {count}")
+    problems: list[str] = []
+    template_hash = hash_file(template_path)
+    links = link_map(basepath, images)
+    shards: dict[int, BuildManifest] = {}
+    for index in range(1, count + 1):
+        shard = load_shard_manifest(shards_path, index, count)
+        shards[index] = shard
+        if shard.template_hash is None:
+            problems.append(f"shard {index}/{count}: no manifest in {shard_dir(shards_path, index, count)}")
+        elif shard.template_hash != template_hash or shard.basepath != basepath:
+            problems.append(f"shard {index}/{count}: built with another template or basepath")
+    pages: list[tuple[str, str, SourceState, PageRecord]] = []
+    for source, dest in collect_pages(content_path, dest_path, walk_filter):
+        index = shard_of(os.path.relpath(source, content_path), count)
+        record = shards[index].pages.get(source)
+        if record is None:
+            problems.append(f"{source}: not rendered by shard {index}/{count}")
+            continue
+        state = shards[index].source_state(source)
+        if record.source_hash != state.source_hash:
+            problems.append(f"{source}: shard {index}/{count} rendered an older version")
+        elif not os.path.isfile(record.dest):
+            problems.append(f"{source}: {record.dest} is missing")
+        elif not shards[index].is_fresh(source, state.source_hash, record.dest, links.image_key):
+            problems.append(f"{source}: shard {index}/{count} rendered it with other images")
+        else:
+            pages.append((source, dest, state, record))
+    if problems:
+        raise ShardMergeError(problems)
+
+    result = BuildResult()
+    sources = {source for source, _, _, _ in pages}
+    for source in list(manifest.pages):
+        if source not in sources and (record := manifest.forget(source)) is not None:
+            logger.debug("Removing %s, source %s is gone", record.dest, source)
+            remove_output(record.dest, dest_path)
+            result.removed.append(record.dest)
+    rebuild_all = manifest.template_hash != template_hash or manifest.basepath != basepath
+    for source, dest, state, shard_record in pages:
+        if not rebuild_all and manifest.is_fresh(source, state.source_hash, dest, links.image_key):
+            result.skipped.append(dest)
+            continue
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        _ = deploy_file(shard_record.dest, dest, strategy)
+        manifest.record(source, state, dest, shard_record.images)
+        result.rendered.append(dest)
+    manifest.template_hash = template_hash
+    manifest.basepath = basepath
+
+    return result
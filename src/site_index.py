@@ -0,0 +1,322 @@
+from __future__ import annotations
+import hashlib
+import json
+import logging
+import os
+import re
+from datetime import datetime, timezone
+from html import escape
+from atomic_write import atomic_write
+from build_manifest import BuildManifest, hash_file
+from page_generator import front_matter_slots, remove_output, write_page
+from page_meta import PageMeta
+from link_map import LinkMap, link_map
+from template import PLACEHOLDER_REGEX, load_template
+
+
+SITE_INDEX_VERSION = 1
+BLOG_PATH = "blog"
+FEED_NAME = "atom.xml"
+SITEMAP_NAME = "sitemap.xml"
+TAGS_PATH = "tags"
+RECENT_POSTS = 5
+
+logger = logging.getLogger(__name__)
+
+
+def url_for(dest: str, dest_path: str) -> str:
+    """Root-relative URL of the output file `dest`; `index.html` maps to its directory."""
+    relative = os.path.relpath(dest, dest_path).replace(os.sep, "/")
+    if relative == "index.html":
+        return "/"
+    if relative.endswith("/index.html"):
+        return "/" + relative.removesuffix("index.html")
+
+    return "/" + relative
+
+
+def tag_slug(tag: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "-", tag.lower()).strip("-") or "tag"
+
+
+class SiteIndex:
+    """Metadata of every page, kept in step with the build manifest.
+
+    The metadata comes from rendering (`BuildResult.metadata`); a page is
+    only read here when its source changed but it was rendered elsewhere,
+    as by build shards. `outputs` lists the generated listing files and
+    `listings_hash` what they were built from.
+    """
+    def __init__(self, path: str) -> None:
+        self.path: str = path
+        self.pages: dict[str, PageMeta] = {}
+        self.listings_hash: str|None = None
+        self.outputs: list[str] = []
+
+
+    @classmethod
+    def load(cls, path: str) -> SiteIndex:
+        index = cls(path)
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return index
+        if data.get("version") != SITE_INDEX_VERSION:
+            return index
+        index.pages = {source: PageMeta.from_dict(meta) for source, meta in data.get("pages", {}).items()}
+        index.listings_hash = data.get("listings_hash")
+        index.outputs = list(data.get("outputs", []))
+
+        return index
+
+
+    def save(self) -> None:
+        data = {
+            "version": SITE_INDEX_VERSION,
+            "listings_hash": self.listings_hash,
+            "outputs": self.outputs,
+            "pages": {source: meta.to_dict() for source, meta in sorted(self.pages.items())},
+        }
+        with atomic_write(self.path) as f:
+            json.dump(data, f, indent=1, ensure_ascii=False)
+
+
+    def update(
+        self,
+        manifest: BuildManifest,
+        dest_path: str,
+        rendered: dict[str, PageMeta]|None = None
+    ) -> tuple[int, int]:
+        """Bring the index in line with the pages `manifest` records.
+
+        `rendered` is the metadata collected while rendering, by source.
+        Returns how many entries changed and how many of those had to be
+        read from their source.
+        """
+        rendered = rendered or {}
+        for source in list(self.pages):
+            if source not in manifest.pages:
+                del self.pages[source]
+        updated = read = 0
+        for source, record in manifest.pages.items():
+            meta = self.pages.get(source)
+            url = url_for(record.dest, dest_path)
+            fresh = rendered.get(source)
+            if fresh is not None and fresh.source_hash == record.source_hash:
+                fresh.url = url
+                self.pages[source] = fresh
+                updated += 1
+                continue
+            if meta is not None and meta.source_hash == record.source_hash and meta.url == url:
+                continue
+            try:
+                self.pages[source] = PageMeta.read(source, record.source_hash, url)
+            except Exception as e:
+                logger.warning("Cannot index %s: %s", source, e)
+                _ = self.pages.pop(source, None)
+                continue
+            updated += 1
+            read += 1
+
+        return updated, read
+
+
+    def posts(self, content_path: str, section: str = BLOG_PATH) -> list[PageMeta]:
+        """Pages under `content_path`/`section` (its own index excluded), newest first."""
+        root = os.path.join(content_path, section, "")
+        posts = [
+            meta for source, meta in self.pages.items()
+            if source.startswith(root) and os.path.relpath(source, root) not in ("index.md", "index.markdown")
+        ]
+        posts.sort(key=lambda x: x.title)
+        posts.sort(key=lambda x: x.date or "", reverse=True)
+
+        return posts
+
+
+    def tags(self, posts: list[PageMeta]) -> dict[str, list[PageMeta]]:
+        tags: dict[str, list[PageMeta]] = {}
+        for post in posts:
+            for tag in post.tags:
+                tags.setdefault(tag, []).append(post)
+
+        return dict(sorted(tags.items()))
+
+
+def listing_html(title: str, posts: list[PageMeta], links: LinkMap) -> str:
+    items: list[str] = []
+    for post in posts:
+        date = f" <time datetime=\"{escape(post.date)}\">{escape(post.date)}</time>" if post.date else ""
+        tags = "".join(
+            f" <a class=\"tag\" href=\"{escape(links.resolve(f'/{TAGS_PATH}/{tag_slug(tag)}/'))}\">{escape(tag)}</a>"
+            for tag in post.tags
+        )
+        summary = f"<p>{escape(post.summary)}</p>" if post.summary else ""
+        url = escape(links.resolve(post.url))
+        items.append(f"<li><a href=\"{url}\">{escape(post.title)}</a>{date}{tags}{summary}</li>")
+
+    return f"<h1>{escape(title)}</h1><ul class=\"posts\">{''.join(items)}</ul>"
+
+
+def feed_date(date: str|None, fallback: float) -> str:
+    if date:
+        try:
+            parsed = datetime.fromisoformat(date)
+        except ValueError:
+            parsed = None
+        if parsed is not None:
+            if parsed.tzinfo is None:
+                parsed = parsed.replace(tzinfo=timezone.utc)
+            return parsed.isoformat()
+
+    return datetime.fromtimestamp(fallback, timezone.utc).isoformat(timespec="seconds")
+
+
+def atom_feed(title: str, feed_url: str, site_url: str, posts: list[PageMeta], mtimes: dict[str, float]) -> str:
+    updated = [feed_date(post.date, mtimes.get(post.url, 0.0)) for post in posts]
+    entries: list[str] = []
+    for post, date in zip(posts, updated):
+        link = escape(site_url + post.url)
+        entries.append(
+            "<entry>"
+            + f"<title>{escape(post.title)}</title>"
+            + f"<link href=\"{link}\"/>"
+            + f"<id>{link}</id>"
+            + f"<updated>{date}</updated>"
+            + f"<summary>{escape(post.summary)}</summary>"
+            + "".join(f"<category term=\"{escape(tag)}\"/>" for tag in post.tags)
+            + "</entry>"
+        )
+
+    return (
+        "<?xml version=\"1.0\" encoding=\"utf-8\"?>\n"
+        + "<feed xmlns=\"http://www.w3.org/2005/Atom\">"
+        + f"<title>{escape(title)}</title>"
+        + f"<link rel=\"self\" href=\"{escape(site_url + feed_url)}\"/>"
+        + f"<id>{escape(site_url + feed_url)}</id>"
+        + f"<updated>{max(updated, default=feed_date(None, 0.0))}</updated>"
+        + "".join(entries)
+        + "</feed>\n"
+    )
+
+
+def sitemap_xml(site_url: str, pages: list[PageMeta], mtimes: dict[str, float]) -> str:
+    urls = "".join(
+        f"<url><loc>{escape(site_url + page.url)}</loc>"
+        + f"<lastmod>{feed_date(page.date, mtimes.get(page.url, 0.0))}</lastmod></url>"
+        for page in pages
+    )
+
+    return (
+        "<?xml version=\"1.0\" encoding=\"utf-8\"?>\n"
+        + f"<urlset xmlns=\"http://www.sitemaps.org/schemas/sitemap/0.9\">{urls}</urlset>\n"
+    )
+
+
+def generate_listings(
+    index: SiteIndex,
+    manifest: BuildManifest,
+    content_path: str,
+    template_path: str,
+    dest_path: str,
+    basepath: str,
+    site_url: str = ""
+) -> list[str]:
+    """Write the blog index, one page per tag, the Atom feed and the sitemap from `index`.
+
+    Only the index is consulted, never the pages themselves. Nothing is
+    written when neither the indexed pages nor the template and basepath
+    changed since the last call. The feed and sitemap need absolute URLs,
+    so they are only written with a `site_url`. Returns the files written.
+    """
+    posts = index.posts(content_path)
+    prefix = basepath.rstrip("/")
+    site_url = site_url.rstrip("/")
+    mtimes = {
+        prefix + index.pages[source].url: record.mtime_ns / 1e9
+        for source, record in manifest.pages.items() if source in index.pages
+    }
+    digest = hashlib.sha256()
+    digest.update(f"{SITE_INDEX_VERSION}\0{hash_file(template_path)}\0{basepath}\0{site_url}\0".encode())
+    digest.update(json.dumps(
+        [meta.to_dict() for _, meta in sorted(index.pages.items())] + [mtimes], sort_keys=True
+    ).encode())
+    listings_hash = digest.hexdigest()
+    if listings_hash == index.listings_hash and all(map(os.path.exists, index.outputs)):
+        return []
+    template = load_template(template_path, basepath)
+    links = link_map(basepath)
+    outputs: dict[str, str] = {}
+    blog_index = os.path.join(content_path, BLOG_PATH, "index.md")
+    if posts and blog_index not in manifest.pages:
+        outputs[os.path.join(dest_path, BLOG_PATH, "index.html")] = template.render({
+            **front_matter_slots({}, template),
+            "Title": "Blog",
+            "Content": listing_html("Blog", posts, links),
+        })
+    for tag, tagged in index.tags(posts).items():
+        title = f"Posts tagged {tag}"
+        outputs[os.path.join(dest_path, TAGS_PATH, tag_slug(tag), "index.html")] = template.render({
+            **front_matter_slots({}, template),
+            "Title": title,
+            "Content": listing_html(title, tagged, links),
+        })
+    if posts and site_url:
+        outputs[os.path.join(dest_path, BLOG_PATH, FEED_NAME)] = atom_feed(
+            "Blog", f"{prefix}/{BLOG_PATH}/{FEED_NAME}", site_url, [with_prefix(post, prefix) for post in posts], mtimes
+        )
+    pages = sorted((with_prefix(meta, prefix) for meta in index.pages.values()), key=lambda x: x.url)
+    if pages and site_url:
+        outputs[os.path.join(dest_path, SITEMAP_NAME)] = sitemap_xml(site_url, pages, mtimes)
+    if pages and not site_url:
+        logger.warning("No site URL set, skipping the Atom feed and sitemap: they need absolute URLs")
+    for stale in set(index.outputs) - set(outputs):
+        remove_output(stale, dest_path)
+    for path, html in outputs.items():
+        write_page(path, html)
+    index.outputs = sorted(outputs)
+    index.listings_hash = listings_hash
+
+    return index.outputs
+
+
+def site_slots(index: SiteIndex, content_path: str) -> dict[str, str]:
+    """Template slots filled from the index instead of per page: `{{ RecentPosts }}` lists the newest posts."""
+    items = "".join(
+        f"<li><a href=\"{escape(post.url)}\">{escape(post.title)}</a></li>"
+        for post in index.posts(content_path)[:RECENT_POSTS]
+    )
+
+    # Braces are escaped, so no title is taken for a slot when the template is compiled.
+    return {"RecentPosts": f"<ul class=\"recent-posts\">{items}</ul>".replace("{", "&#123;")}
+
+
+def site_template(template_path: str, index: SiteIndex, content_path: str, directory: str) -> str:
+    """Path of a copy of `template_path` with the `site_slots` filled in, rewritten only when it changes.
+
+    The copy has its own hash, so pages are rebuilt exactly when what the
+    slots show changes. A template that uses none of them is used as is.
+    """
+    with open(template_path) as f:
+        source = f.read()
+    slots = site_slots(index, content_path)
+    if not any(match.group(1) in slots for match in PLACEHOLDER_REGEX.finditer(source)):
+        return template_path
+    filled = PLACEHOLDER_REGEX.sub(lambda match: slots.get(match.group(1), match.group(0)), source)
+    path = os.path.join(directory, os.path.basename(template_path))
+    try:
+        with open(path) as f:
+            if f.read() == filled:
+                return path
+    except OSError:
+        pass
+    with atomic_write(path) as f:
+        _ = f.write(filled)
+
+    return path
+
+
+def with_prefix(meta: PageMeta, prefix: str) -> PageMeta:
+    """`meta` with its URL under `prefix`, for output that basepath rewriting does not reach."""
+    return PageMeta(meta.source_hash, prefix + meta.url, meta.title, meta.date, meta.tags, meta.summary)
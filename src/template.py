@@ -0,0 +1,67 @@
+from __future__ import annotations
+import os
+import re
+from collections.abc import Callable, Mapping
+from functools import lru_cache
+from htmlnode import Writer
+
+
+PLACEHOLDER_REGEX = re.compile(r"\{\{ (\w+) \}\}")
+
+SlotValue = str | Callable[[Writer], None]
+
+
+def rewrite_basepath(html: str, basepath: str) -> str:
+    return (
+        html
+        .replace("href=\"/", f"href=\"{basepath}")
+        .replace("src=\"/", f"src=\"{basepath}")
+    )
+
+
+class Template:
+    """Template pre-split into literal segments and `{{ Name }}` slots.
+
+    `segments` always has one more element than `slots`; slot `i` sits
+    between `segments[i]` and `segments[i + 1]`. Basepath rewriting is
+    applied to the literal segments once, at compile time.
+    """
+    def __init__(self, source: str, basepath: str) -> None:
+        parts = PLACEHOLDER_REGEX.split(rewrite_basepath(source, basepath))
+        self.basepath: str = basepath
+        self.segments: list[str] = parts[0::2]
+        self.slots: list[str] = parts[1::2]
+
+
+    def render(self, values: Mapping[str, str]) -> str:
+        pieces: list[str] = [self.segments[0]]
+        for slot, segment in zip(self.slots, self.segments[1:]):
+            pieces.append(values.get(slot, f"{{{{ {slot} }}}}"))
+            pieces.append(segment)
+
+        return "".join(pieces)
+
+
+    def render_into(self, writer: Writer, values: Mapping[str, SlotValue]) -> None:
+        """Write the filled template; callable values stream themselves into `writer`."""
+        _ = writer.write(self.segments[0])
+        for slot, segment in zip(self.slots, self.segments[1:]):
+            value = values.get(slot, f"{{{{ {slot} }}}}")
+            if isinstance(value, str):
+                _ = writer.write(value)
+            else:
+                value(writer)
+            _ = writer.write(segment)
+
+
+@lru_cache(maxsize=8)
+def _compile_template(path: str, basepath: str, mtime_ns: int, size: int) -> Template:
+    with open(path) as f:
+        return Template(f.read(), basepath)
+
+
+def load_template(path: str, basepath: str) -> Template:
+    """Compiled template for `path`, read from disk only when the file changed."""
+    stat = os.stat(path)
+
+    return _compile_template(path, basepath, stat.st_mtime_ns, stat.st_size)
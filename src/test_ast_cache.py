@@ -0,0 +1,103 @@
+import glob
+import os
+import unittest
+
+from ast_cache import AstCache, document_key
+from build_stats import BuildStats
+from file_test_case import FileTestCase
+from node_arena import NodeArena
+from page_generator import parse_page, render_page
+from render_cache import RenderCache
+from text_to_html import markdown_to_node_arena
+
+
+CONTENT_DIR = os.path.join(os.path.dirname(__file__), "..", "content")
+MARKDOWN = "# Title\n\nSome **bold** and a [link](/x)\n\n- one\n- two"
+
+
+class TestArenaBytes(unittest.TestCase):
+    def test_round_trip(self):
+        for path in glob.glob(os.path.join(CONTENT_DIR, "**", "*.md"), recursive=True):
+            with open(path) as f:
+                arena = markdown_to_node_arena(f.read())
+            with self.subTest(path=path):
+                loaded = NodeArena.from_bytes(arena.to_bytes())
+                self.assertEqual(loaded.to_html(), arena.to_html())
+                self.assertEqual(len(loaded), len(arena))
+
+
+    def test_loaded_arena_can_grow(self):
+        arena = NodeArena.from_bytes(markdown_to_node_arena(MARKDOWN).to_bytes())
+        root = len(arena) - 1
+        _ = arena.add_parent("main", [root, arena.add_leaf("b", "more")])
+
+        self.assertTrue(arena.to_html().endswith("</div><b>more</b></main>"))
+
+
+    def test_unknown_format(self):
+        with self.assertRaisesRegex(ValueError, "Unsupported node arena format"):
+            _ = NodeArena.from_bytes(b"\xe9\x00\x00\x00\x00")
+
+
+class TestAstCache(FileTestCase):
+    def setUp(self):
+        super().setUp()
+        self.template = os.path.join(self.root, "template.html")
+        self.write(self.template, "<title>{{ Title }}</title>{{ Content }}")
+
+
+    def test_get_and_put(self):
+        cache = AstCache(self.root)
+        key = document_key(MARKDOWN)
+
+        self.assertIsNone(cache.get(key))
+        cache.put(key, markdown_to_node_arena(MARKDOWN))
+        self.assertEqual(AstCache(self.root).get(key).to_html(), markdown_to_node_arena(MARKDOWN).to_html())
+        self.assertEqual((cache.hits, cache.misses), (0, 1))
+
+
+    def test_corrupt_entry_is_a_miss(self):
+        cache = AstCache(self.root)
+        key = document_key(MARKDOWN)
+        cache.put(key, markdown_to_node_arena(MARKDOWN))
+        with open(os.path.join(self.root, key[:2], key + ".ast"), mode="wb") as f:
+            _ = f.write(b"garbage")
+
+        self.assertIsNone(cache.get(key))
+
+
+    def test_parse_page_skips_parsing_on_hit(self):
+        cache_dir = os.path.join(self.root, "cache")
+        first, second = BuildStats(), BuildStats()
+        page = parse_page(MARKDOWN, self.template, "/", first, cache_dir)
+        cached = parse_page(MARKDOWN, self.template, "/", second, cache_dir)
+
+        self.assertEqual(first.counters["ast_cache_misses"], 1)
+        self.assertEqual(second.counters, {"ast_cache_hits": 1})
+        self.assertEqual(second.stages["inline_parse"].count, 0)
+        self.assertEqual(cached.node.to_html(), page.node.to_html())
+
+
+    def test_basepath_change_reuses_tree(self):
+        cache_dir = os.path.join(self.root, "cache")
+        markdown = "# Title\n\n[home](/) ![Tom](/tom.png)\n\n```\n<a href=\"/raw\">\0</a>\n```"
+        _ = render_page(markdown, self.template, "/", None, cache_dir)
+        stats = BuildStats()
+        html = render_page(markdown, self.template, "/other/", stats, cache_dir)
+
+        self.assertEqual(stats.counters["ast_cache_hits"], 1)
+        self.assertNotIn("ast_cache_misses", stats.counters)
+        self.assertIn("<a href=\"/other/\">home</a>", html)
+        self.assertIn("<img src=\"/other/tom.png\" alt=\"Tom\" />", html)
+        self.assertIn("<code><a href=\"/raw\">\ufffd</a>\n</code>", html)
+
+
+    def test_pruned_with_render_cache(self):
+        cache_dir = os.path.join(self.root, "cache")
+        AstCache(cache_dir).put(document_key(MARKDOWN), markdown_to_node_arena(MARKDOWN))
+
+        self.assertEqual(RenderCache(cache_dir, max_disk_bytes=0).prune(), 1)
+
+
+if __name__ == "__main__":
+    _ = unittest.main()
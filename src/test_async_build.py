@@ -0,0 +1,101 @@
+import asyncio
+import os
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+
+from async_build import build_site, render_pages_async
+from build_manifest import BuildManifest
+from build_stats import BuildStats
+from file_test_case import FileTestCase
+from page_generator import generate_pages_incremental
+
+
+TEMPLATE = "<title>{{ Title }}</title><a href=\"/\">home</a>{{ Content }}"
+
+
+class TestAsyncBuild(FileTestCase):
+    def setUp(self):
+        super().setUp()
+        self.content = os.path.join(self.root, "content")
+        self.static = os.path.join(self.root, "static")
+        self.dest = os.path.join(self.root, "docs")
+        self.template = os.path.join(self.root, "template.html")
+        os.makedirs(os.path.join(self.content, "blog"))
+        os.makedirs(self.static)
+        for i in range(20):
+            self.write(os.path.join(self.content, "blog", f"post{i}.md"), f"# Post {i}\n\nSome **bold** [link](/x)")
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\nHello")
+        self.write(os.path.join(self.static, "index.css"), "body {}")
+        self.write(self.template, TEMPLATE)
+
+
+    def build(self, manifest: BuildManifest, stats: BuildStats|None = None, jobs: int = 1):
+        with redirect_stdout(StringIO()):
+            return asyncio.run(build_site(
+                self.static, self.content, self.template, self.dest, "/site/", manifest, jobs, stats, io_workers=2
+            ))
+
+
+    def test_matches_sequential_build(self):
+        manifest = BuildManifest(os.path.join(self.root, "manifest.json"))
+        sync_result, result = self.build(manifest)
+        sequential = os.path.join(self.root, "sequential")
+        with redirect_stdout(StringIO()):
+            _ = generate_pages_incremental(
+                self.content, self.template, sequential, "/site/", BuildManifest(os.path.join(self.root, "m2"))
+            )
+
+        self.assertEqual(len(sync_result.copied), 1)
+        self.assertEqual(len(result.rendered), 21)
+        self.assertEqual(result.errors, [])
+        for dest in result.rendered:
+            with self.subTest(dest=dest):
+                relative = os.path.relpath(dest, self.dest)
+                self.assertEqual(self.read(dest), self.read(os.path.join(sequential, relative)))
+
+
+    def test_second_build_skips_fresh_pages(self):
+        manifest = BuildManifest(os.path.join(self.root, "manifest.json"))
+        _ = self.build(manifest)
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\nChanged")
+        _, result = self.build(manifest)
+
+        self.assertEqual(result.rendered, [os.path.join(self.dest, "index.html")])
+        self.assertEqual(len(result.skipped), 20)
+
+
+    def test_errors_are_collected(self):
+        self.write(os.path.join(self.content, "broken.md"), "No title")
+        manifest = BuildManifest(os.path.join(self.root, "manifest.json"))
+        _, result = self.build(manifest)
+
+        self.assertEqual([error.source for error in result.errors], [os.path.join(self.content, "broken.md")])
+        self.assertNotIn(os.path.join(self.content, "broken.md"), manifest.pages)
+        self.assertEqual(len(result.rendered), 21)
+
+
+    def test_stats(self):
+        stats = BuildStats()
+        _ = self.build(BuildManifest(os.path.join(self.root, "manifest.json")), stats)
+
+        self.assertEqual(len(stats.pages), 21)
+        self.assertEqual(stats.stages["read"].count, 21)
+        self.assertEqual(stats.stages["write"].count, 21)
+        self.assertEqual(stats.stages["static_copy"].count, 1)
+
+
+    def test_process_pool(self):
+        pages = [(os.path.join(self.content, "index.md"), os.path.join(self.dest, "index.html"))]
+        pages.append((os.path.join(self.content, "missing.md"), os.path.join(self.dest, "missing.html")))
+        stats = BuildStats()
+        with redirect_stdout(StringIO()):
+            errors = asyncio.run(render_pages_async(pages, self.template, "/", 2, stats, io_workers=1))
+
+        self.assertEqual([error.source for error in errors], [os.path.join(self.content, "missing.md")])
+        self.assertIn("<p>Hello</p>", self.read(os.path.join(self.dest, "index.html")))
+        self.assertEqual(stats.stages["block_parse"].count, 1)
+
+
+if __name__ == "__main__":
+    _ = unittest.main()
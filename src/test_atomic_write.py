@@ -0,0 +1,51 @@
+import os
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from atomic_write import atomic_write, replacing
+from file_test_case import FileTestCase
+
+
+class TestAtomicWrite(FileTestCase):
+    def setUp(self):
+        super().setUp()
+        self.target = os.path.join(self.root, "out", "page.html")
+
+
+    def test_write_creates_directory(self):
+        with atomic_write(self.target) as f:
+            _ = f.write("new")
+
+        with open(self.target) as f:
+            self.assertEqual(f.read(), "new")
+        self.assertEqual(os.listdir(os.path.dirname(self.target)), ["page.html"])
+
+
+    def test_failed_write_leaves_old_file(self):
+        with atomic_write(self.target) as f:
+            _ = f.write("old")
+
+        with self.assertRaises(ValueError):
+            with atomic_write(self.target) as f:
+                _ = f.write("half")
+                raise ValueError("serialization failed")
+        with open(self.target) as f:
+            self.assertEqual(f.read(), "old")
+        self.assertEqual(os.listdir(os.path.dirname(self.target)), ["page.html"])
+
+
+    def test_concurrent_writers(self):
+        def write(text: str) -> None:
+            with replacing(self.target) as tmp_path:
+                with open(tmp_path, mode="wt") as f:
+                    _ = f.write(text * 1000)
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            for future in [executor.submit(write, str(i)) for i in range(8)]:
+                future.result()
+        with open(self.target) as f:
+            self.assertIn(f.read(), [str(i) * 1000 for i in range(8)])
+
+
+if __name__ == "__main__":
+    _ = unittest.main()
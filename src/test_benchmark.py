@@ -0,0 +1,45 @@
+import os
+import tempfile
+import unittest
+
+from benchmark import SHAPES, bench_shape, compare, generate_corpus
+from text_to_html import markdown_to_html_node
+
+
+class TestCorpus(unittest.TestCase):
+    def test_shapes_render(self):
+        with tempfile.TemporaryDirectory() as root:
+            for shape in SHAPES:
+                with self.subTest(shape=shape):
+                    paths = generate_corpus(os.path.join(root, shape), shape, scale=0.01)
+                    with open(paths[0]) as f:
+                        html = markdown_to_html_node(f.read()).to_html()
+
+                    self.assertTrue(html.startswith("<div><h1>"))
+
+
+    def test_deterministic(self):
+        with tempfile.TemporaryDirectory() as root:
+            first = generate_corpus(os.path.join(root, "a"), "link-heavy", scale=0.02)
+            second = generate_corpus(os.path.join(root, "b"), "link-heavy", scale=0.02)
+            with open(first[0]) as f, open(second[0]) as g:
+                self.assertEqual(f.read(), g.read())
+
+
+class TestBenchmark(unittest.TestCase):
+    def test_bench_and_compare(self):
+        results = bench_shape("code-blocks", scale=0.05, repeat=1)
+        stages = [result["stage"] for result in results]
+
+        self.assertIn("generate_pages_recursive", stages)
+        ok, rows = compare(results, results, 0.1)
+        self.assertTrue(ok)
+        self.assertEqual(len(rows), len(results) + 1)
+        slower = [dict(result, min_s=float(result["min_s"]) * 2 + 1) for result in results]  # pyright: ignore[reportArgumentType]
+        ok, rows = compare(slower, results, 0.1)
+        self.assertFalse(ok)
+        self.assertTrue(all(row.endswith("REGRESSION") for row in rows[1:]))
+
+
+if __name__ == "__main__":
+    _ = unittest.main()
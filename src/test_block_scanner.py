@@ -0,0 +1,76 @@
+import io
+import unittest
+
+from block_scanner import scan_blocks
+from blocknode import BlockType
+from text_to_html import markdown_to_html_node
+
+
+class TestScanBlocks(unittest.TestCase):
+    def test_types(self):
+        md = "# Title\n\n> quote\n> more\n\n- a\n- b\n\n1. one\n2. two\n\nSome text\nnext line\n"
+        blocks = list(scan_blocks(md.splitlines()))
+
+        self.assertEqual([block_type for block_type, _ in blocks], [
+            BlockType.HEADING,
+            BlockType.QUOTE,
+            BlockType.UNOLIST,
+            BlockType.OLIST,
+            BlockType.PARAGRAPH,
+        ])
+        self.assertEqual(blocks[4][1], ["Some text", "next line"])
+
+
+    def test_code_block_with_blank_lines(self):
+        md = "```\ndef f():\n\n    return 1\n```\nAfter fence"
+        blocks = list(scan_blocks(md.splitlines()))
+
+        self.assertEqual(blocks, [
+            (BlockType.CODE, ["```", "def f():", "", "    return 1", "```"]),
+            (BlockType.PARAGRAPH, ["After fence"]),
+        ])
+
+
+    def test_single_line_fence(self):
+        self.assertEqual(list(scan_blocks(["```x = 1```"])), [(BlockType.CODE, ["```x = 1```"])])
+
+
+    def test_unclosed_fence_falls_back_to_paragraphs(self):
+        md = "```\nnot code\n\n# Heading"
+        blocks = list(scan_blocks(md.splitlines()))
+
+        self.assertEqual(blocks, [
+            (BlockType.PARAGRAPH, ["```", "not code"]),
+            (BlockType.HEADING, ["# Heading"]),
+        ])
+
+
+    def test_whitespace_is_trimmed(self):
+        blocks = list(scan_blocks(["   ", "  # Title  ", " \t", ""]))
+
+        self.assertEqual(blocks, [(BlockType.HEADING, ["# Title"])])
+
+
+    def test_reads_file_objects_lazily(self):
+        consumed: list[str] = []
+
+        def lines():
+            for line in io.StringIO("First\n\nSecond\n"):
+                consumed.append(line)
+                yield line
+
+        blocks = scan_blocks(lines())
+        _ = next(blocks)
+
+        self.assertEqual(consumed, ["First\n", "\n"])
+
+
+    def test_html_from_file_object(self):
+        md = "# Title\n\n```\nline 1\n\nline 2\n```\n"
+        html = markdown_to_html_node(io.StringIO(md)).to_html()
+
+        self.assertEqual(html, "<div><h1>Title</h1><pre><code>line 1\n\nline 2\n</code></pre></div>")
+
+
+if __name__ == "__main__":
+    _ = unittest.main()
@@ -0,0 +1,48 @@
+import json
+import logging
+import unittest
+
+from build_log import JsonFormatter, configure_logging, log_stages
+from build_stats import BuildStats
+
+
+class TestBuildLog(unittest.TestCase):
+    def tearDown(self):
+        logging.getLogger().handlers = []
+        logging.getLogger().setLevel(logging.WARNING)
+
+
+    def test_json_formatter(self):
+        record = logging.LogRecord("main", logging.INFO, __file__, 1, "Pages rendered: %d", (3,), None)
+        record.fields = {"event": "pages", "rendered": 3}
+        data = json.loads(JsonFormatter().format(record))
+
+        self.assertEqual(data["message"], "Pages rendered: 3")
+        self.assertEqual(data["level"], "info")
+        self.assertEqual(data["event"], "pages")
+        self.assertEqual(data["rendered"], 3)
+
+
+    def test_verbosity_levels(self):
+        for verbosity, level in ((-1, logging.WARNING), (0, logging.INFO), (1, logging.DEBUG)):
+            with self.subTest(verbosity=verbosity):
+                configure_logging(verbosity)
+                self.assertEqual(logging.getLogger().level, level)
+                self.assertEqual(len(logging.getLogger().handlers), 1)
+
+
+    def test_log_stages(self):
+        stats = BuildStats()
+        stats.add("read", 0.5, 4)
+        stats.add("write", 0.25, 4)
+        logger = logging.getLogger("test_build_log")
+
+        with self.assertLogs(logger, logging.INFO) as logs:
+            log_stages(logger, stats)
+
+        self.assertEqual(logs.output, ["INFO:test_build_log:read: 4 in 0.5000s", "INFO:test_build_log:write: 4 in 0.2500s"])
+        self.assertEqual(logs.records[0].fields["stage"], "read")  # pyright: ignore[reportAttributeAccessIssue]
+
+
+if __name__ == "__main__":
+    _ = unittest.main()
@@ -0,0 +1,160 @@
+import os
+import unittest
+from unittest import mock
+
+from build_manifest import BuildManifest, hash_file
+from file_test_case import FileTestCase
+from page_generator import PageGenerationError, generate_pages_incremental, generate_pages_recursive, update_pages
+
+
+TEMPLATE = "<title>{{ Title }}</title><a href=\"/\">home</a>{{ Content }}"
+
+
+class TestIncrementalBuild(FileTestCase):
+    def setUp(self):
+        super().setUp()
+        self.content = os.path.join(self.root, "content")
+        self.dest = os.path.join(self.root, "docs")
+        self.template = os.path.join(self.root, "template.html")
+        self.manifest_path = os.path.join(self.root, ".ssg", "manifest.json")
+        os.makedirs(os.path.join(self.content, "blog", "tom"))
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\nHello")
+        self.write(os.path.join(self.content, "blog", "tom", "index.md"), "# Tom\n\nBombadil")
+        self.write(self.template, TEMPLATE)
+
+
+    def build(self, basepath: str = "/", jobs: int = 1):
+        manifest = BuildManifest.load(self.manifest_path)
+        result = generate_pages_incremental(self.content, self.template, self.dest, basepath, manifest, jobs)
+        manifest.save()
+        return result
+
+
+    def test_first_build_renders_everything(self):
+        result = self.build()
+
+        self.assertEqual(len(result.rendered), 2)
+        self.assertTrue(os.path.exists(os.path.join(self.dest, "blog", "tom", "index.html")))
+
+
+    def test_rebuild_skips_unchanged(self):
+        _ = self.build()
+        result = self.build()
+
+        self.assertEqual(result.rendered, [])
+        self.assertEqual(len(result.skipped), 2)
+
+
+    def test_changed_source_only(self):
+        _ = self.build()
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\nChanged")
+        result = self.build()
+
+        self.assertEqual(result.rendered, [os.path.join(self.dest, "index.html")])
+
+
+    def test_template_and_basepath_invalidate_all(self):
+        _ = self.build()
+        self.write(self.template, TEMPLATE + "\n")
+
+        self.assertEqual(len(self.build().rendered), 2)
+        self.assertEqual(len(self.build("/SSG/").rendered), 2)
+
+
+    def test_removed_source_deletes_output(self):
+        _ = self.build()
+        os.remove(os.path.join(self.content, "blog", "tom", "index.md"))
+        result = self.build()
+
+        self.assertEqual(result.removed, [os.path.join(self.dest, "blog", "tom", "index.html")])
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "blog")))
+        self.assertNotIn(os.path.join(self.content, "blog", "tom", "index.md"),
+                         BuildManifest.load(self.manifest_path).pages)
+
+
+    def test_parallel_build(self):
+        result = self.build(jobs=2)
+
+        self.assertEqual(len(result.rendered), 2)
+        self.assertEqual(result.errors, [])
+        with open(os.path.join(self.dest, "blog", "tom", "index.html")) as f:
+            self.assertIn("<p>Bombadil</p>", f.read())
+
+
+    def test_parallel_errors_reported_per_file(self):
+        broken = os.path.join(self.content, "broken.md")
+        self.write(broken, "No title here")
+        result = self.build(jobs=2)
+
+        self.assertEqual([error.source for error in result.errors], [broken])
+        self.assertEqual(len(result.rendered), 2)
+        self.assertNotIn(broken, BuildManifest.load(self.manifest_path).pages)
+
+
+    def test_source_changed_while_rendering_rebuilt_next_time(self):
+        home = os.path.join(self.content, "index.md")
+
+        def read_and_change(path: str) -> str:
+            with open(path) as f:
+                markdown = f.read()
+            if path == home:
+                self.write(home, "# Home\n\nChanged while rendering")
+            return markdown
+
+        with mock.patch("page_generator.read_markdown", side_effect=read_and_change):
+            _ = self.build()
+        result = self.build()
+
+        self.assertEqual(result.rendered, [os.path.join(self.dest, "index.html")])
+        with open(os.path.join(self.dest, "index.html")) as f:
+            self.assertIn("Changed while rendering", f.read())
+
+
+    def test_failed_serialization_leaves_no_tmp_file(self):
+        def fill_page(writer, page, stats=None):
+            _ = writer.write("<html>half")
+            raise ValueError("cannot serialize")
+
+        with mock.patch("page_generator.fill_page", side_effect=fill_page):
+            result = self.build()
+
+        self.assertEqual(len(result.errors), 2)
+        for directory, _, names in os.walk(self.dest):
+            self.assertEqual([name for name in names if name.endswith(".tmp")], [], directory)
+
+
+    def test_recursive_parallel_raises_collected_errors(self):
+        self.write(os.path.join(self.content, "broken.md"), "No title here")
+
+        with self.assertRaisesRegex(PageGenerationError, "1 page\\(s\\) failed"):
+            generate_pages_recursive(self.content, self.template, self.dest, "/", jobs=2)
+
+
+    def test_update_pages_only_touches_changed(self):
+        _ = self.build()
+        tom = os.path.join(self.content, "blog", "tom", "index.md")
+        self.write(tom, "# Tom\n\nChanged")
+        new_page = os.path.join(self.content, "new.md")
+        self.write(new_page, "# New")
+        os.remove(os.path.join(self.content, "index.md"))
+        manifest = BuildManifest.load(self.manifest_path)
+        result = update_pages(
+            {tom, new_page, os.path.join(self.content, "index.md")},
+            self.content, self.template, self.dest, "/", manifest
+        )
+
+        self.assertEqual(
+            result.rendered,
+            [os.path.join(self.dest, "blog", "tom", "index.html"), os.path.join(self.dest, "new.html")]
+        )
+        self.assertEqual(result.removed, [os.path.join(self.dest, "index.html")])
+        self.assertEqual(sorted(manifest.pages), sorted([tom, new_page]))
+
+
+    def test_hash_file(self):
+        self.assertEqual(hash_file(self.template), hash_file(self.template))
+        self.assertNotEqual(hash_file(self.template), hash_file(os.path.join(self.content, "index.md")))
+
+
+if __name__ == "__main__":
+    _ = unittest.main()
@@ -0,0 +1,67 @@
+import os
+import tempfile
+import time
+import unittest
+
+from build_stats import STAGES, BuildStats, Stopwatch
+from page_generator import render_pages
+
+
+class TestBuildStats(unittest.TestCase):
+    def test_add_and_merge(self):
+        stats = BuildStats()
+        stats.add("read", 1.0)
+        other = BuildStats()
+        other.add("read", 0.5, 2)
+        other.add_page("a.md", 0.5)
+        stats.merge(other)
+
+        self.assertEqual(stats.stages["read"].seconds, 1.5)
+        self.assertEqual(stats.stages["read"].count, 3)
+        self.assertEqual(stats.pages, {"a.md": 0.5})
+
+
+    def test_outliers_and_summary(self):
+        stats = BuildStats()
+        for i in range(10):
+            stats.add_page(f"{i}.md", float(i))
+
+        self.assertEqual(stats.outliers(2), [("9.md", 9.0), ("8.md", 8.0)])
+        self.assertIn("slowest pages:", stats.summary())
+
+
+    def test_stopwatch_excludes_nested(self):
+        stats = BuildStats()
+        stopwatch = Stopwatch(stats)
+        with stats.stage("inline_parse"):
+            time.sleep(0.02)
+        stopwatch.lap("block_parse", "inline_parse")
+
+        self.assertGreaterEqual(stats.stages["inline_parse"].seconds, 0.02)
+        self.assertLess(stats.stages["block_parse"].seconds, 0.01)
+
+
+class TestProfiledRender(unittest.TestCase):
+    def test_render_collects_every_stage(self):
+        with tempfile.TemporaryDirectory() as root:
+            source = os.path.join(root, "index.md")
+            template = os.path.join(root, "template.html")
+            with open(source, mode="wt") as f:
+                _ = f.write("# Title\n\nSome **bold** text\n\n- a\n- b")
+            with open(template, mode="wt") as f:
+                _ = f.write("<title>{{ Title }}</title>{{ Content }}")
+            for jobs in (1, 2):
+                with self.subTest(jobs=jobs):
+                    stats = BuildStats()
+                    pages = [(source, os.path.join(root, "docs", f"{jobs}.html")), (source, os.path.join(root, "docs", "x.html"))]
+                    errors = render_pages(pages, template, "/", jobs, stats)
+
+                    self.assertEqual(errors, [])
+                    self.assertEqual(list(stats.pages), [source])
+                    for stage in ("read", "block_parse", "inline_parse", "serialize", "template_fill", "write"):
+                        self.assertGreater(stats.stages[stage].count, 0, stage)
+                    self.assertEqual(set(STAGES), set(stats.to_dict()["stages"]))  # pyright: ignore[reportArgumentType]
+
+
+if __name__ == "__main__":
+    _ = unittest.main()
@@ -0,0 +1,138 @@
+import os
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+
+from build_manifest import BuildManifest
+from content_walker import MARKDOWN_EXTENSIONS, WalkFilter, walk
+from file_test_case import FileTestCase
+from page_generator import collect_pages, generate_pages_incremental, update_pages
+
+
+class TestWalk(FileTestCase):
+    def setUp(self):
+        super().setUp()
+        for relative in (
+            "index.md",
+            "notes.txt",
+            "b.markdown",
+            os.path.join("blog", "a.md"),
+            os.path.join("blog", "draft.md"),
+            os.path.join("blog", "images", "cat.png"),
+            os.path.join("drafts", "wip.md"),
+        ):
+            self.write(relative, "# Title")
+
+
+    def relatives(self, walk_filter: WalkFilter|None = None) -> list[str]:
+        return [entry.relative for entry in walk(self.root, walk_filter)]
+
+
+    def test_name_order_depth_first(self):
+        self.assertEqual(self.relatives(), [
+            "b.markdown",
+            os.path.join("blog", "a.md"),
+            os.path.join("blog", "draft.md"),
+            os.path.join("blog", "images", "cat.png"),
+            os.path.join("drafts", "wip.md"),
+            "index.md",
+            "notes.txt",
+        ])
+
+
+    def test_entries_carry_stat(self):
+        entry = next(iter(walk(self.root)))
+
+        self.assertEqual(entry.path, os.path.join(self.root, "b.markdown"))
+        self.assertEqual(entry.stat().st_size, len("# Title"))
+
+
+    def test_extensions(self):
+        self.assertEqual(self.relatives(WalkFilter(extensions=MARKDOWN_EXTENSIONS)), [
+            "b.markdown",
+            os.path.join("blog", "a.md"),
+            os.path.join("blog", "draft.md"),
+            os.path.join("drafts", "wip.md"),
+            "index.md",
+        ])
+
+
+    def test_include_and_exclude(self):
+        walk_filter = WalkFilter(include=["blog/*.md"], exclude=["draft*"])
+
+        self.assertEqual(self.relatives(walk_filter), [os.path.join("blog", "a.md")])
+
+
+    def test_ignore_file(self):
+        self.write(".ssgignore", "# comment\n\nimages/\n*.txt\n/drafts\n")
+
+        self.assertEqual(self.relatives(), [
+            "b.markdown",
+            os.path.join("blog", "a.md"),
+            os.path.join("blog", "draft.md"),
+            "index.md",
+        ])
+
+
+    def test_directory_only_pattern(self):
+        self.write(os.path.join("docs", "images"), "not a directory")
+
+        self.assertIn(os.path.join("docs", "images"), self.relatives(WalkFilter(exclude=["images/"])))
+        self.assertNotIn(os.path.join("blog", "images", "cat.png"), self.relatives(WalkFilter(exclude=["images/"])))
+
+
+    def test_accepts(self):
+        walk_filter = WalkFilter(exclude=["drafts/"], extensions=MARKDOWN_EXTENSIONS)
+
+        self.assertTrue(walk_filter.accepts(os.path.join("blog", "a.md")))
+        self.assertFalse(walk_filter.accepts(os.path.join("drafts", "wip.md")))
+        self.assertFalse(walk_filter.accepts("notes.txt"))
+
+
+    def test_collect_pages_skips_other_files(self):
+        pages = collect_pages(self.root, "docs")
+
+        self.assertIn((os.path.join(self.root, "b.markdown"), os.path.join("docs", "b.html")), pages)
+        self.assertEqual(len(pages), 5)
+
+
+class TestFilteredBuild(FileTestCase):
+    def setUp(self):
+        super().setUp()
+        self.content = os.path.join(self.root, "content")
+        self.dest = os.path.join(self.root, "docs")
+        self.template = os.path.join(self.root, "template.html")
+        os.makedirs(os.path.join(self.content, "drafts"))
+        self.write(os.path.join(self.content, "index.md"), "# Home")
+        self.write(os.path.join(self.content, "notes.txt"), "not markdown")
+        self.write(os.path.join(self.content, "drafts", "wip.md"), "# WIP")
+        self.write(self.template, "{{ Title }}{{ Content }}")
+        self.manifest = BuildManifest(os.path.join(self.root, "manifest.json"))
+
+
+    def test_ignored_pages_are_removed(self):
+        with redirect_stdout(StringIO()):
+            first = generate_pages_incremental(self.content, self.template, self.dest, "/", self.manifest)
+            self.write(os.path.join(self.content, ".ssgignore"), "drafts/\n")
+            second = generate_pages_incremental(self.content, self.template, self.dest, "/", self.manifest)
+
+        self.assertEqual(len(first.rendered), 2)
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "notes.txt")))
+        self.assertEqual(second.removed, [os.path.join(self.dest, "drafts", "wip.html")])
+
+
+    def test_update_pages_respects_filter(self):
+        wip = os.path.join(self.content, "drafts", "wip.md")
+        with redirect_stdout(StringIO()):
+            _ = generate_pages_incremental(self.content, self.template, self.dest, "/", self.manifest)
+            result = update_pages(
+                {wip, os.path.join(self.content, "notes.txt")}, self.content, self.template, self.dest, "/",
+                self.manifest, walk_filter=WalkFilter(exclude=["drafts/"], extensions=MARKDOWN_EXTENSIONS)
+            )
+
+        self.assertEqual(result.rendered, [])
+        self.assertEqual(result.removed, [os.path.join(self.dest, "drafts", "wip.html")])
+
+
+if __name__ == "__main__":
+    _ = unittest.main()
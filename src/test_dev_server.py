@@ -0,0 +1,172 @@
+import os
+import struct
+import threading
+import unittest
+from http.client import HTTPConnection
+from unittest import mock
+
+from dev_server import LIVE_RELOAD_PATH, LIVE_RELOAD_SCRIPT, DevSite, make_server, relative_url_path
+from file_test_case import FileTestCase
+
+
+class TestDevServer(FileTestCase):
+    def setUp(self):
+        super().setUp()
+        self.content = os.path.join(self.root, "content")
+        self.static = os.path.join(self.root, "static")
+        self.template = os.path.join(self.root, "template.html")
+        os.makedirs(os.path.join(self.content, "blog", "tom"))
+        os.makedirs(self.static)
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\n[Tom](/blog/tom)")
+        self.write(os.path.join(self.content, "blog", "tom", "index.md"), "# Tom\n\nBombadil")
+        self.write(os.path.join(self.content, "about.md"), "# About")
+        self.write(os.path.join(self.static, "index.css"), "body {}")
+        self.write(self.template, "<html><body>{{ Content }}</body></html>")
+        self.site = DevSite(self.content, self.static, self.template)
+        self.server = make_server(self.site, port=0)
+        self.thread = threading.Thread(target=self.server.serve_forever, args=(0.05,), daemon=True)
+        self.thread.start()
+
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+    def get(self, path: str, headers: dict[str, str]|None = None):
+        connection = HTTPConnection("127.0.0.1", self.server.server_port, timeout=5)
+        connection.request("GET", path, headers=headers or {})
+        response = connection.getresponse()
+        body = response.read()
+        connection.close()
+        return response, body.decode()
+
+
+    def test_relative_url_path(self):
+        self.assertEqual(relative_url_path("/"), "")
+        self.assertEqual(relative_url_path("/blog/tom/?x=1"), "blog/tom/")
+        self.assertEqual(relative_url_path("/a%20b.css"), "a b.css")
+        self.assertIsNone(relative_url_path("/../secret"))
+
+
+    def test_find_source(self):
+        self.assertEqual(self.site.find_source(""), (os.path.join(self.content, "index.md"), True))
+        self.assertEqual(self.site.find_source("about.html"), (os.path.join(self.content, "about.md"), False))
+        self.assertEqual(self.site.find_source("about"), (os.path.join(self.content, "about.md"), False))
+        self.assertEqual(
+            self.site.find_source("blog/tom"), (os.path.join(self.content, "blog", "tom", "index.md"), True)
+        )
+        self.assertIsNone(self.site.find_source("missing"))
+
+
+    def test_page_rendered_in_memory_with_live_reload(self):
+        response, body = self.get("/")
+
+        self.assertEqual(response.status, 200)
+        self.assertIn("<h1>Home</h1>", body)
+        self.assertIn(LIVE_RELOAD_SCRIPT + "</body>", body)
+        self.assertEqual(response.getheader("Cache-Control"), "no-cache")
+        self.assertEqual(self.get("/", {"If-None-Match": response.getheader("ETag")})[0].status, 304)
+
+
+    def test_directory_redirect(self):
+        response, _ = self.get("/blog/tom")
+
+        self.assertEqual(response.status, 302)
+        self.assertEqual(response.getheader("Location"), "/blog/tom/")
+        self.assertIn("Bombadil", self.get("/blog/tom/")[1])
+
+
+    def test_cached_until_source_changes(self):
+        source = os.path.join(self.content, "about.md")
+        first = self.site.render(source)
+
+        self.assertIs(self.site.render(source), first)
+        self.write(source, "# About\n\nChanged")
+        self.site.on_change({source})
+        self.assertIn("Changed", self.get("/about.html")[1])
+
+
+    def test_change_during_render_not_cached(self):
+        source = os.path.join(self.content, "about.md")
+
+        def read_and_change(path: str) -> str:
+            with open(path) as f:
+                markdown = f.read()
+            self.site.on_change({source})
+            return markdown
+
+        with mock.patch("dev_server.read_markdown", side_effect=read_and_change):
+            _ = self.site.render(source)
+        self.assertNotIn(source, self.site.pages)
+
+
+    def test_head_has_no_body(self):
+        connection = HTTPConnection("127.0.0.1", self.server.server_port, timeout=5)
+        connection.request("HEAD", "/missing.html")
+        response = connection.getresponse()
+        self.assertEqual(response.status, 404)
+        self.assertEqual(response.read(), b"")
+        connection.request("GET", "/index.css")
+        response = connection.getresponse()
+
+        self.assertEqual(response.status, 200)
+        self.assertEqual(response.read(), b"body {}")
+        connection.close()
+
+
+    def test_image_change_swaps_index(self):
+        image = os.path.join(self.static, "tom.gif")
+        self.write(os.path.join(self.content, "about.md"), "# About\n\n![Tom](/tom.gif)")
+        with open(image, mode="wb") as f:
+            _ = f.write(b"GIF89a" + struct.pack("<HH", 40, 30) + b"\0" * 10)
+        self.site.on_change({image})
+        images = self.site.images
+        self.assertIn("width=\"40\"", self.get("/about.html")[1])
+
+        with open(image, mode="wb") as f:
+            _ = f.write(b"GIF89a" + struct.pack("<HH", 80, 60) + b"\0" * 12)
+        self.site.on_change({image})
+        self.assertIsNot(self.site.images, images)
+        self.assertEqual(images.images["/tom.gif"].width, 40)
+        self.assertIn("width=\"80\"", self.get("/about.html")[1])
+        self.site.on_change({os.path.join(self.static, "index.css")})
+        self.assertIn(os.path.join(self.content, "about.md"), self.site.pages)
+
+
+    def test_template_change_clears_pages(self):
+        _ = self.site.render(os.path.join(self.content, "about.md"))
+        self.site.on_change({self.template})
+
+        self.assertEqual(self.site.pages, {})
+
+
+    def test_static_files(self):
+        response, body = self.get("/index.css")
+
+        self.assertEqual(body, "body {}")
+        self.assertEqual(response.getheader("Content-Type"), "text/css")
+        self.assertEqual(self.get("/index.css", {"If-None-Match": response.getheader("ETag")})[0].status, 304)
+        self.assertEqual(self.get("/missing.css")[0].status, 404)
+
+
+    def test_render_error(self):
+        self.write(os.path.join(self.content, "broken.md"), "No title")
+
+        with self.assertLogs("dev_server", "ERROR"):
+            self.assertEqual(self.get("/broken.html")[0].status, 500)
+
+
+    def test_live_reload_stream(self):
+        connection = HTTPConnection("127.0.0.1", self.server.server_port, timeout=5)
+        connection.request("GET", LIVE_RELOAD_PATH)
+        response = connection.getresponse()
+
+        self.assertEqual(response.getheader("Content-Type"), "text/event-stream")
+        self.site.on_change({os.path.join(self.content, "about.md")})
+        self.assertEqual(response.fp.readline(), b"data: reload\n")
+        connection.close()
+
+
+if __name__ == "__main__":
+    _ = unittest.main()
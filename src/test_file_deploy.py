@@ -0,0 +1,111 @@
+import os
+import unittest
+
+from build_manifest import AssetRecord
+from file_deploy import deploy_file, sync_dir_content
+from file_test_case import FileTestCase
+
+
+class TestSyncDirContent(FileTestCase):
+    def setUp(self):
+        super().setUp()
+        self.static = os.path.join(self.root, "static")
+        self.docs = os.path.join(self.root, "docs")
+        os.makedirs(os.path.join(self.static, "images"))
+        self.write(os.path.join(self.static, "index.css"), "body {}")
+        self.write(os.path.join(self.static, "images", "tom.png"), "png")
+        self.assets: dict[str, AssetRecord] = {}
+
+
+    def test_first_sync_copies_everything(self):
+        result = sync_dir_content(self.static, self.docs, self.assets)
+
+        self.assertEqual(len(result.copied), 2)
+        self.assertEqual(sorted(self.assets), [os.path.join("images", "tom.png"), "index.css"])
+        self.assertTrue(os.path.isfile(os.path.join(self.docs, "images", "tom.png")))
+
+
+    def test_unchanged_files_untouched(self):
+        _ = sync_dir_content(self.static, self.docs, self.assets)
+        target = os.path.join(self.docs, "index.css")
+        os.utime(target, ns=(1, 1))
+        result = sync_dir_content(self.static, self.docs, self.assets)
+
+        self.assertEqual(result.copied, [])
+        self.assertEqual(len(result.unchanged), 2)
+        self.assertEqual(os.stat(target).st_mtime_ns, 1)
+
+
+    def test_changed_and_stale_files(self):
+        _ = sync_dir_content(self.static, self.docs, self.assets)
+        self.write(os.path.join(self.docs, "index.html"), "page")
+        self.write(os.path.join(self.static, "index.css"), "body { color: red; }")
+        os.remove(os.path.join(self.static, "images", "tom.png"))
+        result = sync_dir_content(self.static, self.docs, self.assets)
+
+        self.assertEqual(result.copied, [os.path.join(self.docs, "index.css")])
+        self.assertEqual(result.removed, [os.path.join(self.docs, "images", "tom.png")])
+        self.assertTrue(os.path.isfile(os.path.join(self.docs, "index.html")))
+
+
+    def test_checksum_ignores_touched_files(self):
+        _ = sync_dir_content(self.static, self.docs, self.assets, checksum=True)
+        source = os.path.join(self.static, "index.css")
+        os.utime(source, ns=(5, 5))
+        result = sync_dir_content(self.static, self.docs, self.assets, checksum=True)
+
+        self.assertEqual(result.copied, [])
+        self.assertEqual(self.assets["index.css"].mtime_ns, 5)
+
+
+    def test_sync_reports_strategies(self):
+        result = sync_dir_content(self.static, self.docs, self.assets, strategy="hardlink")
+
+        self.assertEqual(result.strategies, {"hardlink": 2})
+        self.assertTrue(os.path.samefile(
+            os.path.join(self.static, "index.css"),
+            os.path.join(self.docs, "index.css")
+        ))
+
+
+    def test_deploy_strategies(self):
+        source = os.path.join(self.static, "index.css")
+        os.makedirs(self.docs)
+        for strategy in ("auto", "hardlink", "reflink", "copy_file_range", "copy"):
+            with self.subTest(strategy=strategy):
+                target = os.path.join(self.docs, f"{strategy}.css")
+                used = deploy_file(source, target, strategy)
+
+                self.assertIn(used, (strategy, "copy") if strategy != "auto" else ("hardlink",))
+                with open(target) as f:
+                    self.assertEqual(f.read(), "body {}")
+                self.assertEqual(os.stat(target).st_mtime_ns, os.stat(source).st_mtime_ns)
+
+
+    def test_redeploy_does_not_write_through_hardlink(self):
+        source = os.path.join(self.static, "index.css")
+        target = os.path.join(self.docs, "index.css")
+        os.makedirs(self.docs)
+        _ = deploy_file(source, target, "hardlink")
+        other = os.path.join(self.static, "other.css")
+        self.write(other, "new")
+        _ = deploy_file(other, target, "copy")
+
+        with open(target) as f:
+            self.assertEqual(f.read(), "new")
+        with open(source) as f:
+            self.assertEqual(f.read(), "body {}")
+
+
+    def test_unknown_strategy(self):
+        with self.assertRaisesRegex(ValueError, "Unknown deploy strategy"):
+            _ = deploy_file("a", "b", "teleport")
+
+
+    def test_missing_source(self):
+        with self.assertRaisesRegex(ValueError, "Given path does not exists"):
+            _ = sync_dir_content(os.path.join(self.root, "nope"), self.docs, self.assets)
+
+
+if __name__ == "__main__":
+    _ = unittest.main()
@@ -0,0 +1,73 @@
+import os
+import tempfile
+import unittest
+
+from front_matter import as_list, is_draft, read_front_matter, split_front_matter
+from page_generator import extract_title, render_page
+
+
+class TestFrontMatter(unittest.TestCase):
+    def test_split(self):
+        md = "---\ntitle: \"Tom\"\ndate: 2024-05-01\ntags: [lotr, rant]\n---\n# Heading\n\nText"
+
+        front_matter, body = split_front_matter(md)
+
+        self.assertEqual(front_matter, {"title": "Tom", "date": "2024-05-01", "tags": ["lotr", "rant"]})
+        self.assertEqual(body, "# Heading\n\nText")
+
+
+    def test_no_front_matter(self):
+        for md in ("# Title", "----\n# Title", "---\ntitle: never closed\n# Title"):
+            with self.subTest(md=md):
+                self.assertEqual(split_front_matter(md), ({}, md))
+
+
+    def test_toml(self):
+        front_matter, body = split_front_matter("+++\ntitle = \"Tom\"\ntags = [\"a\", \"b\"]\n[extra]\n+++\n# T")
+
+        self.assertEqual(front_matter, {"title": "Tom", "tags": ["a", "b"]})
+        self.assertEqual(body, "# T")
+
+
+    def test_reader_stops_after_header(self):
+        lines = iter(["---\n", "draft: yes\n", "---\n", "# Title\n", "Body\n"])
+        front_matter, body = read_front_matter(lines)
+
+        self.assertTrue(is_draft(front_matter))
+        self.assertEqual(next(lines), "# Title\n")
+        self.assertEqual(list(body), ["Body\n"])
+
+
+    def test_title_after_front_matter(self):
+        self.assertEqual(extract_title(split_front_matter("---\ndate: 2024\n---\n\n# Title \nText")[1]), "Title")
+        self.assertFalse(is_draft({"draft": "false"}))
+
+
+    def test_as_list(self):
+        self.assertEqual(as_list("a, b ,"), ["a", "b"])
+        self.assertEqual(as_list(["a"]), ["a"])
+        self.assertEqual(as_list(None), [])
+
+
+    def test_front_matter_fills_template(self):
+        with tempfile.TemporaryDirectory() as root:
+            template = os.path.join(root, "template.html")
+            with open(template, mode="wt") as f:
+                _ = f.write("{{ Title }}|{{ Date }}|{{ Tags }}|{{ Content }}")
+            html = render_page("---\ntitle: Custom\ndate: 2024\ntags: a, b\n---\n# Heading", template, "/")
+
+        self.assertEqual(html, "Custom|2024|a, b|<div><h1>Heading</h1></div>")
+
+
+    def test_slots_without_front_matter_empty(self):
+        with tempfile.TemporaryDirectory() as root:
+            template = os.path.join(root, "template.html")
+            with open(template, mode="wt") as f:
+                _ = f.write("{{ Title }}|<time>{{ Date }}</time>|{{ Tags }}|{{ Content }}")
+            html = render_page("# Heading", template, "/")
+
+        self.assertEqual(html, "Heading|<time></time>||<div><h1>Heading</h1></div>")
+
+
+if __name__ == "__main__":
+    _ = unittest.main()
@@ -1,3 +1,4 @@
+from io import StringIO
 from typing import override
 import unittest
 
@@ -171,5 +172,30 @@ class TestParentNode(unittest.TestCase):
             "<div><span elden=\"ring\"><b>grandchild1</b></span><i><a>grandchild2</a><c>grandchild3</c></i></div>",
         )
 
+
+    def test_to_html_into_writer(self):
+        chunks: list[str] = []
+
+        class ChunkWriter:
+            def write(self, s: str) -> int:
+                chunks.append(s)
+                return len(s)
+
+        items = [ParentNode("li", [LeafNode(None, f"item {i}")]) for i in range(3)]
+        parent_node = ParentNode("ul", items, {"class": "list"})
+        parent_node.to_html_into(ChunkWriter())
+
+        self.assertEqual("".join(chunks), parent_node.to_html())
+        self.assertEqual(chunks[0], "<ul class=\"list\">")
+
+
+    def test_to_html_into_stringio(self):
+        buffer = StringIO()
+        _ = buffer.write("<body>")
+        ParentNode("p", [LeafNode("b", "bold"), LeafNode(None, " text")]).to_html_into(buffer)
+
+        self.assertEqual(buffer.getvalue(), "<body><p><b>bold</b> text</p>")
+
+
 if __name__ == "__main__":
     _ = unittest.main()
@@ -0,0 +1,215 @@
+import os
+import struct
+import unittest
+import zlib
+from unittest import mock
+
+from build_manifest import BuildManifest
+from file_test_case import FileTestCase
+from image_pipeline import ImageIndex, can_resize, deploy_variants, make_variants, image_size, variant_key, variant_url
+from link_map import LinkMap
+from page_generator import generate_pages_incremental
+from text_to_html import markdown_to_html_node
+
+
+def png(width: int, height: int) -> bytes:
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    header = struct.pack(">IIBBBBB", width, height, 8, 0, 0, 0, 0)
+    pixels = zlib.compress(b"".join(b"\0" + b"\0" * width for _ in range(height)))
+
+    return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) + chunk(b"IDAT", pixels) + chunk(b"IEND", b"")
+
+
+class TestImagePipeline(FileTestCase):
+    def setUp(self):
+        super().setUp()
+        self.static = os.path.join(self.root, "static")
+        self.dest = os.path.join(self.root, "docs")
+        self.cache = os.path.join(self.root, "cache")
+        os.makedirs(os.path.join(self.static, "images"))
+        self.write("static/images/wide.png", png(1000, 500))
+        self.write("static/images/small.gif", b"GIF89a" + struct.pack("<HH", 40, 30) + b"\0" * 10)
+
+
+    def test_image_size_from_header(self):
+        self.assertEqual(image_size(os.path.join(self.static, "images", "wide.png")), (1000, 500))
+        self.assertEqual(image_size(os.path.join(self.static, "images", "small.gif")), (40, 30))
+        self.write("static/images/broken.png", b"not an image")
+        self.assertIsNone(image_size(os.path.join(self.static, "images", "broken.png")))
+
+
+    def test_jpeg_size(self):
+        jpeg = b"\xff\xd8" + b"\xff\xe0" + struct.pack(">H", 4) + b"\0\0"
+        jpeg += b"\xff\xc0" + struct.pack(">HBHH", 11, 8, 300, 400) + b"\0" * 6
+        self.write("static/images/photo.jpg", jpeg)
+
+        self.assertEqual(image_size(os.path.join(self.static, "images", "photo.jpg")), (400, 300))
+
+
+    def test_index_plans_narrower_variants_and_skips_unchanged(self):
+        index = ImageIndex()
+
+        self.assertEqual(sorted(index.update(self.static, resize=True)), ["/images/small.gif", "/images/wide.png"])
+        self.assertEqual(index.images["/images/wide.png"].variants, [480, 960])
+        self.assertEqual(index.images["/images/small.gif"].variants, [])
+        digest = index.digest
+        self.assertEqual(index.update(self.static, resize=True), [])
+        self.assertEqual(index.digest, digest)
+        self.assertEqual(index.update(self.static, resize=False), ["/images/wide.png"])
+        self.assertNotEqual(index.digest, digest)
+
+
+    def test_index_round_trip(self):
+        path = os.path.join(self.root, "images.json")
+        index = ImageIndex(path)
+        _ = index.update(self.static, resize=True)
+        index.save()
+        loaded = ImageIndex.load(path)
+
+        self.assertEqual(loaded, index)
+        self.assertEqual(loaded.update(self.static, resize=True), [])
+
+
+    def test_variants_deployed_from_cache(self):
+        index = ImageIndex()
+        _ = index.update(self.static, resize=True)
+        info = index.images["/images/wide.png"]
+        for width in info.variants:
+            key = variant_key(info.source_hash, width, ".png")
+            os.makedirs(os.path.join(self.cache, key[:2]), exist_ok=True)
+            with open(os.path.join(self.cache, key[:2], key), mode="wb") as f:
+                _ = f.write(png(width, width // 2))
+
+        result = deploy_variants(index, self.static, self.dest, self.cache)
+        self.assertEqual(len(result.cached), 2)
+        self.assertEqual(result.generated, [])
+        self.assertEqual(image_size(os.path.join(self.dest, "images", "wide-480w.png")), (480, 240))
+        self.assertEqual(len(deploy_variants(index, self.static, self.dest, self.cache).unchanged), 2)
+
+        os.remove(os.path.join(self.static, "images", "wide.png"))
+        _ = index.update(self.static, resize=True)
+        result = deploy_variants(index, self.static, self.dest, self.cache)
+        self.assertEqual(len(result.removed), 2)
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "images", "wide-480w.png")))
+
+
+    @unittest.skipUnless(can_resize(), "needs Pillow")
+    def test_variants_generated(self):
+        index = ImageIndex()
+        _ = index.update(self.static, resize=True)
+
+        result = deploy_variants(index, self.static, self.dest, self.cache, jobs=2)
+        self.assertEqual(len(result.generated), 2)
+        self.assertEqual(result.failed, [])
+        self.assertEqual(image_size(os.path.join(self.dest, "images", "wide-960w.png")), (960, 480))
+        key = variant_key(index.images["/images/wide.png"].source_hash, 480, ".png")
+        self.assertTrue(os.path.exists(os.path.join(self.cache, key[:2], key)))
+
+
+    def test_failed_variants_skipped(self):
+        # A valid header, so the image is indexed, but no pixel data to scale.
+        self.write("static/images/broken.png", png(1000, 500)[:33])
+        self.write("static/images/broken2.png", png(800, 400)[:33])
+        for jobs in (1, 2):
+            with self.subTest(jobs=jobs):
+                index = ImageIndex()
+                _ = index.update(self.static, resize=True)
+                del index.images["/images/wide.png"]
+                digest = index.digest
+                with self.assertLogs("image_pipeline", "ERROR"):
+                    result = deploy_variants(index, self.static, self.dest, self.cache, jobs)
+
+                self.assertEqual(len(result.failed), 3)
+                self.assertEqual(result.generated + result.cached, [])
+                self.assertFalse(os.path.exists(os.path.join(self.dest, "images", "broken-480w.png")))
+                self.assertEqual(index.outputs, {})
+                self.assertEqual(index.images["/images/broken.png"].variants, [])
+                self.assertNotEqual(index.digest, digest)
+
+
+    def test_failed_width_left_out_of_srcset(self):
+        def make_variant(source: str, width: int, target: str) -> None:
+            if width == 480:
+                raise OSError("cannot scale")
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with open(target, mode="wb") as f:
+                _ = f.write(png(width, width // 2))
+
+        index = ImageIndex()
+        _ = index.update(self.static, resize=True)
+        with mock.patch("image_pipeline.make_variant", side_effect=make_variant), self.assertLogs("image_pipeline"):
+            result = make_variants(index, self.static, self.cache)
+        html = markdown_to_html_node("![Wide](/images/wide.png)", LinkMap("/", index)).to_html()
+
+        self.assertEqual(result.failed, [os.path.join(self.static, "images", "wide.png")])
+        self.assertEqual(index.images["/images/wide.png"].variants, [960])
+        self.assertIn("srcset=\"/images/wide-960w.png 960w, /images/wide.png 1000w\"", html)
+        self.assertNotIn("480w", html)
+
+
+    def test_image_leaves_sized(self):
+        index = ImageIndex()
+        _ = index.update(self.static, resize=True)
+        md = "![Wide](/images/wide.png) ![Small](/images/small.gif) ![Other](/images/other.png)"
+        html = markdown_to_html_node(md, LinkMap("/site/", index)).to_html()
+
+        self.assertIn(
+            "<img src=\"/site/images/wide.png\" alt=\"Wide\" width=\"1000\" height=\"500\" "
+            + "srcset=\"/site/images/wide-480w.png 480w, /site/images/wide-960w.png 960w, "
+            + "/site/images/wide.png 1000w\" sizes=\"(max-width: 1000px) 100vw, 1000px\" loading=\"lazy\" />",
+            html
+        )
+        self.assertIn(
+            "<img src=\"/site/images/small.gif\" alt=\"Small\" width=\"40\" height=\"30\" loading=\"lazy\" />", html
+        )
+        self.assertIn("<img src=\"/site/images/other.png\" alt=\"Other\" />", html)
+        self.assertEqual(variant_url("/images/wide.png", 480), "/images/wide-480w.png")
+
+
+    def test_cache_key_covers_only_images_shown(self):
+        index = ImageIndex()
+        _ = index.update(self.static, resize=True)
+        links = LinkMap("/", index)
+        wide = links.context(["/images/wide.png"])
+        small = links.context(["/images/small.gif"])
+
+        self.assertEqual(links.context([]), LinkMap("/").context(["/images/wide.png"]))
+        self.assertEqual(links.context(["/images/other.png"]), "/")
+        self.assertNotEqual(wide, "/")
+        self.write("static/images/small.gif", b"GIF89a" + struct.pack("<HH", 50, 30) + b"\0" * 12)
+        _ = index.update(self.static, resize=True)
+        self.assertEqual(LinkMap("/", index).context(["/images/wide.png"]), wide)
+        self.assertNotEqual(LinkMap("/", index).context(["/images/small.gif"]), small)
+
+
+    def test_only_pages_showing_a_changed_image_rebuilt(self):
+        content = os.path.join(self.root, "content")
+        template = os.path.join(self.root, "template.html")
+        os.makedirs(content)
+        for name, text in (("index.md", "# Home\n\n![Wide](/images/wide.png)"), ("about.md", "# About")):
+            with open(os.path.join(content, name), mode="wt") as f:
+                _ = f.write(text)
+        with open(template, mode="wt") as f:
+            _ = f.write("{{ Content }}")
+        manifest = BuildManifest(os.path.join(self.root, "manifest.json"))
+        index = ImageIndex()
+        _ = index.update(self.static, resize=False)
+        _ = generate_pages_incremental(content, template, self.dest, "/", manifest, images=index)
+
+        self.assertEqual(manifest.pages[os.path.join(content, "index.md")].images, {"/images/wide.png": "1000x500"})
+        self.write("static/images/small.gif", b"GIF89a" + struct.pack("<HH", 50, 30) + b"\0" * 12)
+        _ = index.update(self.static, resize=False)
+        result = generate_pages_incremental(content, template, self.dest, "/", manifest, images=index)
+        self.assertEqual(result.rendered, [])
+        self.write("static/images/wide.png", png(1200, 500))
+        _ = index.update(self.static, resize=False)
+        result = generate_pages_incremental(content, template, self.dest, "/", manifest, images=index)
+        self.assertEqual(result.rendered, [os.path.join(self.dest, "index.html")])
+        with open(os.path.join(self.dest, "index.html")) as f:
+            self.assertIn("width=\"1200\"", f.read())
+
+
+if __name__ == "__main__":
+    _ = unittest.main()
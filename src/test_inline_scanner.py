@@ -0,0 +1,111 @@
+import glob
+import os
+import time
+import unittest
+
+from inline_scanner import iter_markdown_links, scan_inline
+from text_to_html import markdown_to_blocks, split_text_to_textnodes, text_to_textnodes
+from textnode import TextNode, TextType
+
+
+CONTENT_DIR = os.path.join(os.path.dirname(__file__), "..", "content")
+
+
+class TestScanInline(unittest.TestCase):
+    def test_plain(self):
+        self.assertEqual(scan_inline("Just text"), [TextNode("Just text", TextType.TEXT)])
+
+
+    def test_empty(self):
+        self.assertEqual(scan_inline(""), [])
+
+
+    def test_mixed(self):
+        text = "**a** [l](u) `c` _i_ ![alt](src)"
+        expected = [
+            TextNode("a", TextType.BOLD),
+            TextNode(" ", TextType.TEXT),
+            TextNode("l", TextType.LINK, "u"),
+            TextNode(" ", TextType.TEXT),
+            TextNode("c", TextType.CODE),
+            TextNode(" ", TextType.TEXT),
+            TextNode("i", TextType.ITALIC),
+            TextNode(" ", TextType.TEXT),
+            TextNode("alt", TextType.IMAGE, "src"),
+        ]
+
+        self.assertEqual(scan_inline(text), expected)
+
+
+    def test_delimiters_inside_links_are_kept(self):
+        text = "Item ![image](https://link_to_image.com) and [a_b](https://x_y.com)"
+        expected = [
+            TextNode("Item ", TextType.TEXT),
+            TextNode("image", TextType.IMAGE, "https://link_to_image.com"),
+            TextNode(" and ", TextType.TEXT),
+            TextNode("a_b", TextType.LINK, "https://x_y.com"),
+        ]
+
+        self.assertEqual(scan_inline(text), expected)
+
+
+    def test_unclosed_delimiter(self):
+        message = "Invalid Markdown syntax, delimiter: _ should have a closing pair in: incorrect text"
+
+        with self.assertRaisesRegex(Exception, message):
+            _ = scan_inline("This is _incorrect text")
+
+
+    def test_brackets_without_link(self):
+        text = "An [aside] and a ![broken image"
+
+        self.assertEqual(scan_inline(text), [TextNode(text, TextType.TEXT)])
+
+
+    def test_iter_markdown_links(self):
+        text = "A ![cat](/cat.png) and a [dog](https://dog.dev) [no link] here"
+
+        self.assertEqual(
+            [(x.image, x.text, x.url) for x in iter_markdown_links(text)],
+            [(True, "cat", "/cat.png"), (False, "dog", "https://dog.dev")],
+        )
+        match = next(iter_markdown_links(text))
+        self.assertEqual(text[match.start:match.end], "![cat](/cat.png)")
+
+
+    def test_link_text_starts_at_innermost_bracket(self):
+        self.assertEqual(
+            scan_inline("[a [b] c](/x)"),
+            [TextNode("[a ", TextType.TEXT), TextNode("b] c", TextType.LINK, "/x")],
+        )
+
+
+    def test_unmatched_brackets_stay_linear(self):
+        text = "[" * 50000 + "](" + "x" * 50000
+
+        start = time.perf_counter()
+        self.assertEqual(scan_inline(text), [TextNode(text, TextType.TEXT)])
+        self.assertEqual(list(iter_markdown_links(text)), [])
+        self.assertLess(time.perf_counter() - start, 5)
+
+
+    def test_default_engine(self):
+        text = "This is **text** with a [link](https://boot.dev)"
+
+        self.assertEqual(text_to_textnodes(text), text_to_textnodes(text, "split"))
+
+
+    def test_parity_with_content(self):
+        for path in glob.glob(os.path.join(CONTENT_DIR, "**", "*.md"), recursive=True):
+            with open(path) as f:
+                blocks = markdown_to_blocks(f.read())
+            for block in blocks:
+                if block.startswith("```"):
+                    continue
+                text = " ".join(block.splitlines())
+                with self.subTest(path=path, block=block[:40]):
+                    self.assertEqual(scan_inline(text), split_text_to_textnodes(text))
+
+
+if __name__ == "__main__":
+    _ = unittest.main()
@@ -0,0 +1,44 @@
+import unittest
+
+from link_map import LinkMap, link_map
+from render_cache import RenderCache
+from text_to_html import markdown_to_html_node, markdown_to_node_arena
+
+
+class TestLinkMap(unittest.TestCase):
+    def test_resolve(self):
+        links = LinkMap("/site/")
+
+        self.assertEqual(links.resolve("/blog/tom/"), "/site/blog/tom/")
+        self.assertEqual(links.resolve("/"), "/site/")
+        for url in ("tom.png", "../up", "#top", "//cdn.example.com/x.js", "https://example.com/"):
+            with self.subTest(url=url):
+                self.assertEqual(links.resolve(url), url)
+        self.assertEqual(len(links.urls), 7)
+
+
+    def test_shared_per_basepath(self):
+        self.assertIs(link_map("/a/"), link_map("/a/"))
+        self.assertIsNot(link_map("/a/"), link_map("/b/"))
+
+
+    def test_links_and_images_resolved_in_tree(self):
+        md = "[Home](/) and ![Tom](/images/tom.png)\n\n```\n<a href=\"/raw\">code</a>\n```"
+        html = markdown_to_html_node(md, LinkMap("/site/")).to_html()
+
+        self.assertIn("<a href=\"/site/\">Home</a>", html)
+        self.assertIn("<img src=\"/site/images/tom.png\" alt=\"Tom\" />", html)
+        self.assertIn("<code><a href=\"/raw\">code</a>\n</code>", html)
+
+
+    def test_cached_blocks_keyed_by_basepath(self):
+        cache = RenderCache()
+        md = "[Home](/)"
+
+        self.assertIn("/a/", markdown_to_node_arena(md, cache, LinkMap("/a/")).to_html())
+        self.assertIn("/b/", markdown_to_node_arena(md, cache, LinkMap("/b/")).to_html())
+        self.assertEqual(cache.misses, 2)
+
+
+if __name__ == "__main__":
+    _ = unittest.main()
@@ -0,0 +1,75 @@
+import os
+import tempfile
+import unittest
+
+from build_manifest import AssetRecord
+from file_deploy import sync_dir_content
+from minify import minified_template, minify_css, minify_html
+
+
+class TestMinify(unittest.TestCase):
+    def test_html(self):
+        html = """<!doctype html>
+<html>
+  <head>
+    <!-- comment -->
+    <title>{{ Title }}</title>
+    <style>
+      body { color : red; }
+    </style>
+  </head>
+  <body>
+    <p>Some <b>bold</b>   <i>text</i> </p>
+    <pre>  keep
+    this</pre>
+  </body>
+</html>
+"""
+
+        self.assertEqual(
+            minify_html(html),
+            "<!doctype html><html><head><title>{{ Title }}</title><style>body{color :red}</style></head>"
+            + "<body><p>Some <b>bold</b> <i>text</i></p><pre>  keep\n    this</pre></body></html>"
+        )
+
+
+    def test_css(self):
+        css = "/* header */\na > b ,\nc:hover {\n  content: \"a  /* b */ ;}\";\n  margin : 0 auto ;\n}\n"
+
+        self.assertEqual(minify_css(css), "a>b,c:hover{content:\"a  /* b */ ;}\";margin :0 auto}")
+
+
+    def test_minified_template_rewritten_only_on_change(self):
+        with tempfile.TemporaryDirectory() as root:
+            template = os.path.join(root, "template.html")
+            with open(template, mode="wt") as f:
+                _ = f.write("<html>\n  <body>{{ Content }}</body>\n</html>\n")
+            path = minified_template(template, os.path.join(root, "min"))
+            mtime = os.stat(path).st_mtime_ns
+            with open(path) as f:
+                self.assertEqual(f.read(), "<html><body>{{ Content }}</body></html>")
+            self.assertEqual(minified_template(template, os.path.join(root, "min")), path)
+            self.assertEqual(os.stat(path).st_mtime_ns, mtime)
+
+
+    def test_sync_minifies_css(self):
+        with tempfile.TemporaryDirectory() as root:
+            static = os.path.join(root, "static")
+            dest = os.path.join(root, "docs")
+            os.makedirs(static)
+            with open(os.path.join(static, "index.css"), mode="wt") as f:
+                _ = f.write("body {\n  margin: 0;\n}\n")
+            with open(os.path.join(static, "logo.png"), mode="wb") as f:
+                _ = f.write(b"\x89PNG")
+            assets: dict[str, AssetRecord] = {}
+            result = sync_dir_content(static, dest, assets, minify=True)
+
+            self.assertEqual(result.strategies, {"minify": 1, "copy": 1})
+            with open(os.path.join(dest, "index.css")) as f:
+                self.assertEqual(f.read(), "body{margin:0}")
+            self.assertEqual(len(sync_dir_content(static, dest, assets, minify=True).unchanged), 2)
+            self.assertEqual(len(sync_dir_content(static, dest, assets).copied), 1)
+
+
+if __name__ == "__main__":
+    _ = unittest.main()
@@ -0,0 +1,61 @@
+import glob
+import os
+import unittest
+
+from htmlnode import HTMLNode, LeafNode, ParentNode
+from node_arena import NodeArena
+from text_to_html import markdown_to_html_node, markdown_to_node_arena
+from textnode import TextNode, TextType
+
+
+CONTENT_DIR = os.path.join(os.path.dirname(__file__), "..", "content")
+
+
+class TestNodeArena(unittest.TestCase):
+    def test_build_and_serialize(self):
+        arena = NodeArena()
+        bold = arena.add_leaf("b", "bold")
+        text = arena.add_leaf(None, " and ")
+        link = arena.add_leaf("a", "link", {"href": "/x"})
+        image = arena.add_leaf("img", "", {"src": "/i.png", "alt": "i"})
+        paragraph = arena.add_parent("p", [bold, text, link, image])
+        _ = arena.add_parent("div", [paragraph], {"class": "c"})
+
+        self.assertEqual(
+            arena.to_html(),
+            "<div class=\"c\"><p><b>bold</b> and <a href=\"/x\">link</a><img src=\"/i.png\" alt=\"i\" /></p></div>"
+        )
+        self.assertEqual(len(arena), 6)
+        self.assertEqual(arena.text, "bold and link")
+
+
+    def test_parent_without_children(self):
+        arena = NodeArena()
+        _ = arena.add_parent("div", [])
+
+        with self.assertRaisesRegex(ValueError, "All parent nodes must have a children"):
+            _ = arena.to_html()
+
+
+    def test_matches_object_tree(self):
+        for path in glob.glob(os.path.join(CONTENT_DIR, "**", "*.md"), recursive=True):
+            with open(path) as f:
+                markdown = f.read()
+            with self.subTest(path=path):
+                self.assertEqual(markdown_to_node_arena(markdown).to_html(), markdown_to_html_node(markdown).to_html())
+
+
+class TestSlots(unittest.TestCase):
+    def test_nodes_have_no_dict(self):
+        for node in (
+            HTMLNode("a"),
+            LeafNode("b", "x"),
+            ParentNode("p", [LeafNode(None, "x")]),
+            TextNode("x", TextType.TEXT),
+        ):
+            with self.subTest(node=type(node).__name__):
+                self.assertFalse(hasattr(node, "__dict__"))
+
+
+if __name__ == "__main__":
+    _ = unittest.main()
@@ -0,0 +1,60 @@
+import gzip
+import os
+import unittest
+
+from build_manifest import AssetRecord
+from file_test_case import FileTestCase
+from precompress import gzip_compress, precompress, remove_sidecars
+
+
+class TestPrecompress(FileTestCase):
+    def setUp(self):
+        super().setUp()
+        self.dest = self.root
+        os.makedirs(os.path.join(self.dest, "blog"))
+        self.write("index.html", "<p>" + "hello " * 100 + "</p>")
+        self.write(os.path.join("blog", "post.html"), "<p>post</p>")
+        self.write("logo.png", "not compressible")
+        self.compressed: dict[str, AssetRecord] = {}
+
+
+    def test_gzip_is_deterministic(self):
+        data = b"abc" * 100
+
+        self.assertEqual(gzip.decompress(gzip_compress(data)), data)
+        self.assertEqual(gzip_compress(data), gzip_compress(data))
+
+
+    def test_sidecars_written_for_compressible_files(self):
+        result = precompress(self.dest, self.compressed, jobs=2)
+
+        self.assertEqual(len(result.compressed), 2)
+        with gzip.open(os.path.join(self.dest, "index.html.gz"), mode="rt") as f:
+            self.assertEqual(f.read(), "<p>" + "hello " * 100 + "</p>")
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "logo.png.gz")))
+        self.assertEqual(sorted(self.compressed), [os.path.join("blog", "post.html"), "index.html"])
+
+
+    def test_unchanged_files_skipped(self):
+        _ = precompress(self.dest, self.compressed)
+        path = os.path.join(self.dest, "index.html")
+        os.utime(path, ns=(0, 0))
+        result = precompress(self.dest, self.compressed)
+
+        self.assertEqual((len(result.compressed), len(result.unchanged)), (0, 2))
+        self.write("index.html", "<p>changed</p>")
+        self.assertEqual(precompress(self.dest, self.compressed).compressed, [path])
+
+
+    def test_sidecars_of_removed_files_removed(self):
+        _ = precompress(self.dest, self.compressed)
+        os.remove(os.path.join(self.dest, "blog", "post.html"))
+        result = precompress(self.dest, self.compressed)
+
+        self.assertEqual(result.removed, [os.path.join(self.dest, "blog", "post.html.gz")])
+        self.assertEqual(remove_sidecars(self.dest, self.compressed), [os.path.join(self.dest, "index.html.gz")])
+        self.assertEqual(self.compressed, {})
+
+
+if __name__ == "__main__":
+    _ = unittest.main()
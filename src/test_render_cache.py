@@ -0,0 +1,56 @@
+import os
+import tempfile
+import unittest
+
+from blocknode import BlockType
+from render_cache import RenderCache, block_key
+from text_to_html import markdown_to_html_node, markdown_to_node_arena
+
+
+MARKDOWN = "# Title\n\nShared **disclaimer** text.\n\n```\ncode\n```\n\nShared **disclaimer** text."
+
+
+class TestRenderCache(unittest.TestCase):
+    def test_block_key(self):
+        self.assertEqual(block_key(BlockType.PARAGRAPH, "a"), block_key(BlockType.PARAGRAPH, "a"))
+        self.assertNotEqual(block_key(BlockType.PARAGRAPH, "a"), block_key(BlockType.HEADING, "a"))
+
+
+    def test_memory_lru_eviction(self):
+        cache = RenderCache(max_memory_bytes=10)
+        cache.put("a", "12345")
+        cache.put("b", "12345")
+        _ = cache.get("a")
+        cache.put("c", "12345")
+
+        self.assertEqual(cache.get("a"), "12345")
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual((cache.hits, cache.misses), (2, 1))
+
+
+    def test_disk_store_and_prune(self):
+        with tempfile.TemporaryDirectory() as root:
+            cache = RenderCache(root, max_disk_bytes=10)
+            cache.put("aa1", "12345")
+            cache.put("aa2", "12345")
+            os.utime(os.path.join(root, "aa", "aa1.html"), (1, 1))
+
+            self.assertEqual(RenderCache(root).get("aa2"), "12345")
+            cache.put("bb3", "12345")
+            self.assertEqual(cache.prune(), 1)
+            self.assertIsNone(RenderCache(root).get("aa1"))
+
+
+    def test_arena_uses_cache(self):
+        cache = RenderCache()
+        first = markdown_to_node_arena(MARKDOWN, cache).to_html()
+
+        self.assertEqual(first, markdown_to_html_node(MARKDOWN).to_html())
+        self.assertEqual((cache.hits, cache.misses), (1, 3))
+        second = markdown_to_node_arena(MARKDOWN, cache).to_html()
+        self.assertEqual(second, first)
+        self.assertEqual((cache.hits, cache.misses), (5, 3))
+
+
+if __name__ == "__main__":
+    _ = unittest.main()
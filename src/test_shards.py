@@ -0,0 +1,91 @@
+import os
+import unittest
+
+from build_manifest import BuildManifest
+from content_walker import MARKDOWN_EXTENSIONS, WalkFilter, shard_of
+from file_test_case import FileTestCase
+from page_generator import generate_pages_incremental
+from shards import SHARD_MANIFEST, ShardMergeError, merge_shards, parse_shard, shard_dir
+
+
+class TestShards(FileTestCase):
+    def setUp(self):
+        super().setUp()
+        self.content = os.path.join(self.root, "content")
+        self.dest = os.path.join(self.root, "docs")
+        self.shards = os.path.join(self.root, "shards")
+        self.template = os.path.join(self.root, "template.html")
+        os.makedirs(os.path.join(self.content, "blog"))
+        for i in range(12):
+            self.write(os.path.join(self.content, "blog", f"post{i}.md"), f"# Post {i}")
+        self.write(os.path.join(self.content, "index.md"), "# Home")
+        self.write(self.template, "{{ Title }}{{ Content }}")
+
+
+    def build_shard(self, index: int, count: int):
+        directory = shard_dir(self.shards, index, count)
+        manifest = BuildManifest(os.path.join(directory, SHARD_MANIFEST))
+        manifest.shard = (index, count)
+        result = generate_pages_incremental(
+            self.content, self.template, os.path.join(directory, "docs"), "/", manifest,
+            walk_filter=WalkFilter(extensions=MARKDOWN_EXTENSIONS, shard=(index, count))
+        )
+        manifest.save()
+        return result
+
+
+    def merge(self, count: int, manifest: BuildManifest|None = None):
+        manifest = manifest or BuildManifest(os.path.join(self.root, "manifest.json"))
+        return merge_shards(self.shards, count, self.content, self.template, self.dest, "/", manifest)
+
+
+    def test_parse_shard(self):
+        self.assertEqual(parse_shard("2/4"), (2, 4))
+        for text in ("0/4", "5/4", "x/4", "3"):
+            with self.subTest(text=text):
+                with self.assertRaises(ValueError):
+                    _ = parse_shard(text)
+
+
+    def test_shard_of_is_stable(self):
+        self.assertEqual(shard_of("blog/post1.md", 4), shard_of(os.path.join("blog", "post1.md"), 4))
+        self.assertEqual({shard_of(f"post{i}.md", 1) for i in range(10)}, {1})
+
+
+    def test_shards_partition_content(self):
+        rendered = [self.build_shard(i, 3).rendered for i in (1, 2, 3)]
+
+        self.assertEqual(sum(map(len, rendered)), 13)
+        self.assertTrue(all(rendered))
+
+
+    def test_merge(self):
+        for i in (1, 2, 3):
+            _ = self.build_shard(i, 3)
+        manifest = BuildManifest(os.path.join(self.root, "manifest.json"))
+        result = self.merge(3, manifest)
+
+        self.assertEqual(len(result.rendered), 13)
+        self.assertEqual(len(manifest.pages), 13)
+        with open(os.path.join(self.dest, "blog", "post3.html")) as f:
+            self.assertEqual(f.read(), "Post 3<div><h1>Post 3</h1></div>")
+        self.assertEqual(len(self.merge(3, manifest).skipped), 13)
+
+
+    def test_merge_reports_missing_and_stale_shards(self):
+        _ = self.build_shard(1, 2)
+        index = shard_of("index.md", 2)
+        if index == 1:
+            self.write(os.path.join(self.content, "index.md"), "# Home\n\nChanged")
+
+        with self.assertRaises(ShardMergeError) as error:
+            _ = self.merge(2)
+
+        problems = error.exception.problems
+        self.assertIn(f"shard 2/2: no manifest in {shard_dir(self.shards, 2, 2)}", problems)
+        self.assertTrue(any("index.md" in problem for problem in problems))
+        self.assertFalse(os.path.exists(self.dest))
+
+
+if __name__ == "__main__":
+    _ = unittest.main()
@@ -0,0 +1,179 @@
+import os
+import unittest
+from unittest import mock
+
+from build_manifest import BuildManifest
+from file_test_case import FileTestCase
+from page_generator import generate_pages_incremental
+from page_meta import PageMeta, summarize
+from site_index import FEED_NAME, SITEMAP_NAME, SiteIndex, generate_listings, site_template, tag_slug, url_for
+
+
+class TestSiteIndex(FileTestCase):
+    def setUp(self):
+        super().setUp()
+        self.content = os.path.join(self.root, "content")
+        self.dest = os.path.join(self.root, "docs")
+        self.template = os.path.join(self.root, "template.html")
+        self.index_path = os.path.join(self.root, "site-index.json")
+        os.makedirs(os.path.join(self.content, "blog", "tom"))
+        self.write(os.path.join(self.content, "index.md"), "# Home")
+        self.write(
+            os.path.join(self.content, "blog", "tom", "index.md"),
+            "---\ndate: 2024-02-01\ntags: [lotr, Hot Takes]\n---\n# Tom\n\n[< Back](/)\n\nBombadil was a mistake."
+        )
+        self.write(
+            os.path.join(self.content, "blog", "majesty.md"),
+            "---\ntitle: Majesty\ndate: 2024-03-01\ntags: lotr\nsummary: Simply majestic.\n---\n# The Majesty"
+        )
+        self.write(self.template, "<title>{{ Title }}</title>{{ Content }}")
+        self.manifest = BuildManifest(os.path.join(self.root, "manifest.json"))
+
+
+    def build(self, site_url: str = "https://example.com") -> tuple[SiteIndex, int, list[str]]:
+        result = generate_pages_incremental(self.content, self.template, self.dest, "/site/", self.manifest)
+        index = SiteIndex.load(self.index_path)
+        updated, _ = index.update(self.manifest, self.dest, result.metadata)
+        written = generate_listings(
+            index, self.manifest, self.content, self.template, self.dest, "/site/", site_url
+        )
+        index.save()
+        return index, updated, written
+
+
+    def test_url_for(self):
+        self.assertEqual(url_for(os.path.join("docs", "index.html"), "docs"), "/")
+        self.assertEqual(url_for(os.path.join("docs", "blog", "tom", "index.html"), "docs"), "/blog/tom/")
+        self.assertEqual(url_for(os.path.join("docs", "blog", "majesty.html"), "docs"), "/blog/majesty.html")
+
+
+    def test_summarize_skips_navigation(self):
+        md = "[< Back](/)\n\n# Title\n\nSome **bold** [text](/x)."
+        self.assertEqual(summarize(md.splitlines()), "Some bold text.")
+        self.assertTrue(summarize(["# T", "", "word " * 100]).endswith("…"))
+        self.assertEqual(summarize(["# Only a title"]), "")
+
+
+    def test_summary_reads_no_further_than_needed(self):
+        lines = iter(["# T", "", "First.", "", "Second."])
+
+        self.assertEqual(summarize(lines), "First.")
+        self.assertEqual(list(lines), ["Second."])
+
+
+    def test_index_metadata(self):
+        with mock.patch.object(PageMeta, "read") as read:
+            index, updated, _ = self.build()
+        tom = index.pages[os.path.join(self.content, "blog", "tom", "index.md")]
+
+        read.assert_not_called()
+        self.assertEqual(updated, 3)
+        self.assertEqual((tom.title, tom.url, tom.date), ("Tom", "/blog/tom/", "2024-02-01"))
+        self.assertEqual(tom.tags, ["lotr", "Hot Takes"])
+        self.assertEqual(tom.summary, "Bombadil was a mistake.")
+        self.assertEqual([post.title for post in index.posts(self.content)], ["Majesty", "Tom"])
+
+
+    def test_listings(self):
+        _, _, written = self.build()
+
+        self.assertEqual(len(written), 5)
+        blog = self.read(os.path.join(self.dest, "blog", "index.html"))
+        self.assertLess(blog.index("/site/blog/majesty.html"), blog.index("/site/blog/tom/"))
+        self.assertIn("Simply majestic.", blog)
+        self.assertIn("/site/tags/hot-takes/", blog)
+        self.assertIn("Tom", self.read(os.path.join(self.dest, "tags", tag_slug("Hot Takes"), "index.html")))
+        self.assertNotIn("Majesty", self.read(os.path.join(self.dest, "tags", "hot-takes", "index.html")))
+        feed = self.read(os.path.join(self.dest, "blog", "atom.xml"))
+        self.assertIn("<link rel=\"self\" href=\"https://example.com/site/blog/atom.xml\"/>", feed)
+        self.assertIn("<id>https://example.com/site/blog/tom/</id>", feed)
+        self.assertIn("<updated>2024-03-01T00:00:00+00:00</updated>", feed)
+        sitemap = self.read(os.path.join(self.dest, "sitemap.xml"))
+        self.assertIn("<loc>https://example.com/site/blog/tom/</loc><lastmod>2024-02-01T00:00:00+00:00</lastmod>", sitemap)
+        self.assertIn("<loc>https://example.com/site/</loc>", sitemap)
+
+
+    def test_listings_leave_front_matter_slots_empty(self):
+        self.write(self.template, "<title>{{ Title }}</title><time>{{ Date }}</time>{{ Content }}")
+        _ = self.build()
+
+        self.assertIn("<time></time>", self.read(os.path.join(self.dest, "blog", "index.html")))
+        self.assertIn("<time>2024-02-01</time>", self.read(os.path.join(self.dest, "blog", "tom", "index.html")))
+
+
+    def test_no_feed_or_sitemap_without_site_url(self):
+        with self.assertLogs("site_index", "WARNING"):
+            _, _, written = self.build(site_url="")
+
+        self.assertNotIn(os.path.join(self.dest, "blog", FEED_NAME), written)
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "blog", FEED_NAME)))
+        self.assertFalse(os.path.exists(os.path.join(self.dest, SITEMAP_NAME)))
+        self.assertTrue(os.path.exists(os.path.join(self.dest, "blog", "index.html")))
+
+
+    def test_drafts_left_out(self):
+        self.write(os.path.join(self.content, "blog", "wip.md"), "+++\ntitle = \"WIP\"\ndraft = true\n+++\n# WIP")
+        index, _, _ = self.build()
+
+        self.assertEqual([post.title for post in index.posts(self.content)], ["Majesty", "Tom"])
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "blog", "wip.html")))
+        self.assertNotIn("wip", self.read(os.path.join(self.dest, "sitemap.xml")))
+
+
+    def test_incremental(self):
+        _ = self.build()
+        _, updated, written = self.build()
+
+        self.assertEqual((updated, written), (0, []))
+        self.write(os.path.join(self.content, "blog", "tom", "index.md"), "---\ndate: 2024-02-01\n---\n# Tom")
+        _, updated, written = self.build()
+        self.assertEqual(updated, 1)
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "tags", "hot-takes", "index.html")))
+        self.assertIn(os.path.join(self.dest, "tags", "lotr", "index.html"), written)
+
+
+    def test_pages_rendered_elsewhere_read_from_source(self):
+        _ = generate_pages_incremental(self.content, self.template, self.dest, "/site/", self.manifest)
+        index = SiteIndex.load(self.index_path)
+
+        self.assertEqual(index.update(self.manifest, self.dest), (3, 3))
+        self.assertEqual(index.pages[os.path.join(self.content, "blog", "majesty.md")].summary, "Simply majestic.")
+
+
+    def test_site_template_lists_recent_posts(self):
+        index, _, _ = self.build()
+        directory = os.path.join(self.root, "site-template")
+
+        self.assertEqual(site_template(self.template, index, self.content, directory), self.template)
+        self.write(self.template, "<nav>{{ RecentPosts }}</nav><title>{{ Title }}</title>{{ Content }}")
+        path = site_template(self.template, index, self.content, directory)
+        with open(path) as f:
+            filled = f.read()
+        self.assertEqual(
+            filled,
+            "<nav><ul class=\"recent-posts\"><li><a href=\"/blog/majesty.html\">Majesty</a></li>"
+            + "<li><a href=\"/blog/tom/\">Tom</a></li></ul></nav><title>{{ Title }}</title>{{ Content }}"
+        )
+        mtime = os.stat(path).st_mtime_ns
+        self.assertEqual(site_template(self.template, index, self.content, directory), path)
+        self.assertEqual(os.stat(path).st_mtime_ns, mtime)
+
+
+    def test_removed_source_dropped(self):
+        _ = self.build()
+        os.remove(os.path.join(self.content, "blog", "majesty.md"))
+        index, _, _ = self.build()
+
+        self.assertEqual([post.title for post in index.posts(self.content)], ["Tom"])
+
+
+    def test_existing_blog_index_not_overwritten(self):
+        self.write(os.path.join(self.content, "blog", "index.md"), "# My blog")
+        index, _, _ = self.build()
+
+        self.assertEqual(self.read(os.path.join(self.dest, "blog", "index.html")), "<title>My blog</title><div><h1>My blog</h1></div>")
+        self.assertEqual(len(index.posts(self.content)), 2)
+
+
+if __name__ == "__main__":
+    _ = unittest.main()
@@ -0,0 +1,59 @@
+import os
+import tempfile
+import unittest
+
+from template import Template, load_template
+
+
+class TestTemplate(unittest.TestCase):
+    def test_segments_and_slots(self):
+        template = Template("<title>{{ Title }}</title><a href=\"/\">x</a>{{ Content }}", "/SSG/")
+
+        self.assertEqual(template.slots, ["Title", "Content"])
+        self.assertEqual(template.segments, ["<title>", "</title><a href=\"/SSG/\">x</a>", ""])
+
+
+    def test_render(self):
+        template = Template("<h1>{{ Title }}</h1><img src=\"/a.png\" />{{ Content }}", "/b/")
+        html = template.render({"Title": "Hi", "Content": "<p>body</p>"})
+
+        self.assertEqual(html, "<h1>Hi</h1><img src=\"/b/a.png\" /><p>body</p>")
+
+
+    def test_unknown_slot_kept(self):
+        template = Template("{{ Title }} {{ Other }}", "/")
+
+        self.assertEqual(template.render({"Title": "T"}), "T {{ Other }}")
+
+
+    def test_render_into_callable(self):
+        chunks: list[str] = []
+
+        class ChunkWriter:
+            def write(self, s: str) -> int:
+                chunks.append(s)
+                return len(s)
+
+        template = Template("<article>{{ Content }}</article>", "/")
+        template.render_into(ChunkWriter(), {"Content": lambda w: w.write("<p>streamed</p>")})
+
+        self.assertEqual("".join(chunks), "<article><p>streamed</p></article>")
+
+
+    def test_load_template_cached_until_changed(self):
+        with tempfile.TemporaryDirectory() as root:
+            path = os.path.join(root, "template.html")
+            with open(path, mode="wt") as f:
+                _ = f.write("{{ Title }}")
+            first = load_template(path, "/")
+
+            self.assertIs(load_template(path, "/"), first)
+            with open(path, mode="wt") as f:
+                _ = f.write("<b>{{ Title }}</b>")
+            os.utime(path, ns=(0, 0))
+
+            self.assertEqual(load_template(path, "/").render({"Title": "x"}), "<b>x</b>")
+
+
+if __name__ == "__main__":
+    _ = unittest.main()
@@ -0,0 +1,78 @@
+import os
+import tempfile
+import threading
+import unittest
+
+from watcher import Watcher, classify_changes, diff_snapshots, take_snapshot
+
+
+class TestSnapshots(unittest.TestCase):
+    def test_diff_snapshots(self):
+        old = {"a": (1, 1), "b": (1, 1), "c": (1, 1)}
+        new = {"a": (1, 1), "b": (2, 1), "d": (1, 1)}
+
+        self.assertEqual(diff_snapshots(old, new), {"b", "c", "d"})
+
+
+    def test_classify_changes(self):
+        changes = classify_changes(
+            ["content/blog/tom/index.md", "static/index.css", "template.html", "README.md"],
+            "content",
+            "static",
+            "template.html"
+        )
+
+        self.assertEqual(changes.content, {"content/blog/tom/index.md"})
+        self.assertEqual(changes.static, {"static/index.css"})
+        self.assertTrue(changes.template)
+
+
+    def test_classify_no_changes(self):
+        self.assertFalse(classify_changes([], "content", "static", "template.html"))
+
+
+class TestWatcher(unittest.TestCase):
+    def test_poll_and_debounce(self):
+        with tempfile.TemporaryDirectory() as root:
+            page = os.path.join(root, "index.md")
+            with open(page, mode="wt") as f:
+                _ = f.write("# Old")
+            watcher = Watcher([root], interval=0.01, debounce=0.01)
+
+            self.assertIn(page, take_snapshot([root]))
+            self.assertEqual(watcher.poll(), set())
+            with open(page, mode="wt") as f:
+                _ = f.write("# New title")
+            other = os.path.join(root, "other.md")
+            with open(other, mode="wt") as f:
+                _ = f.write("# Other")
+
+            self.assertEqual(watcher.wait_for_changes(), {page, other})
+            self.assertEqual(watcher.poll(), set())
+
+
+    def test_failed_rebuild_keeps_watching(self):
+        with tempfile.TemporaryDirectory() as root:
+            page = os.path.join(root, "index.md")
+            watcher = Watcher([root], interval=0.01, debounce=0.01)
+            stop = threading.Event()
+            calls: list[set[str]] = []
+
+            def on_change(changed: set[str]) -> None:
+                calls.append(changed)
+                if len(calls) == 1:
+                    with open(page, mode="wt") as f:
+                        _ = f.write("# Second")
+                    raise ValueError("broken page")
+                stop.set()
+
+            with open(page, mode="wt") as f:
+                _ = f.write("# First")
+            with self.assertLogs("watcher", "ERROR"):
+                watcher.run(on_change, stop)
+
+            self.assertEqual(len(calls), 2)
+
+
+if __name__ == "__main__":
+    _ = unittest.main()
@@ -1,33 +1,49 @@
-from collections.abc import Iterator
+from collections.abc import Callable, Iterable
 from hmac import new
+from io import StringIO
 import re
-from itertools import chain, zip_longest
+import build_stats
 from textnode import TextNode, TextType
 from htmlnode import HTMLNode, LeafNode, ParentNode
-from blocknode import BlockType, block_to_block_type
+from node_arena import NodeArena
+from render_cache import RenderCache, block_key
+from blocknode import BlockType
+from block_scanner import scan_blocks
+from inline_scanner import iter_markdown_links, scan_inline
+from link_map import LinkMap
 
 
-def text_node_to_html_node(text_node: TextNode) -> LeafNode:
+DEFAULT_INLINE_ENGINE = "scanner"
+
+
+Leaf = tuple[str|None, str, dict[str, str]|None]
+
+
+def text_node_to_leaf(text_node: TextNode, links: LinkMap|None = None) -> Leaf:
+    """(tag, value, props) of the HTML leaf for `text_node`, URLs resolved through `links`."""
     match text_node.text_type:
         case TextType.TEXT:
-            return LeafNode(None, text_node.text)
+            return None, text_node.text, None
         case TextType.BOLD:
-            return LeafNode("b", text_node.text)
+            return "b", text_node.text, None
         case TextType.ITALIC:
-            return LeafNode("i", text_node.text)
+            return "i", text_node.text, None
         case TextType.CODE:
-            return LeafNode("code", text_node.text)
+            return "code", text_node.text, None
         case TextType.LINK:
             if not text_node.url:
                 raise ValueError("Links needs URL")
-            return LeafNode("a", text_node.text, {"href": text_node.url})
+            return "a", text_node.text, {"href": links.resolve(text_node.url) if links else text_node.url}
         case TextType.IMAGE:
             if not text_node.url:
                 raise ValueError("Image needs src URL")
-            return LeafNode("img", "", {
-                "src": text_node.url,
-                "alt": text_node.text
-            })
+            if links:
+                return "img", "", links.image_props(text_node.url, text_node.text)
+            return "img", "", {"src": text_node.url, "alt": text_node.text}
+
+
+def text_node_to_html_node(text_node: TextNode, links: LinkMap|None = None) -> LeafNode:
+    return LeafNode(*text_node_to_leaf(text_node, links))
 
 
 def split_node_delimiter(
@@ -65,77 +81,55 @@ def split_node_delimiter(
     return new_nodes
 
 
-def extract_markdown_images(text: str) -> list[tuple[str, str]|None]:
-    regex = r"(?:.*?!\[(.*?)\]\((.*?)\).*?)+?"
-    matches = re.findall(regex, text)
+def extract_markdown_images(text: str) -> list[tuple[str, str]]:
+    return [(match.text, match.url) for match in iter_markdown_links(text) if match.image]
 
-    return matches
 
+def image_urls(text: str) -> list[str]:
+    """URLs of the images `text` shows, in order."""
+    return [match.url for match in iter_markdown_links(text) if match.image] if "![" in text else []
 
-def extract_markdown_links(text: str) -> list[tuple[str, str]|None]:
-    regex = r"(?:.*?(?<!!)\[(.*?)\]\((.*?)\).*?)+?"
-    matches = re.findall(regex, text)
 
-    return matches
+def extract_markdown_links(text: str) -> list[tuple[str, str]]:
+    return [(match.text, match.url) for match in iter_markdown_links(text) if not match.image]
 
 
-def split_nodes_image(
-    old_node: list[TextNode],
-) -> list[TextNode]:
+def split_nodes_links_of_type(old_node: list[TextNode], text_type: TextType) -> list[TextNode]:
+    image = text_type == TextType.IMAGE
     new_nodes: list[TextNode] = []
     for node in old_node:
         if node.text_type != TextType.TEXT:
             new_nodes.append(node)
             continue
-        regex_split = r"!\[.*?\]\(.*?\)"
-        text_sections = re.split(regex_split, node.text)
-        if len(text_sections) == 1:
-            new_nodes.append(node)
-            continue
-        images = extract_markdown_images(node.text)
-        new_node: list[TextNode] = []
-        text_image_combo: Iterator[str|tuple[str, str]|None] = chain.from_iterable(zip_longest(text_sections, images))
-        for node in text_image_combo:
-            if not node:
+        position = 0
+        for match in iter_markdown_links(node.text):
+            if match.image != image:
                 continue
-            if isinstance(node, str):
-                new_node.append(TextNode(node, TextType.TEXT))
-            else:
-                new_node.append(TextNode(node[0], TextType.IMAGE, node[1]))
-        new_nodes.extend(new_node)
+            if position < match.start:
+                new_nodes.append(TextNode(node.text[position:match.start], TextType.TEXT))
+            new_nodes.append(TextNode(match.text, text_type, match.url))
+            position = match.end
+        if position == 0:
+            new_nodes.append(node)
+        elif position < len(node.text):
+            new_nodes.append(TextNode(node.text[position:], TextType.TEXT))
 
     return new_nodes
 
 
-def split_nodes_link(
+def split_nodes_image(
     old_node: list[TextNode],
 ) -> list[TextNode]:
-    new_nodes: list[TextNode] = []
-    for node in old_node:
-        if node.text_type != TextType.TEXT:
-            new_nodes.append(node)
-            continue
-        regex_split = r"(?<!!)\[.*?\]\(.*?\)"
-        text_sections = re.split(regex_split, node.text)
-        if len(text_sections) == 1:
-            new_nodes.append(node)
-            continue
-        images = extract_markdown_links(node.text)
-        new_node: list[TextNode] = []
-        text_link_combo: Iterator[str|tuple[str, str]|None] = chain.from_iterable(zip_longest(text_sections, images))
-        for node in text_link_combo:
-            if not node:
-                continue
-            if isinstance(node, str):
-                new_node.append(TextNode(node, TextType.TEXT))
-            else:
-                new_node.append(TextNode(node[0], TextType.LINK, node[1]))
-        new_nodes.extend(new_node)
+    return split_nodes_links_of_type(old_node, TextType.IMAGE)
 
-    return new_nodes
 
+def split_nodes_link(
+    old_node: list[TextNode],
+) -> list[TextNode]:
+    return split_nodes_links_of_type(old_node, TextType.LINK)
 
-def text_to_textnodes(text: str) -> list[TextNode]:
+
+def split_text_to_textnodes(text: str) -> list[TextNode]:
     new_node = split_node_delimiter(
         split_node_delimiter(
             split_node_delimiter(
@@ -157,18 +151,30 @@ def text_to_textnodes(text: str) -> list[TextNode]:
     return new_node
 
 
+INLINE_ENGINES: dict[str, Callable[[str], list[TextNode]]] = {
+    "scanner": scan_inline,
+    "split": split_text_to_textnodes,
+}
+
+
+def text_to_textnodes(text: str, engine: str|None = None) -> list[TextNode]:
+    return INLINE_ENGINES[engine or DEFAULT_INLINE_ENGINE](text)
+
+
 def markdown_to_blocks(markdown: str) -> list[str]:
-    blocks: list[str] = list(
-        filter(lambda x: x != "",
-               map(lambda x: x.strip(), markdown.split("\n\n"))
-        )
-    )
+    return ["\n".join(lines) for _, lines in scan_blocks(StringIO(markdown))]
 
-    return blocks
 
+def inline_leaves(text: str, links: LinkMap|None = None) -> list[Leaf]:
+    stats = build_stats.active
+    if stats is None:
+        return [text_node_to_leaf(node, links) for node in text_to_textnodes(text)]
+    with stats.stage("inline_parse"):
+        return [text_node_to_leaf(node, links) for node in text_to_textnodes(text)]
 
-def text_to_children(text: str) -> list[LeafNode]:
-    return list(map(text_node_to_html_node, text_to_textnodes(text)))
+
+def text_to_children(text: str, links: LinkMap|None = None) -> list[LeafNode]:
+    return [LeafNode(*leaf) for leaf in inline_leaves(text, links)]
 
 
 def markdown_list_to_text(block: str) -> list[str]:
@@ -177,74 +183,137 @@ def markdown_list_to_text(block: str) -> list[str]:
     return list(map(lambda x: x.split(maxsplit=1)[1], points))
 
 
-def code_block_to_html(text: str) -> ParentNode:
-    code_content = re.split(r"\n?```\n?", text)[1] + "\n"
-    return ParentNode("pre", [LeafNode("code", code_content)])
+def code_block_content(text: str) -> str:
+    return re.split(r"\n?```\n?", text)[1] + "\n"
 
 
-def heading_block_to_html(text: str) -> ParentNode:
+def heading_block_content(text: str) -> tuple[str, str]:
     text_elm = text.split(maxsplit=1)
     hashes = text_elm[0].count("#")
-    children = text_to_children(text_elm[1])
     if 1 <= hashes <= 6:
-            return ParentNode(f"h{hashes}", children)
+        return f"h{hashes}", text_elm[1]
     else:
         raise ValueError(f"Heading markdown should contain 1-6 '#', provided {hashes}'.")
 
 
-def quote_block_to_html(text: str) -> ParentNode:
+def quote_block_content(text: str) -> str:
     quotes = text.splitlines()
     quotes_content = list(map(lambda x: x.split(">", maxsplit=1)[1].lstrip(), quotes))
-    content_block =  " ".join(quotes_content)
-    children = text_to_children(content_block)
+
+    return " ".join(quotes_content)
+
+
+def paragraph_block_content(text: str) -> str:
+    return " ".join(text.splitlines())
+
+
+def code_block_to_html(text: str) -> ParentNode:
+    return ParentNode("pre", [LeafNode("code", code_block_content(text))])
+
+
+def heading_block_to_html(text: str, links: LinkMap|None = None) -> ParentNode:
+    tag, content = heading_block_content(text)
+
+    return ParentNode(tag, text_to_children(content, links))
+
+
+def quote_block_to_html(text: str, links: LinkMap|None = None) -> ParentNode:
+    children = text_to_children(quote_block_content(text), links)
 
     return ParentNode("blockquote", children)
 
 
-def list_block_to_html(text: str, tag: str) -> ParentNode:
+def list_block_to_html(text: str, tag: str, links: LinkMap|None = None) -> ParentNode:
     points = markdown_list_to_text(text)
-    node_points = map(lambda x: text_to_children(x), points)
+    node_points = map(lambda x: text_to_children(x, links), points)
     parent_points = list(map(lambda x: ParentNode("li", x), node_points))
 
     return ParentNode(tag, parent_points)
 
 
-def paragraph_block_to_html(text: str) -> ParentNode:
-    text_lines = text.splitlines()
-    text_line = " ".join(text_lines)
-    children = text_to_children(text_line)
+def paragraph_block_to_html(text: str, links: LinkMap|None = None) -> ParentNode:
+    children = text_to_children(paragraph_block_content(text), links)
 
     return ParentNode("p", children)
 
 
-def block_to_html_parent_node(block_type: BlockType, text: str) -> ParentNode:
+def block_to_html_parent_node(block_type: BlockType, text: str, links: LinkMap|None = None) -> ParentNode:
     match block_type:
         case BlockType.CODE:
             return code_block_to_html(text)
         case BlockType.HEADING:
-            return heading_block_to_html(text)
+            return heading_block_to_html(text, links)
         case BlockType.QUOTE:
-            return quote_block_to_html(text)
+            return quote_block_to_html(text, links)
         case BlockType.UNOLIST:
-            return list_block_to_html(text, "ul")
+            return list_block_to_html(text, "ul", links)
         case BlockType.OLIST:
-            return list_block_to_html(text, "ol")
+            return list_block_to_html(text, "ol", links)
         case BlockType.PARAGRAPH:
-            return paragraph_block_to_html(text)
+            return paragraph_block_to_html(text, links)
+
 
+def markdown_to_html_node(markdown: str|Iterable[str], links: LinkMap|None = None) -> ParentNode:
+    """Parse a markdown string, or any iterable of lines such as an open file.
 
-def markdown_to_html_node(markdown: str) -> ParentNode:
-    blocks = markdown_to_blocks(markdown)
+    With `links`, link and image URLs are resolved as the leaves are built.
+    """
+    lines = StringIO(markdown) if isinstance(markdown, str) else markdown
     child_nodes: list[HTMLNode] = []
-    for block in blocks:
-        block_type = block_to_block_type(block)
-        child_nodes.append(block_to_html_parent_node(block_type, block))
+    for block_type, block_lines in scan_blocks(lines):
+        child_nodes.append(block_to_html_parent_node(block_type, "\n".join(block_lines), links))
 
     return ParentNode("div", child_nodes)
 
 
+def inline_to_arena(arena: NodeArena, text: str, links: LinkMap|None = None) -> list[int]:
+    return [arena.add_leaf(*leaf) for leaf in inline_leaves(text, links)]
 
 
-
-
-
+def block_to_arena(arena: NodeArena, block_type: BlockType, text: str, links: LinkMap|None = None) -> int:
+    match block_type:
+        case BlockType.CODE:
+            return arena.add_parent("pre", [arena.add_leaf("code", code_block_content(text))])
+        case BlockType.HEADING:
+            tag, content = heading_block_content(text)
+            return arena.add_parent(tag, inline_to_arena(arena, content, links))
+        case BlockType.QUOTE:
+            return arena.add_parent("blockquote", inline_to_arena(arena, quote_block_content(text), links))
+        case BlockType.UNOLIST | BlockType.OLIST:
+            items = [
+                arena.add_parent("li", inline_to_arena(arena, point, links))
+                for point in markdown_list_to_text(text)
+            ]
+            return arena.add_parent("ul" if block_type == BlockType.UNOLIST else "ol", items)
+        case BlockType.PARAGRAPH:
+            return arena.add_parent("p", inline_to_arena(arena, paragraph_block_content(text), links))
+
+
+def markdown_to_node_arena(
+    markdown: str|Iterable[str],
+    cache: RenderCache|None = None,
+    links: LinkMap|None = None
+) -> NodeArena:
+    """Like `markdown_to_html_node`, but builds a compact NodeArena.
+
+    With a `cache`, each block is looked up by its content hash (and the
+    `links` context of the images it shows) and stored as a single
+    pre-rendered text leaf.
+    """
+    lines = StringIO(markdown) if isinstance(markdown, str) else markdown
+    arena = NodeArena()
+    blocks: list[int] = []
+    for block_type, block_lines in scan_blocks(lines):
+        text = "\n".join(block_lines)
+        if cache is None:
+            blocks.append(block_to_arena(arena, block_type, text, links))
+            continue
+        key = block_key(block_type, text, links.context(image_urls(text)) if links else "")
+        html = cache.get(key)
+        if html is None:
+            html = block_to_html_parent_node(block_type, text, links).to_html()
+            cache.put(key, html)
+        blocks.append(arena.add_leaf(None, html))
+    _ = arena.add_parent("div", blocks)
+
+    return arena.finish()
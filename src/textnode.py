@@ -11,6 +11,8 @@ class TextType(Enum):
     IMAGE = "image"
 
 class TextNode:
+    __slots__ = ("text", "text_type", "url")
+
     def __init__(self, text: str, text_type: TextType, url: str|None=None) -> None:
         self.text: str = text
         self.text_type: TextType = text_type
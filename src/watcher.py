@@ -0,0 +1,120 @@
+from __future__ import annotations
+import logging
+import os
+import threading
+import time
+from collections.abc import Callable, Iterable
+
+
+Snapshot = dict[str, tuple[int, int]]
+
+logger = logging.getLogger(__name__)
+
+
+def take_snapshot(roots: Iterable[str]) -> Snapshot:
+    """Map every file under `roots` to its (mtime_ns, size)."""
+    snapshot: Snapshot = {}
+    for root in roots:
+        if os.path.isfile(root):
+            stat = os.stat(root)
+            snapshot[root] = (stat.st_mtime_ns, stat.st_size)
+            continue
+        for directory, _, files in os.walk(root):
+            for name in files:
+                path = os.path.join(directory, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                snapshot[path] = (stat.st_mtime_ns, stat.st_size)
+
+    return snapshot
+
+
+def diff_snapshots(old: Snapshot, new: Snapshot) -> set[str]:
+    """Paths that were added, removed or modified between two snapshots."""
+    changed = {path for path, signature in new.items() if old.get(path) != signature}
+    changed.update(path for path in old if path not in new)
+
+    return changed
+
+
+class ChangeSet:
+    def __init__(self) -> None:
+        self.content: set[str] = set()
+        self.static: set[str] = set()
+        self.template: bool = False
+
+
+    def __bool__(self) -> bool:
+        return bool(self.content or self.static or self.template)
+
+
+def classify_changes(
+    changed: Iterable[str],
+    content_path: str,
+    static_path: str,
+    template_path: str
+) -> ChangeSet:
+    changes = ChangeSet()
+    content_root = os.path.join(content_path, "")
+    static_root = os.path.join(static_path, "")
+    for path in changed:
+        if path == template_path:
+            changes.template = True
+        elif path.startswith(content_root):
+            changes.content.add(path)
+        elif path.startswith(static_root):
+            changes.static.add(path)
+
+    return changes
+
+
+class Watcher:
+    """Polls a set of files and directories for changes.
+
+    Bursts of events (editors writing several files, `git checkout`) are
+    debounced: changes are reported only once the tree has been quiet
+    for `debounce` seconds.
+    """
+    def __init__(self, roots: Iterable[str], interval: float = 0.5, debounce: float = 0.2) -> None:
+        self.roots: list[str] = list(roots)
+        self.interval: float = interval
+        self.debounce: float = debounce
+        self.snapshot: Snapshot = take_snapshot(self.roots)
+
+
+    def poll(self) -> set[str]:
+        snapshot = take_snapshot(self.roots)
+        changed = diff_snapshots(self.snapshot, snapshot)
+        self.snapshot = snapshot
+
+        return changed
+
+
+    def wait_for_changes(self, stop: threading.Event|None = None) -> set[str]:
+        changed: set[str] = set()
+        while not (stop and stop.is_set()):
+            if changed:
+                time.sleep(self.debounce)
+                more = self.poll()
+                if not more:
+                    return changed
+                changed |= more
+            else:
+                time.sleep(self.interval)
+                changed = self.poll()
+
+        return changed
+
+
+    def run(self, on_change: Callable[[set[str]], None], stop: threading.Event|None = None) -> None:
+        """Call `on_change` with every batch of changes; a failing call is logged and watching goes on."""
+        while not (stop and stop.is_set()):
+            changed = self.wait_for_changes(stop)
+            if not changed:
+                continue
+            try:
+                on_change(changed)
+            except Exception:
+                logger.exception("Rebuild failed, still watching for changes")